@@ -0,0 +1,87 @@
+"""Benchmark: db side airport substring search, plain vs materialized view.
+
+Times ``GET_AIRPORTS_BY_SUBSTRING`` style queries against the (indexed)
+``airports_search_strings`` materialized view and against a temporary
+plain view with the original (non materialized) definition.
+
+.. IMPORTANT::
+    Runs against the database of the current environment (see
+    ``config.database``), which should already contain the full
+    OurAirports dataset (pass ``--import`` to import it first).
+    The temporary view is created inside a transaction that is rolled
+    back at the end of the benchmark.
+
+Usage::
+
+    python -m benchmarks.bench_airports_search [--import] [iterations]
+"""
+import sys
+import time
+
+import sqlalchemy as sa
+
+from jormungand.bll import import_oa_airport_data, import_oa_country_data
+from jormungand.core import db
+
+_QUERIES = ("lon", "new", "par", "us", "jfk", "international", "ab")
+_PLAIN_VIEW = """
+CREATE TEMPORARY VIEW airports_search_strings_plain
+AS SELECT country_code AS search_string, airport_id, 1 AS priority
+FROM airports_join_countries
+UNION ALL
+SELECT iata_code, airport_id, 2 FROM airports_join_countries
+UNION ALL
+SELECT country_name, airport_id, 3 FROM airports_join_countries
+UNION ALL
+SELECT municipality, airport_id, 4 FROM airports_join_countries
+UNION ALL
+SELECT airport_name, airport_id, 5 FROM airports_join_countries
+ORDER BY priority ASC, search_string ASC
+"""
+_SEARCH_QUERY = """
+WITH id_matches AS (
+    SELECT airport_id
+    FROM {view}
+    WHERE search_string ILIKE ('%' || :substring || '%')
+    ORDER BY priority ASC, search_string ASC
+    LIMIT :limit
+)
+SELECT *
+FROM airports_join_countries
+WHERE airport_id IN (SELECT airport_id FROM id_matches)
+"""
+
+
+def time_queries(conn: sa.Connection, view: str, iterations: int) -> float:
+    stmt = sa.text(_SEARCH_QUERY.format(view=view))
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        for substring in _QUERIES:
+            conn.execute(stmt, {"substring": substring, "limit": 5}).all()
+    return time.perf_counter() - start_time
+
+
+def main(iterations: int = 200):
+    with db.get_db_connection(begin_once=False) as conn:
+        search_strings_count = conn.execute(sa.text(
+            "SELECT count(*) FROM airports_search_strings")).scalar()
+        conn.execute(sa.text(_PLAIN_VIEW))
+        query_count = iterations * len(_QUERIES)
+        print(f"{search_strings_count} search strings, "
+              f"{query_count} queries per case")
+        for case_name, view in (
+                ("plain view", "airports_search_strings_plain"),
+                ("materialized view", "airports_search_strings")):
+            elapsed_time = time_queries(conn, view, iterations)
+            print(f"{case_name:>18}: {elapsed_time:.3f}s "
+                  f"({elapsed_time / query_count * 1000:.3f}ms per query)")
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--import" in args:
+        args.remove("--import")
+        import_oa_country_data()
+        import_oa_airport_data()
+    main(*map(int, args))
@@ -0,0 +1,108 @@
+"""Benchmark: blocking vs asyncio upstream flight offers searches.
+
+Runs a local fake Amadeus server answering every flight offers search
+after a fixed latency and times a batch of (distinct, uncached) upstream
+searches made:
+
+* sequentially with the blocking client,
+* with the blocking client from a thread pool,
+* concurrently from a single event loop with the async client.
+
+Usage::
+
+    python -m benchmarks.bench_amadeus_async_search \
+        [search count] [latency ms] [thread pool size]
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import multiprocessing
+from multiprocessing.connection import Connection
+import sys
+import time
+
+from jormungand.core.config import config
+from jormungand.providers.amadeus import flight_offers_search, http
+from tests.utils import AmadeusStubServer
+
+
+def _search_params(search_count: int) -> list[dict]:
+    return [
+        {"originLocationCode": "TLV", "destinationLocationCode": "LAS",
+         "departureDate": "2023-07-03", "adults": adults}
+        for adults in range(1, search_count + 1)
+    ]
+
+
+def time_sequential(search_params: list[dict]) -> float:
+    start_time = time.perf_counter()
+    for params in search_params:
+        flight_offers_search._amadeus_flight_offers_search(params)
+    return time.perf_counter() - start_time
+
+
+def time_thread_pool(search_params: list[dict], max_workers: int) -> float:
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(flight_offers_search._amadeus_flight_offers_search,
+                          search_params))
+    return time.perf_counter() - start_time
+
+
+def time_async(search_params: list[dict]) -> float:
+    async def main():
+        http.load_async_client()
+        try:
+            start_time = time.perf_counter()
+            await asyncio.gather(*(
+                flight_offers_search._async_amadeus_flight_offers_search(
+                    params)
+                for params in search_params))
+            return time.perf_counter() - start_time
+        finally:
+            await http.aclose_async_client()
+
+    return asyncio.run(main())
+
+
+def _serve_fake_amadeus(latency_ms: int, connection: Connection):
+    def slow_search(request):
+        time.sleep(latency_ms / 1000)
+        return 200, {}, {"meta": {"count": 0}, "data": []}
+
+    routes = {("GET", "/v2/shopping/flight-offers"): slow_search}
+    with AmadeusStubServer(routes) as stub:
+        connection.send(stub.url)
+        connection.recv()
+
+
+def main(search_count: int = 200, latency_ms: int = 200,
+         max_workers: int = 16):
+    for logger_name in ("httpcore", "httpx", "urllib3"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+    # The fake server runs in its own process so its request handling
+    # does not compete with the measured client for the GIL.
+    connection, server_connection = multiprocessing.Pipe()
+    server = multiprocessing.Process(
+            target=_serve_fake_amadeus, args=(latency_ms, server_connection))
+    server.start()
+    try:
+        config.set("amadeus", {"root_url": connection.recv(),
+                               "key": "bench-key", "secret": "bench-secret"})
+        search_params = _search_params(search_count)
+        timings = {
+            "sequential": time_sequential(search_params),
+            f"{max_workers} threads": time_thread_pool(
+                search_params, max_workers),
+            "asyncio": time_async(search_params),
+        }
+    finally:
+        connection.send("stop")
+        server.join()
+    for case_name, elapsed in timings.items():
+        print(f"{case_name:>12}: {elapsed:.3f}s "
+              f"({search_count / elapsed:.1f} searches/s)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,67 @@
+"""Benchmark: loading the table metadata at startup, reflected vs cached.
+
+Times ``db.load_db_tables`` of a fresh process (i.e. with a new engine,
+so no pooled connections or dialect caches carry over between runs):
+
+* reflecting all the tables (the metadata cache disabled),
+* loading the tables from the on-disk metadata cache (primed beforehand).
+
+.. IMPORTANT::
+    Runs against the database of the current environment (see
+    ``config.database``), which has to be initialized by ``init_db`` (so
+    its schema version is stored in the meta table).
+
+Usage::
+
+    python -m benchmarks.bench_db_startup [iterations]
+"""
+import statistics
+import sys
+import time
+
+from jormungand.core import db
+from jormungand.core.config import config
+from jormungand.core.metrics import get_metrics_registry
+
+
+def time_startup(use_cache: bool, iterations: int) -> tuple[float, int]:
+    """Time loading the tables with fresh engines.
+
+    :returns: The median load time (seconds) and the number of statements
+        executed per load.
+    """
+    config.set("database_options.metadata_cache.enabled", use_cache)
+    load_times = []
+    statements = 0
+    for _ in range(iterations):
+        db.load_db_engine()
+        db.get_db_engine().connect().close()  # not timing connecting
+        get_metrics_registry().reset()
+        start_time = time.perf_counter()
+        db.load_db_tables()
+        load_times.append(time.perf_counter() - start_time)
+        statements = sum(
+            latency["count"] for latency in get_metrics_registry()
+            .snapshot()["histograms"][db.MN_STATEMENT_LATENCY].values())
+        db.get_db_engine().dispose()
+    return statistics.median(load_times), statements
+
+
+def main(iterations: int = 20):
+    previous_setting = config.get(
+            "database_options.metadata_cache.enabled", True)
+    try:
+        config.set("database_options.metadata_cache.enabled", True)
+        db.load_db_tables()  # primes the cache
+        for case_name, use_cache in (("reflection", False),
+                                     ("cached", True)):
+            load_time, statements = time_startup(use_cache, iterations)
+            print(f"{case_name:>10}: {load_time * 1e3:.1f}ms "
+                  f"({statements} statements)")
+    finally:
+        config.set("database_options.metadata_cache.enabled",
+                   previous_setting)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
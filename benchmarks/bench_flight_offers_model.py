@@ -0,0 +1,63 @@
+"""Benchmark: raw Amadeus search results vs the compact offers listing.
+
+Compares, for a (110 offers) Amadeus flight offers search result:
+
+* The memory held by a cached search result.
+* The cost of serializing a search result for clients (to JSON).
+* The one off cost of converting a raw result to the compact form.
+
+Usage::
+
+    python -m benchmarks.bench_flight_offers_model [repeat]
+"""
+import gc
+import json
+import sys
+import timeit
+import tracemalloc
+
+from jormungand.providers.amadeus.formatting import format_flight_offers
+from tests.utils import Assets
+
+
+def allocated_size(build) -> tuple[int, object]:
+    """Get the memory retained by the object returned from build()."""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, obj
+
+
+def main(repeat: int = 200):
+    raw_text = Assets.amadeus_flights_search_one_way.read_text()
+
+    raw_size, raw_result = allocated_size(lambda: json.loads(raw_text))
+    listing_size, listing = allocated_size(
+            lambda: format_flight_offers(json.loads(raw_text)))
+    print(f"{'memory':>10}: raw {raw_size / 1024:.1f} KiB, "
+          f"compact {listing_size / 1024:.1f} KiB "
+          f"({raw_size / listing_size:.1f}x smaller)")
+
+    raw_time = min(timeit.repeat(
+            lambda: json.dumps(raw_result), number=repeat, repeat=3))
+    listing_time = min(timeit.repeat(
+            lambda: json.dumps(listing.to_dict()), number=repeat, repeat=3))
+    raw_bytes = len(json.dumps(raw_result))
+    listing_bytes = len(json.dumps(listing.to_dict()))
+    print(f"{'serialize':>10}: raw {raw_time / repeat * 1000:.2f}ms "
+          f"({raw_bytes / 1024:.1f} KiB), "
+          f"compact {listing_time / repeat * 1000:.2f}ms "
+          f"({listing_bytes / 1024:.1f} KiB)")
+
+    convert_time = min(timeit.repeat(
+            lambda: format_flight_offers(raw_result),
+            number=repeat, repeat=3))
+    print(f"{'convert':>10}: {convert_time / repeat * 1000:.2f}ms "
+          f"per search result")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
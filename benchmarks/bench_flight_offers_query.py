@@ -0,0 +1,84 @@
+"""Benchmark: filtering/sorting flight offers, raw dicts vs OffersTable.
+
+Builds a 250 offers search result (from the 110 offers Amadeus asset)
+and times a typical client query (max price, max stops, a departure
+window, sorted by price, top 20) answered by:
+
+* walking the raw Amadeus offer dicts,
+* ``FlightOffersListing.query`` (the column index is built beforehand,
+  its one off build cost is reported separately).
+
+Usage::
+
+    python -m benchmarks.bench_flight_offers_query [offer count] [repeat]
+"""
+from copy import deepcopy
+import datetime as dt
+from decimal import Decimal
+import json
+import sys
+import timeit
+
+from jormungand.flights.query import OffersTable
+from jormungand.providers.amadeus.formatting import format_flight_offers
+from tests.utils import Assets
+
+_QUERY = {
+    "max_price": Decimal("1500"),
+    "max_stops": 1,
+    "departure_from": dt.datetime(2023, 7, 3, 6),
+    "departure_to": dt.datetime(2023, 7, 3, 22),
+    "sort_by": "price",
+    "limit": 20,
+}
+
+
+def build_result(offer_count: int) -> dict:
+    result = json.loads(Assets.amadeus_flights_search_one_way.read_text())
+    offers = result["data"]
+    result["data"] = []
+    for offer_id in range(1, offer_count + 1):
+        offer = deepcopy(offers[(offer_id - 1) % len(offers)])
+        offer["id"] = str(offer_id)
+        result["data"].append(offer)
+    return result
+
+
+def query_raw(result: dict) -> list[dict]:
+    departure_from = _QUERY["departure_from"]
+    departure_to = _QUERY["departure_to"]
+    matches = []
+    for offer in result["data"]:
+        if Decimal(offer["price"]["grandTotal"]) > _QUERY["max_price"]:
+            continue
+        if any(len(itinerary["segments"]) - 1 > _QUERY["max_stops"]
+               for itinerary in offer["itineraries"]):
+            continue
+        departure_at = dt.datetime.fromisoformat(
+                offer["itineraries"][0]["segments"][0]["departure"]["at"])
+        if not departure_from <= departure_at <= departure_to:
+            continue
+        matches.append(offer)
+    matches.sort(key=lambda offer: Decimal(offer["price"]["grandTotal"]))
+    return matches[:_QUERY["limit"]]
+
+
+def main(offer_count: int = 250, repeat: int = 2000):
+    result = build_result(offer_count)
+    listing = format_flight_offers(result)
+    listing.table  # builds the column index up front
+    cases = {
+        "raw dicts": lambda: query_raw(result),
+        "OffersTable": lambda: listing.query(**_QUERY),
+    }
+    for case_name, query in cases.items():
+        elapsed = min(timeit.repeat(query, number=repeat, repeat=3))
+        print(f"{case_name:>12}: {elapsed / repeat * 1e6:.1f}us per query "
+              f"({len(query())} offers)")
+    build_time = min(timeit.repeat(
+            lambda: OffersTable(listing.offers), number=100, repeat=3))
+    print(f"{'table build':>12}: {build_time / 100 * 1e6:.1f}us (once)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
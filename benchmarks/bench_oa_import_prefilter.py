@@ -0,0 +1,98 @@
+"""Benchmark: OurAirports airports import with/without the csv pre-filter.
+
+Generates a synthetic airports.csv with roughly the size and airport type
+distribution of the real OurAirports dataset and times the read+validate
+part of ``import_oa_airport_data`` (the db write is not included).
+
+Usage::
+
+    python -m benchmarks.bench_oa_import_prefilter [row count]
+"""
+import csv
+from pathlib import Path
+import random
+import sys
+import tempfile
+import time
+
+from jormungand.bll.base import iter_clean_data
+from jormungand.bll.ourairports import ACCEPTED_AIRPORT_TYPES, OAAirportModel
+from jormungand.dal import ourairports
+
+_AIRPORT_TYPES = (
+    ["large_airport"] * 1 + ["medium_airport"] * 6 + ["small_airport"] * 50
+    + ["heliport"] * 25 + ["closed"] * 15 + ["seaplane_base"] * 3
+)
+_FIELD_NAMES = (
+    "id", "ident", "type", "name", "latitude_deg", "longitude_deg",
+    "elevation_ft", "continent", "iso_country", "iso_region",
+    "municipality", "scheduled_service", "gps_code", "iata_code",
+    "local_code", "home_link", "wikipedia_link", "keywords",
+)
+
+
+def write_dataset(path: Path, row_count: int):
+    rng = random.Random(0)
+    country_codes = [f"{a}{b}" for a in "ABCDEFGHIJ" for b in "ABCDEFGHIJ"]
+    with open(path, "w", encoding="UTF-8", newline="") as dataset_file:
+        writer = csv.DictWriter(dataset_file, fieldnames=_FIELD_NAMES)
+        writer.writeheader()
+        for row_id in range(row_count):
+            airport_type = rng.choice(_AIRPORT_TYPES)
+            has_iata = (airport_type == "large_airport"
+                        or rng.random() < 0.1)
+            writer.writerow({
+                "id": row_id,
+                "ident": f"X{row_id:05}",
+                "type": airport_type,
+                "name": f"airport {row_id}",
+                "latitude_deg": rng.uniform(-90, 90),
+                "longitude_deg": rng.uniform(-180, 180),
+                "elevation_ft": rng.randint(0, 5000),
+                "continent": "EU",
+                "iso_country": rng.choice(country_codes),
+                "iso_region": "XX-1",
+                "municipality": f"municipality {row_id % 5000}",
+                "scheduled_service": "no",
+                "gps_code": "",
+                "iata_code": (
+                    "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=3))
+                    if has_iata else ""),
+                "local_code": "",
+                "home_link": "",
+                "wikipedia_link": "",
+                "keywords": "",
+            })
+    return {code: index for index, code in enumerate(country_codes, 1)}
+
+
+def time_import(**filter_kwargs) -> tuple[float, int]:
+    start_time = time.perf_counter()
+    cleaned_data = iter_clean_data(
+            ourairports.oa_airports_iter(**filter_kwargs), OAAirportModel)
+    row_count = sum(1 for _ in cleaned_data)
+    return time.perf_counter() - start_time, row_count
+
+
+def main(row_count: int = 80000, repeat: int = 3):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_path = Path(tmp_dir).joinpath("airports.csv")
+        OAAirportModel._country_code_to_id_map = write_dataset(
+                dataset_path, row_count)
+        ourairports._DATASET_AIRPORTS = dataset_path
+        cases = {
+            "no pre-filter": {},
+            "pre-filter": {
+                "airport_types": ACCEPTED_AIRPORT_TYPES,
+                "require_iata_code": True,
+            },
+        }
+        for case_name, filter_kwargs in cases.items():
+            timings = [time_import(**filter_kwargs) for _ in range(repeat)]
+            best_time = min(elapsed for elapsed, _ in timings)
+            print(f"{case_name:>14}: {best_time:.3f}s "
+                  f"({timings[0][1]} of {row_count} rows imported)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
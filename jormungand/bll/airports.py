@@ -7,10 +7,8 @@ from typing import ClassVar
 
 from pydantic import BaseModel, Field, validator, ValidationError
 
-from .base import gen_clean_data
-from jormungand.dal import (
-    oa_countries_get_all, countries_get_code_to_id_map, countries_init_data,
-    oa_airports_get_all, airports_init_data)
+from jormungand.core.config import config
+from jormungand.dal import get_airports_by_substring
 
 
 class AirportBasicQuery(BaseModel):
@@ -25,10 +23,15 @@ class AirportBasicQuery(BaseModel):
         for the same name, which is out of scope for this project at the
         moment.
 
-    :query: The query string to be validated
+    :query: The query string to be validated, surrounding whitespace is
+        stripped and inner whitespace runs are collapsed to single spaces.
     """
     query: str = Field(regex=r"(?u)[\w\s]{2,64}")
 
+    @validator("query", pre=True)
+    def normalize_whitespace(cls, v):
+        return " ".join(v.split()) if isinstance(v, str) else v
+
 
 class AirportShortInfo(BaseModel):
     """Brief airport information meant for basic search results.
@@ -49,17 +52,28 @@ class AirportShortInfo(BaseModel):
         extra = "ignore"
 
 
-def find_airports(query: str) -> list[AirportShortInfo]:
+def find_airports(query: str, limit: int = 5) -> list[AirportShortInfo]:
     """Find and return a list of airports matching a query substring.
 
     The query is matched against an airport's IATA code, country code,
     country name, municipality and airport name.
 
+    If the ``airports.use_search_index`` setting is enabled the search is
+    answered from an in-process search index instead of by the database.
+
     :query: The query substring to be searched for.
-    :returns: A list of airports matching the query.
+    :limit: The maximal number of airports to return.
+    :returns: A list of airports matching the query (an empty list if the
+        query is not a valid AirportBasicQuery).
     """
     try:
         query = AirportBasicQuery(query=query)
-    except ValidationError as err:
-        x = (query, err)
-    raise Exception
+    except ValidationError:
+        return []
+    airports = get_airports_by_substring(
+            query.query, limit,
+            use_index=config.get("airports.use_search_index", False))
+    return [
+        AirportShortInfo(name=airport["airport_name"], **airport)
+        for airport in airports
+    ]
@@ -2,15 +2,129 @@
 
 """
 
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import itertools
+import os
+from typing import Iterable, Iterator
+
 from pydantic import BaseModel, ValidationError
 
+PARALLEL_CHUNK_SIZE = 1000
 
-def gen_clean_data(data: list[dict], model: BaseModel) -> list[dict]:
-    cleaned_data = []
+
+def _rejection_reason(error: ValidationError) -> str:
+    """Get a short description of the (first) reason an entry was rejected.
+    """
+    first_error = error.errors()[0]
+    location = ".".join(str(part) for part in first_error["loc"])
+    return f"{location}: {first_error['msg']}"
+
+
+def iter_clean_data(
+        data: Iterable[dict], model: type[BaseModel],
+        rejected: Counter | None = None
+        ) -> Iterator[dict]:
+    """Lazily validate entries, yielding only the valid (cleaned) ones.
+
+    :data: An iterable of raw entries.
+    :model: The pydantic model used to validate and clean each entry.
+    :rejected: If given, the number of rejected entries per rejection
+        reason is counted into this counter.
+    :returns: An iterator over the cleaned entries, entries that fail
+        validation are silently discarded.
+    """
     for entry in data:
         try:
             cleaned_entry = model(**entry).dict()
-        except ValidationError:
+        except ValidationError as err:
+            if rejected is not None:
+                rejected[_rejection_reason(err)] += 1
             continue
-        cleaned_data.append(cleaned_entry)
-    return cleaned_data
+        yield cleaned_entry
+
+
+def gen_clean_data(data: list[dict], model: BaseModel) -> list[dict]:
+    return list(iter_clean_data(data, model))
+
+
+def _init_clean_data_worker(model: type[BaseModel], model_state: dict):
+    """Restore the class level state of a model in a worker process."""
+    for name, value in model_state.items():
+        setattr(model, name, value)
+
+
+def _clean_data_chunk(
+        model: type[BaseModel], chunk: list[dict]
+        ) -> tuple[list[dict], Counter]:
+    rejected = Counter()
+    return list(iter_clean_data(chunk, model, rejected)), rejected
+
+
+def iter_clean_data_parallel(
+        data: Iterable[dict], model: type[BaseModel],
+        rejected: Counter | None = None, max_workers: int | None = None,
+        chunk_size: int = PARALLEL_CHUNK_SIZE, mp_context=None
+        ) -> Iterator[dict]:
+    """Lazily validate entries in a process pool.
+
+    Works like ``iter_clean_data`` but the entries are split into chunks
+    that are validated by a ``ProcessPoolExecutor``. The order of the
+    entries is preserved and only a bounded number of chunks is in flight
+    at any time, so the input can still be streamed.
+
+    The class level state of the model (i.e. its ``ClassVar`` attributes,
+    e.g. ``OAAirportModel._country_code_to_id_map``) is shipped to the
+    workers when they start, so it must be set before iterating.
+
+    :data: An iterable of raw entries.
+    :model: The pydantic model used to validate and clean each entry,
+        must be importable (i.e. defined at module level).
+    :rejected: If given, the number of rejected entries per rejection
+        reason is counted into this counter.
+    :max_workers: The number of worker processes (default: cpu count).
+    :chunk_size: The number of entries sent to a worker at once.
+    :mp_context: An optional multiprocessing context for the pool.
+    :returns: An iterator over the cleaned entries.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    model_state = {
+        name: getattr(model, name) for name in model.__class_vars__
+    }
+    data = iter(data)
+    pending: deque[Future] = deque()
+
+    def collect_result(future: Future) -> list[dict]:
+        cleaned_chunk, chunk_rejected = future.result()
+        if rejected is not None:
+            rejected.update(chunk_rejected)
+        return cleaned_chunk
+
+    with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=mp_context,
+            initializer=_init_clean_data_worker,
+            initargs=(model, model_state)) as executor:
+        while chunk := list(itertools.islice(data, chunk_size)):
+            pending.append(executor.submit(_clean_data_chunk, model, chunk))
+            if len(pending) >= 2 * max_workers:
+                yield from collect_result(pending.popleft())
+        while pending:
+            yield from collect_result(pending.popleft())
+
+
+def gen_clean_data_parallel(
+        data: Iterable[dict], model: type[BaseModel],
+        max_workers: int | None = None,
+        chunk_size: int = PARALLEL_CHUNK_SIZE
+        ) -> tuple[list[dict], Counter]:
+    """Validate entries in a process pool.
+
+    See ``iter_clean_data_parallel`` for details.
+
+    :returns: The cleaned entries (in input order) and a counter of the
+        rejected entries per rejection reason.
+    """
+    rejected = Counter()
+    cleaned_data = list(iter_clean_data_parallel(
+            data, model, rejected, max_workers, chunk_size))
+    return cleaned_data, rejected
@@ -3,17 +3,38 @@ Business logic related to data import from OurAirports.com datasets.
 
 """
 
-from typing import ClassVar
+from collections import Counter
+from typing import ClassVar, Iterable, Iterator
 
 from pydantic import BaseModel, Field, validator
 
-from .base import gen_clean_data
+from .base import iter_clean_data, iter_clean_data_parallel
+from jormungand.core.logging import get_logger
 from jormungand.dal import (
-    oa_countries_get_all, countries_get_code_to_id_map, countries_init_data,
-    oa_airports_get_all, airports_init_data)
+    oa_countries_iter, countries_get_code_to_id_map, countries_init_data,
+    oa_airports_iter, airports_init_data, refresh_airports_search_strings)
+
+logger = get_logger(__name__)
 
 
 ACCEPTED_AIRPORT_TYPES = {"large_airport"}
+IMPORT_BATCH_SIZE = 5000
+
+
+def _iter_clean_import_data(
+        data: Iterable[dict], model: type[BaseModel], rejected: Counter,
+        validation_workers: int | None
+        ) -> Iterator[dict]:
+    if validation_workers is None:
+        return iter_clean_data(data, model, rejected)
+    return iter_clean_data_parallel(
+            data, model, rejected, max_workers=validation_workers)
+
+
+def _log_rejected(dataset_name: str, rejected: Counter):
+    for reason, count in rejected.most_common():
+        logger.info("%s import: rejected %d entries: %s",
+                    dataset_name, count, reason)
 
 
 class OACountryModel(BaseModel):
@@ -28,13 +49,25 @@ class OACountryModel(BaseModel):
     name: str = Field(min_length=2)
 
 
-def import_oa_country_data():
+def import_oa_country_data(
+        batch_size: int = IMPORT_BATCH_SIZE,
+        validation_workers: int | None = None
+        ) -> int:
     """Import country data from the OurAirports.com datasets.
 
     Currently the data imported is:
     * Country ISO 3166-1 alpha-2 codes.
     * Country names.
 
+    The import runs as a lazy pipeline (read entry -> validate -> batch ->
+    write), so at most ``batch_size`` entries are held in memory at once.
+
+    :batch_size: The number of entries written to the db at once.
+    :validation_workers: If given, the entries are validated in a process
+        pool with this many worker processes (see
+        ``bll.base.iter_clean_data_parallel``).
+    :returns: The number of imported countries.
+
     .. note::
         Since the OurAirports country data is relatively small, static
         and complete this function is meant to to be run once/infrequently
@@ -43,9 +76,14 @@ def import_oa_country_data():
         existing data and import fresh data approach).
     """
 
-    countries_data = oa_countries_get_all()
-    cleaned_countries_data = gen_clean_data(countries_data, OACountryModel)
-    countries_init_data(cleaned_countries_data)
+    rejected = Counter()
+    countries_data = oa_countries_iter()
+    cleaned_countries_data = _iter_clean_import_data(
+            countries_data, OACountryModel, rejected, validation_workers)
+    row_count = countries_init_data(cleaned_countries_data, batch_size)
+    refresh_airports_search_strings()
+    _log_rejected("countries", rejected)
+    return row_count
 
 
 class OAAirportModel(BaseModel):
@@ -86,7 +124,10 @@ class OAAirportModel(BaseModel):
             raise ValueError(f"Unknown country code: {v}")
 
 
-def import_oa_airport_data():
+def import_oa_airport_data(
+        batch_size: int = IMPORT_BATCH_SIZE,
+        validation_workers: int | None = None
+        ) -> int:
     """Import airport data from the OurAirports.com datasets.
 
     Currently the data imported is:
@@ -96,6 +137,15 @@ def import_oa_airport_data():
     * name: Airport names.
     * municipality: Airport municipalities.
 
+    The import runs as a lazy pipeline (read entry -> validate -> batch ->
+    write), so at most ``batch_size`` entries are held in memory at once.
+
+    :batch_size: The number of entries written to the db at once.
+    :validation_workers: If given, the entries are validated in a process
+        pool with this many worker processes (see
+        ``bll.base.iter_clean_data_parallel``).
+    :returns: The number of imported airports.
+
     .. note::
         Since the OurAirports airport data is relatively small, static
         and complete this function is meant to to be run once/infrequently
@@ -104,7 +154,13 @@ def import_oa_airport_data():
         existing data and import fresh data approach).
     """
 
-    airports_data = oa_airports_get_all()
+    rejected = Counter()
     OAAirportModel._country_code_to_id_map = countries_get_code_to_id_map()
-    cleaned_airports_data = gen_clean_data(airports_data, OAAirportModel)
-    airports_init_data(cleaned_airports_data)
+    airports_data = oa_airports_iter(
+            airport_types=ACCEPTED_AIRPORT_TYPES, require_iata_code=True)
+    cleaned_airports_data = _iter_clean_import_data(
+            airports_data, OAAirportModel, rejected, validation_workers)
+    row_count = airports_init_data(cleaned_airports_data, batch_size)
+    refresh_airports_search_strings()
+    _log_rejected("airports", rejected)
+    return row_count
@@ -0,0 +1,97 @@
+"""In-process caching utilities.
+
+"""
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+class TTLLRUCache:
+    """A thread safe, bounded LRU cache whose entries expire after a TTL.
+
+    When the cache is full the least recently used entry is evicted,
+    entries older than their TTL are treated (and counted) as misses.
+
+    :maxsize: The maximal number of entries held by the cache.
+    :ttl: The default time to live of an entry, in seconds.
+    :timer: The clock used for expiration (mostly useful for testing).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0,
+                 timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = (
+                OrderedDict())
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value (and mark it as recently used).
+
+        :returns: The cached value, or default if the key is not cached
+            or its entry has expired.
+        """
+        with self._lock:
+            expires_at, value = self._entries.get(key, (None, _MISSING))
+            if value is not _MISSING and expires_at <= self._timer():
+                del self._entries[key]
+                self._expirations += 1
+                value = _MISSING
+            if value is _MISSING:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """Cache a value, evicting the least recently used entry if full.
+
+        :ttl: The time to live of the entry (default: the cache TTL).
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (self._timer() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry from the cache (if cached) and return its value.
+        """
+        with self._lock:
+            _, value = self._entries.pop(key, (None, default))
+            return value
+
+    def clear(self):
+        """Remove all entries from the cache (the counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get a snapshot of the cache counters.
+
+        :returns: dictionary with the hits, misses, evictions, expirations
+            and current size of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
@@ -3,16 +3,24 @@
 TODO: better documentation for db module
 TODO: error handling
 """
+import asyncio
 import contextlib
 from enum import IntEnum
+import hashlib
+import os
 from pathlib import Path
+import pickle
+import re
+import time
 
 from sqlalchemy import (
-    create_engine, Engine, Connection, MetaData, Table, text, insert)
+    create_engine, Engine, Connection, MetaData, Table, event, text, insert)
 from sqlalchemy.engine import URL
+from sqlalchemy.exc import SQLAlchemyError
 from .config import config
 from .exceptions import MiscError
 from .logging import get_logger
+from .metrics import get_metrics_registry
 
 logger = get_logger(__name__)
 sa_loggers = tuple(
@@ -43,7 +51,35 @@ TABLES_LAYERED_DEPENDANCY_ORDER = {
     TN_CUSTOMERS: 31, TN_ADMINISTRATORS: 32,
 }
 
+# Meta Properties
+MP_SCHEMA_VERSION = 'schema_version'
+_STAMP_SCHEMA_VERSION = text(
+        "INSERT INTO meta (property, value) VALUES (:property, :value)"
+        " ON CONFLICT (property) DO UPDATE SET value = EXCLUDED.value")
+
+_URL_FIELDS = frozenset((
+    "drivername", "username", "password", "host", "port", "database",
+    "query",
+))
+
+_SQL_LITERALS = re.compile(
+        r"'(?:[^']|'')*'|%\(\w+\)s|%s|\$\d+|\?|\b\d+(?:\.\d+)?\b")
+_SQL_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SQL_VALUES_LISTS = re.compile(r"(\(\?\.\.\.\))(?:\s*,\s*\(\?\.\.\.\))+")
+_SQL_WHITESPACE = re.compile(r"\s+")
+
+# Metric Names
+MN_POOL_WAIT = 'db.pool.wait'
+MN_POOL_HOLD = 'db.pool.hold'
+MN_POOL_CHECKOUTS = 'db.pool.checkouts'
+MN_POOL_CHECKINS = 'db.pool.checkins'
+MN_STATEMENT_LATENCY = 'db.statement.latency'
+MN_STATEMENT_ROWS = 'db.statement.rows'
+MN_SLOW_STATEMENTS = 'db.statement.slow'
+MN_FAILED_STATEMENTS = 'db.statement.failed'
+
 _engine: Engine | None = None
+_async_engine = None  # sqlalchemy.ext.asyncio.AsyncEngine
 _tables: dict[str, Table] | None = None
 
 metadata_obj = MetaData()
@@ -64,17 +100,250 @@ def set_level_sqlalchemy_loggers(level: str):
         sa_logger.setLevel(level)
 
 
+def _engine_settings() -> dict:
+    """Get the engine tuning settings.
+
+    The ``database_options.engine`` presets (per environment, see
+    ``settings.yaml``) are overridden by an ``engine`` section of the
+    ``database`` settings (if any).
+    """
+    settings = dict(config.get("database_options.engine", {}))
+    settings.update(config.get("database.engine", None) or {})
+    return settings
+
+
+def engine_options(url: URL, settings: dict) -> dict:
+    """Get the ``create_engine`` keyword arguments for engine settings.
+
+    :url: The database URL (driver specific options are only set for the
+        drivers supporting them).
+    :settings: The engine settings:
+        * echo / echo_pool: Log the statements / the pool events.
+        * pool_size: The number of connections kept open by the pool.
+        * max_overflow: The number of connections opened on top of the
+          pool_size under load (closed when returned to the pool).
+        * pool_timeout: Seconds to wait for a connection from the pool
+          before failing.
+        * pool_pre_ping: Test connections on checkout (replacing ones
+          dropped by the server).
+        * pool_recycle: Seconds after which connections are replaced
+          (-1 to never replace them).
+        * statement_timeout: Milliseconds after which PostgreSQL cancels a
+          statement (0 to disable).
+        * executemany_mode: The psycopg2 executemany mode (e.g.
+          "values_plus_batch").
+    :returns: The create_engine keyword arguments.
+    """
+    options = {
+        "echo": settings.get("echo", False),
+        "echo_pool": settings.get("echo_pool", False),
+    }
+    for name in ("pool_size", "max_overflow", "pool_timeout",
+                 "pool_pre_ping", "pool_recycle"):
+        if settings.get(name) is not None:
+            options[name] = settings[name]
+    if url.get_backend_name() == "postgresql":
+        statement_timeout = settings.get("statement_timeout")
+        if (statement_timeout is not None
+                and url.get_driver_name() == "asyncpg"):
+            options["connect_args"] = {"server_settings": {
+                    "statement_timeout": str(statement_timeout)}}
+        elif statement_timeout is not None:
+            options["connect_args"] = {"options": (
+                    f"-c statement_timeout={statement_timeout}")}
+        if (url.get_driver_name() == "psycopg2"
+                and settings.get("executemany_mode") is not None):
+            options["executemany_mode"] = settings["executemany_mode"]
+    return options
+
+
+def _db_url() -> URL:
+    return URL.create(**{
+        name: value for name, value in config.database.items()
+        if name in _URL_FIELDS
+    })
+
+
 def load_db_engine(testing_engine: Engine = None):
-    """TODO: Docstring
+    """Load the database engine.
 
-    :returns: TODO
+    The engine is tuned according to the engine settings (see
+    ``engine_options``).
+
+    :testing_engine: An engine to use instead (for tests).
+
+    The engine is instrumented (see ``instrument_engine``).
     """
     global _engine
     if testing_engine is None:
-        _engine = create_engine(URL.create(**config.database),
-                                echo=False, echo_pool=False)
+        url = _db_url()
+        _engine = create_engine(url, **engine_options(url, _engine_settings()))
     else:
         _engine = testing_engine
+    instrument_engine(_engine)
+
+
+def async_db_url(url: URL) -> URL:
+    """Get the async driver variant of a database URL.
+
+    PostgreSQL URLs use the ``database_options.async_driver`` driver
+    (asyncpg by default), other URLs are returned as is.
+    """
+    if url.get_backend_name() != "postgresql":
+        return url
+    driver = config.get("database_options.async_driver", "asyncpg")
+    return url.set(drivername=f"postgresql+{driver}")
+
+
+def load_async_db_engine(testing_engine=None):
+    """Load the async database engine (for asyncio code).
+
+    The engine connects to the same database as the (sync) engine, with
+    the same engine settings, and is instrumented the same way (see
+    ``instrument_engine``). Its pooled connections are bound to the event
+    loop they were opened in, so it should be loaded from within the
+    running event loop (e.g. on application startup) and closed with
+    ``aclose_async_db_engine`` before the loop is closed.
+
+    :testing_engine: An async engine to use instead (for tests).
+    """
+    # sqlalchemy.ext.asyncio requires greenlet, only needed by async code
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    global _async_engine
+    if testing_engine is None:
+        url = async_db_url(_db_url())
+        _async_engine = create_async_engine(
+                url, **engine_options(url, _engine_settings()))
+    else:
+        _async_engine = testing_engine
+    instrument_engine(_async_engine.sync_engine)
+
+
+def get_async_db_engine():
+    if _async_engine is None:
+        load_async_db_engine()
+    return _async_engine
+
+
+async def aclose_async_db_engine():
+    """Close the pooled connections of the async engine (if loaded)."""
+    global _async_engine
+    if _async_engine is not None:
+        engine, _async_engine = _async_engine, None
+        await engine.dispose()
+
+
+def normalize_sql(statement: str) -> str:
+    """Get the shape of an SQL statement (for grouping statement metrics).
+
+    Literals and bound parameters are replaced by "?", lists of them (e.g.
+    of an IN clause or multi rows VALUES) are collapsed and whitespace is
+    squeezed.
+    """
+    statement = _SQL_LITERALS.sub("?", statement)
+    statement = _SQL_WHITESPACE.sub(" ", statement).strip()
+    statement = _SQL_PLACEHOLDER_LISTS.sub("(?...)", statement)
+    return _SQL_VALUES_LISTS.sub(r"\1, ...", statement)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["checked_out_at"] = time.perf_counter()
+    get_metrics_registry().increment(MN_POOL_CHECKOUTS)
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    checked_out_at = connection_record.info.pop("checked_out_at", None)
+    metrics = get_metrics_registry()
+    metrics.increment(MN_POOL_CHECKINS)
+    if checked_out_at is not None:
+        metrics.observe(MN_POOL_HOLD, time.perf_counter() - checked_out_at)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault("statement_started_at", []).append(
+            time.perf_counter())
+
+
+def record_statement(statement: str, elapsed: float,
+                     rowcount: int | None = None, failed: bool = False):
+    """Record the metrics of an executed statement.
+
+    Statements executed through the engine are recorded by its event
+    hooks (see ``instrument_engine``), this is for statements bypassing
+    them (e.g. a ``COPY`` through the raw DBAPI cursor).
+
+    :statement: The SQL of the statement (normalized for the labels).
+    :elapsed: How long the statement took (in seconds).
+    :rowcount: The number of rows the statement affected (if known).
+    :failed: Whether the statement failed.
+    """
+    sql = normalize_sql(statement)
+    metrics = get_metrics_registry()
+    metrics.observe(MN_STATEMENT_LATENCY, elapsed, label=sql)
+    if failed:
+        metrics.increment(MN_FAILED_STATEMENTS, label=sql)
+    elif rowcount is not None and rowcount >= 0:
+        metrics.observe(MN_STATEMENT_ROWS, rowcount, label=sql)
+    threshold = config.get(
+            "database_options.metrics.slow_statement_threshold", None)
+    if threshold is not None and elapsed >= threshold:
+        metrics.increment(MN_SLOW_STATEMENTS, label=sql)
+        logger.warning("slow statement (%.3fs, %s): %s", elapsed,
+                       "failed" if failed else f"{rowcount} rows", sql)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.perf_counter() - conn.info["statement_started_at"].pop()
+    record_statement(statement, elapsed, rowcount=cursor.rowcount)
+
+
+def _on_handle_error(exception_context):
+    """Record failed statements (not seen by after_cursor_execute)."""
+    conn = exception_context.connection
+    if conn is None or exception_context.statement is None:
+        return
+    started_at = conn.info.get("statement_started_at")
+    if not started_at:
+        # failed before it was executed (see _before_cursor_execute)
+        return
+    record_statement(exception_context.statement,
+                     time.perf_counter() - started_at.pop(), failed=True)
+
+
+_ENGINE_EVENT_HOOKS = {
+    "checkout": _on_checkout,
+    "checkin": _on_checkin,
+    "before_cursor_execute": _before_cursor_execute,
+    "after_cursor_execute": _after_cursor_execute,
+    "handle_error": _on_handle_error,
+}
+
+
+def instrument_engine(engine: Engine):
+    """Feed the pool and statement metrics of an engine to the registry.
+
+    Metrics (see ``metrics.get_metrics_registry``):
+        * db.pool.wait: Seconds waited for a connection by
+          ``get_db_connection``.
+        * db.pool.hold: Seconds connections were checked out of the pool.
+        * db.pool.checkouts / db.pool.checkins: Pool checkout and checkin
+          counts.
+        * db.statement.latency / db.statement.rows: Execution seconds and
+          rows returned (or affected) by normalized SQL statement (see
+          ``normalize_sql``), the latency includes failed statements.
+        * db.statement.failed: The number of failed statements (e.g.
+          cancelled by the statement_timeout), by normalized SQL statement.
+        * db.statement.slow: The number of statements (failed ones
+          included) slower than the
+          ``database_options.metrics.slow_statement_threshold`` setting
+          (seconds), by normalized SQL statement, which are also logged.
+    """
+    for identifier, hook in _ENGINE_EVENT_HOOKS.items():
+        if not event.contains(engine, identifier, hook):
+            event.listen(engine, identifier, hook)
 
 
 def get_db_engine() -> Engine:
@@ -87,19 +356,122 @@ def get_db_engine() -> Engine:
     return _engine
 
 
-def load_db_tables():
-    """TODO: Docstring
+def schema_version() -> str:
+    """Get the version of the schema created by ``init_db``.
 
-    :returns: TODO
+    The version is a hash of the schema script, ``init_db`` stores it in
+    the meta table.
+    """
+    return hashlib.sha256(_SQL_INIT_SCHEMA.read_bytes()).hexdigest()[:16]
+
+
+def stamp_schema_version(version: str | None = None):
+    """Store the schema version in the meta table of the database.
+
+    ``init_db`` stamps the databases it creates, databases adjusted
+    manually or by migration scripts have to be stamped (once the schema
+    matches ``schema.sql``) for their table metadata to be cached (see
+    ``load_db_tables``), e.g. at the end of every migration script::
+
+        python -c "from jormungand.core import db; db.stamp_schema_version()"
+
+    :version: The version to store (default: ``schema_version()``).
     """
-    global _tables
+    if version is None:
+        version = schema_version()
+    with get_db_connection() as conn:
+        conn.execute(_STAMP_SCHEMA_VERSION,
+                     {"property": MP_SCHEMA_VERSION, "value": version})
+
+
+def _db_schema_version() -> str | None:
+    """Get the schema version stored in the meta table (None if unknown)."""
+    try:
+        with get_db_connection() as conn:
+            return conn.execute(
+                    text("SELECT value FROM meta WHERE property = :property"),
+                    {"property": MP_SCHEMA_VERSION}).scalar_one_or_none()
+    except SQLAlchemyError:
+        return None
+
+
+def _metadata_cache_path(version: str) -> Path | None:
+    if not config.get("database_options.metadata_cache.enabled", True):
+        return None
+    directory = config.get("database_options.metadata_cache.directory",
+                           "~/.cache/jormungand")
+    return Path(directory).expanduser().joinpath(f"metadata-{version}.pickle")
+
+
+def _reflect_metadata() -> MetaData:
+    metadata = MetaData()
     set_level_sqlalchemy_loggers("WARN")
+    try:
+        for table_name in TABLES_LAYERED_DEPENDANCY_ORDER:
+            Table(table_name, metadata, autoload_with=get_db_engine())
+    finally:
+        set_level_sqlalchemy_loggers("DEBUG")
+    return metadata
+
+
+def _load_cached_metadata(path: Path) -> MetaData | None:
+    try:
+        with open(path, "rb") as cache_file:
+            # unpickling runs arbitrary code, only trust our own files
+            if os.fstat(cache_file.fileno()).st_uid != os.getuid():
+                logger.warning("ignoring table metadata cache not owned by "
+                               "the current user: %s", path)
+                return None
+            return pickle.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("ignoring unreadable table metadata cache: %s", path,
+                       exc_info=True)
+        return None
+
+
+def _store_cached_metadata(path: Path, metadata: MetaData):
+    # written to a temporary file first, so readers never see a partial file
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with open(temp_path, "wb") as cache_file:
+            pickle.dump(metadata, cache_file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except OSError:
+        logger.warning("failed to write table metadata cache: %s", path,
+                       exc_info=True)
+        temp_path.unlink(missing_ok=True)
+
+
+def load_db_tables():
+    """Load the table metadata of the database.
+
+    Reflecting the tables takes several catalog queries per table, so the
+    reflected metadata is cached on disk (see the
+    ``database_options.metadata_cache`` settings), keyed by the schema
+    version stored in the meta table. With a cached metadata loading the
+    tables only takes a single query (of the schema version). Databases
+    without a schema version are always reflected (see
+    ``stamp_schema_version``).
+    """
+    global _tables, metadata_obj
+    version = _db_schema_version()
+    cache_path = (_metadata_cache_path(version)
+                  if version is not None else None)
+    metadata = (_load_cached_metadata(cache_path)
+                if cache_path is not None else None)
+    if metadata is None:
+        metadata = _reflect_metadata()
+        if cache_path is not None:
+            _store_cached_metadata(cache_path, metadata)
+    metadata_obj = metadata
     _tables = {
-        table_name: Table(table_name, metadata_obj,
-                          autoload_with=get_db_engine())
+        table_name: metadata.tables[table_name]
         for table_name in TABLES_LAYERED_DEPENDANCY_ORDER
     }
-    set_level_sqlalchemy_loggers("DEBUG")
 
 
 def get_table(table: str | Table) -> Table:
@@ -122,6 +494,17 @@ def get_table(table: str | Table) -> Table:
     return _table
 
 
+async def async_get_table(table: str | Table) -> Table:
+    """Async variant of ``get_table``.
+
+    If the tables are not loaded yet they are loaded in a worker thread
+    (loading them blocks, e.g. reflecting the tables).
+    """
+    if _tables is None:
+        await asyncio.to_thread(load_db_tables)
+    return get_table(table)
+
+
 def table_name_sort_key(table_name):
     """TODO: Docstring for table_name_sort_key.
 
@@ -163,7 +546,10 @@ def get_db_connection(begin_once: bool = True) -> Connection | object:
             connection = get_db_engine().begin
         else:
             connection = get_db_engine().connect
+        requested_at = time.perf_counter()
         with connection() as conn:
+            get_metrics_registry().observe(
+                    MN_POOL_WAIT, time.perf_counter() - requested_at)
             yield conn
     except Exception:
         raise
@@ -171,6 +557,29 @@ def get_db_connection(begin_once: bool = True) -> Connection | object:
         pass
 
 
+@contextlib.asynccontextmanager
+async def get_async_db_connection(begin_once: bool = True):
+    """Get an sqlalchemy async database connection.
+
+    The async variant of ``get_db_connection`` (with the same transaction
+    contexts), the tables of ``get_table`` can be used with it.
+
+    :begin_once: True (default) for begin once transaction context,
+        False for normal transaction context.
+    :returns: An ``AsyncConnection`` (to be used as an async context
+        manager, i.e. ``async with get_async_db_connection() as conn:...``)
+    """
+    if begin_once:
+        connection = get_async_db_engine().begin
+    else:
+        connection = get_async_db_engine().connect
+    requested_at = time.perf_counter()
+    async with connection() as conn:
+        get_metrics_registry().observe(
+                MN_POOL_WAIT, time.perf_counter() - requested_at)
+        yield conn
+
+
 def init_db(confirm_init_db=False):
     """.. IMPORTANT::
             for the moment this is only meant for unittests,
@@ -191,6 +600,9 @@ def init_db(confirm_init_db=False):
     custom_functions = text(_SQL_CUSTOM_FUNCTIONS.read_text())
     with get_db_connection(begin_once=False) as conn:
         conn.execute(schema)
+        conn.execute(_STAMP_SCHEMA_VERSION,
+                     {"property": MP_SCHEMA_VERSION,
+                      "value": schema_version()})
         conn.commit()
         table = get_table(TN_USER_ROLES)
         data = [
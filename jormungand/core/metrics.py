@@ -0,0 +1,148 @@
+"""In-process metrics.
+
+Metrics are held by a ``MetricsRegistry``: counters and histograms (of
+timings, sizes, ...), optionally broken down by a label (e.g. the
+normalized SQL of a statement). ``MetricsRegistry.snapshot`` gives all
+of them as a (JSON serializable) dictionary.
+"""
+from collections import deque
+import math
+import threading
+from typing import Hashable
+
+from .config import config
+
+OTHER_LABEL = "<other>"
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """The distribution of observed values.
+
+    The count, sum and maximum cover all observations, the percentiles
+    only cover the last ``window`` observations.
+
+    :window: The number of recent observations kept for the percentiles.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._recent = deque(maxlen=window)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+
+    def observe(self, value: float):
+        self._recent.append(value)
+        self._count += 1
+        self._sum += value
+        self._max = max(self._max, value)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self._recent)
+        snapshot = {
+            "count": self._count,
+            "sum": self._sum,
+            "mean": self._sum / self._count if self._count else 0.0,
+            "max": self._max,
+        }
+        for percentile in PERCENTILES:
+            snapshot[f"p{percentile}"] = (
+                recent[math.ceil(percentile / 100 * len(recent)) - 1]
+                if recent else 0.0)
+        return snapshot
+
+
+class MetricsRegistry:
+    """A thread safe registry of counters and histograms.
+
+    A metric is either unlabeled or broken down by labels. The number of
+    labels of a metric is bounded, observations of labels past the bound
+    are accounted to the ``OTHER_LABEL`` label.
+
+    :window: The number of recent observations kept per histogram.
+    :max_labels: The maximal number of labels per metric.
+    """
+
+    def __init__(self, window: int = 1024, max_labels: int = 256):
+        self.window = window
+        self.max_labels = max_labels
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[Hashable, float]] = {}
+        self._histograms: dict[str, dict[Hashable, Histogram]] = {}
+
+    def _label(self, metrics: dict, label: Hashable) -> Hashable:
+        if (label is not None and label not in metrics
+                and len(metrics) >= self.max_labels):
+            return OTHER_LABEL
+        return label
+
+    def increment(self, name: str, amount: float = 1,
+                  label: Hashable = None):
+        """Add amount to a counter."""
+        with self._lock:
+            counters = self._counters.setdefault(name, {})
+            label = self._label(counters, label)
+            counters[label] = counters.get(label, 0) + amount
+
+    def observe(self, name: str, value: float, label: Hashable = None):
+        """Record an observation of a histogram."""
+        with self._lock:
+            histograms = self._histograms.setdefault(name, {})
+            label = self._label(histograms, label)
+            histogram = histograms.get(label)
+            if histogram is None:
+                histogram = histograms[label] = Histogram(self.window)
+            histogram.observe(value)
+
+    def reset(self):
+        """Drop all the metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _unlabeled(metrics: dict) -> dict:
+        if set(metrics) == {None}:
+            return metrics[None]
+        return metrics
+
+    def snapshot(self) -> dict:
+        """Get the current value of all the metrics.
+
+        :returns: dictionary with the "counters" and "histograms" by name,
+            the value of a labeled metric is a dictionary by label (see
+            ``Histogram.snapshot`` for the value of a histogram).
+        """
+        with self._lock:
+            return {
+                "counters": {
+                    name: self._unlabeled(dict(counters))
+                    for name, counters in self._counters.items()
+                },
+                "histograms": {
+                    name: self._unlabeled({
+                        label: histogram.snapshot()
+                        for label, histogram in histograms.items()
+                    })
+                    for name, histograms in self._histograms.items()
+                },
+            }
+
+
+_registry: MetricsRegistry | None = None
+
+
+def load_metrics_registry(testing_registry: MetricsRegistry = None):
+    global _registry
+    if testing_registry is None:
+        _registry = MetricsRegistry(
+                window=config.get("metrics.window", 1024),
+                max_labels=config.get("metrics.max_labels", 256))
+    else:
+        _registry = testing_registry
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    if _registry is None:
+        load_metrics_registry()
+    return _registry
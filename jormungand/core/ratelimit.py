@@ -0,0 +1,109 @@
+"""Rate limiting utilities.
+
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Sequence
+
+
+class TokenBucket:
+    """A thread safe token bucket rate limiter with priorities.
+
+    Tokens are added at ``rate`` tokens per second, up to ``burst`` tokens,
+    and every acquisition takes a single token. Priorities are served by
+    reserved headroom: an acquisition of a given priority only succeeds if
+    it leaves at least that priority's reserve of tokens in the bucket, so
+    under load the last tokens are kept for higher priority callers.
+
+    :rate: The sustained number of acquisitions per second.
+    :burst: The maximal number of tokens held by the bucket.
+    :reserves: The number of tokens acquisitions of each priority must
+        leave in the bucket, indexed by priority (0 is the highest
+        priority, priorities past the end use the last reserve).
+    :timer: The clock used for refilling (mostly useful for testing).
+    :raises ValueError: If the rate is not positive, or a reserve is
+        negative or leaves no room for a token in a full bucket (i.e.
+        ``burst < 1 + max(reserves)``).
+    """
+
+    def __init__(self, rate: float, burst: float,
+                 reserves: Sequence[float] = (0,),
+                 timer: Callable[[], float] = time.monotonic):
+        reserves = tuple(reserves)
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        if not reserves or min(reserves) < 0:
+            raise ValueError(
+                    f"reserves must be non negative, got {reserves}")
+        if burst < 1 + max(reserves):
+            raise ValueError(
+                    f"burst ({burst}) must leave room for one token on top"
+                    f" of the largest reserve ({max(reserves)})")
+        self.rate = rate
+        self.burst = burst
+        self.reserves = reserves
+        self._timer = timer
+        self._tokens = float(burst)
+        self._updated_at = timer()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._throttled = 0
+        self._pauses = 0
+
+    def _reserve(self, priority: int) -> float:
+        return self.reserves[min(priority, len(self.reserves) - 1)]
+
+    def try_acquire(self, priority: int = 0) -> float:
+        """Try to take a token without waiting.
+
+        :returns: 0 if a token was taken, otherwise the (estimated) number
+            of seconds to wait before trying again.
+        """
+        with self._lock:
+            now = self._timer()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            needed = 1 + self._reserve(priority)
+            if self._tokens >= needed:
+                self._tokens -= 1
+                self._acquired += 1
+                return 0.0
+            self._throttled += 1
+            return (needed - self._tokens) / self.rate
+
+    def acquire(self, priority: int = 0):
+        """Take a token, waiting as long as needed."""
+        while (wait := self.try_acquire(priority)) > 0:
+            time.sleep(wait)
+
+    async def async_acquire(self, priority: int = 0):
+        """Take a token, waiting (without blocking the loop) as needed."""
+        while (wait := self.try_acquire(priority)) > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for the next ``seconds`` seconds.
+
+        The bucket is emptied as well, so it ramps up again afterwards.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until,
+                                     self._timer() + seconds)
+            self._tokens = 0.0
+            self._updated_at = self._paused_until
+            self._pauses += 1
+
+    def stats(self) -> dict:
+        """Get the number of acquired tokens, throttled tries and pauses."""
+        with self._lock:
+            return {
+                "acquired": self._acquired,
+                "throttled": self._throttled,
+                "pauses": self._pauses,
+            }
@@ -0,0 +1,98 @@
+"""Request coalescing ("single-flight") utilities.
+
+A single-flight group makes sure that concurrent calls sharing the same
+key are only executed once: the first caller executes the call while
+callers arriving before it finishes wait for, and share, its result
+(or exception). Calls arriving after it finished execute anew.
+"""
+import asyncio
+from concurrent.futures import Future
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Single-flight group for (thread based) concurrent calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self._stats = {"executed": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any],
+           *args, **kwargs) -> Any:
+        """Execute ``fn(*args, **kwargs)`` unless a call for key is in flight.
+
+        :key: Calls with equal keys are coalesced.
+        :returns: The result of the (possibly shared) call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = Future()
+                self._stats["executed"] += 1
+            else:
+                self._stats["shared"] += 1
+        if not is_leader:
+            return call.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as err:
+            call.set_exception(err)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> dict:
+        """Get the number of executed and shared (coalesced) calls."""
+        with self._lock:
+            return dict(self._stats)
+
+
+class AsyncSingleFlight:
+    """Single-flight group for asyncio tasks (of a single event loop).
+
+    The shared call runs in a task of its own, so cancelling a caller
+    (the first one included) does not cancel the call for the others: the
+    call keeps running until it finishes, even if all its callers were
+    cancelled.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self._stats = {"executed": 0, "shared": 0}
+
+    def _call_done(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # Mark the exception (if any) as retrieved, the callers get it
+            # anyway (and there might be none left to await the call).
+            call.exception()
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]],
+                 *args, **kwargs) -> Any:
+        """Await ``fn(*args, **kwargs)`` unless a call for key is in flight.
+
+        :key: Calls with equal keys are coalesced.
+        :returns: The result of the (possibly shared) call.
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self._stats["shared"] += 1
+        else:
+            call = self._calls[key] = asyncio.ensure_future(
+                    fn(*args, **kwargs))
+            call.add_done_callback(
+                    lambda call: self._call_done(key, call))
+            self._stats["executed"] += 1
+        return await asyncio.shield(call)
+
+    def stats(self) -> dict:
+        """Get the number of executed and shared (coalesced) calls."""
+        return dict(self._stats)
@@ -4,19 +4,41 @@ CREATE OR REPLACE FUNCTION GET_AIRPORTS_BY_SUBSTRING(
     _substring text, _limit integer
 )
 /*
-    Returns `_limit` top airports containing `_substring`
-    in their IATA code/country code/country name/principality/airport name.
+    Returns the `_limit` best matching (distinct) airports containing
+    `_substring` in their country code/IATA code/country name/municipality/
+    airport name.
+
+    Each airport is ranked by its best matching search string:
+    exact matches rank before prefix matches which rank before other
+    substring matches, ties are broken by the search string priority
+    (see `airports_search_strings`) and then by the search string itself.
 */
 RETURNS SETOF airports_join_countries AS $$
-    WITH id_matches AS (
-        SELECT airport_id
-        FROM airports_search_strings
-        WHERE search_string ILIKE ('%' ||
-            regexp_replace(_substring, '([\%_])', '\\\1', 'g')
-            || '%') ESCAPE '\'
-        LIMIT _limit + 1 -- +1 due to the table header also counting a row.
+    WITH pattern AS (
+        SELECT regexp_replace(_substring, '([\%_])', '\\\1', 'g') AS escaped
+    ),
+    best_matches AS (
+        SELECT DISTINCT ON (airport_id)
+            airport_id,
+            CASE
+                WHEN lower(search_string) = lower(_substring) THEN 1
+                WHEN search_string ILIKE (pattern.escaped || '%') ESCAPE '\'
+                    THEN 2
+                ELSE 3
+            END AS match_rank,
+            priority,
+            search_string
+        FROM airports_search_strings, pattern
+        WHERE search_string ILIKE ('%' || pattern.escaped || '%') ESCAPE '\'
+        ORDER BY airport_id, match_rank, priority, search_string
     )
-    SELECT *
-    FROM airports_join_countries
-    WHERE airport_id IN (SELECT airport_id FROM id_matches);
+    SELECT ajc.*
+    FROM best_matches
+    INNER JOIN airports_join_countries AS ajc USING (airport_id)
+    ORDER BY
+        best_matches.match_rank ASC,
+        best_matches.priority ASC,
+        best_matches.search_string ASC,
+        airport_id ASC
+    LIMIT _limit;
 $$ LANGUAGE SQL;
@@ -7,7 +7,9 @@ DROP TABLE IF EXISTS airports CASCADE;
 DROP TABLE IF EXISTS meta CASCADE;
 
 DROP VIEW IF EXISTS airports_join_countries CASCADE;
-DROP VIEW IF EXISTS airports_search_strings CASCADE;
+DROP MATERIALIZED VIEW IF EXISTS airports_search_strings CASCADE;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 CREATE TABLE user_roles (
     user_role_id smallserial PRIMARY KEY,
@@ -68,7 +70,12 @@ AS SELECT
 FROM airports AS air
 INNER JOIN countries AS cou USING (country_id);
 
-CREATE VIEW airports_search_strings
+/*
+    Materialized (and indexed) since it is read on every airport search but
+    only changes on airport data imports, which have to refresh it
+    (see `dal.airports.refresh_airports_search_strings`).
+*/
+CREATE MATERIALIZED VIEW airports_search_strings
 AS SELECT
     country_code AS search_string,
     airport_id,
@@ -97,7 +104,10 @@ SELECT
     airport_name AS search_string,
     airport_id,
     5 AS priority
-FROM airports_join_countries
-ORDER BY
-    priority ASC,
-    search_string ASC;
+FROM airports_join_countries;
+
+CREATE INDEX airports_search_strings_trgm_idx
+ON airports_search_strings USING GIN (search_string gin_trgm_ops);
+
+CREATE INDEX airports_search_strings_priority_idx
+ON airports_search_strings (priority, search_string);
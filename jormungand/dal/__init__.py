@@ -1,6 +1,10 @@
 from .airports import airports_init_data
+from .airports import async_get_airports_by_substring
 from .airports import get_airports_by_substring
+from .airports import refresh_airports_search_strings
 from .countries import countries_get_code_to_id_map
 from .countries import countries_init_data
 from .ourairports import oa_airports_get_all
+from .ourairports import oa_airports_iter
 from .ourairports import oa_countries_get_all
+from .ourairports import oa_countries_iter
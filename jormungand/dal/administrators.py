@@ -28,6 +28,10 @@ def add_many(data: list[dict]) -> list[dict]:
     return base.add_many(TABLE_NAME, ID_C_NAME, data)
 
 
+def bulk_add_many(data: list[dict]) -> dict:
+    return base.bulk_add_many(TABLE_NAME, ID_C_NAME, data)
+
+
 def update(data: dict) -> dict:
     return base.update(TABLE_NAME, ID_C_NAME, data)
 
@@ -2,10 +2,17 @@
 
 """
 
+import asyncio
+import threading
+from typing import Iterable
+
 import sqlalchemy as sa
 
 from . import base
+from .airports_search_index import AirportsSearchIndex
 from jormungand.core import db
+from jormungand.core.cache import TTLLRUCache
+from jormungand.core.config import config
 from jormungand.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -13,35 +20,163 @@ logger = get_logger(__name__)
 _TABLE_NAME = db.TN_AIRPORTS
 _ID_C_NAME = "airport_id"
 
+_GET_AIRPORTS_BY_SUBSTRING = sa.text(
+        "SELECT * FROM GET_AIRPORTS_BY_SUBSTRING(:substring, :limit)")
+
+_search_index: AirportsSearchIndex | None = None
+_search_index_lock = threading.Lock()
+_search_cache = TTLLRUCache(
+        maxsize=config.get("airports.search_cache.maxsize", 1024),
+        ttl=config.get("airports.search_cache.ttl", 300))
+# Incremented by every invalidation, so results of searches that were
+# running during an invalidation (i.e. possibly of the old data) are not
+# cached.
+_search_cache_generation = 0
+_search_cache_lock = threading.Lock()
+
+
+def invalidate_search_caches():
+    """Drop all in-process airport search data (e.g. after a data reload).
+
+    This drops both the search index and the search results cache.
+
+    .. note::
+        This only affects the current process, other processes pick up
+        reloaded data when they are restarted (or, for the results cache,
+        when their cached results expire).
+    """
+    global _search_index, _search_cache_generation
+    with _search_index_lock:
+        _search_index = None
+    with _search_cache_lock:
+        _search_cache_generation += 1
+        _search_cache.clear()
+
+
+def _cache_search_result(cache_key: tuple, generation: int, result: tuple):
+    """Cache a search result, unless the caches were invalidated since the
+    search started (at the given generation)."""
+    with _search_cache_lock:
+        if generation == _search_cache_generation:
+            _search_cache.set(cache_key, result)
+
+
+def search_cache_stats() -> dict:
+    """Get the hit/miss/eviction counters of the search results cache."""
+    return _search_cache.stats()
+
+
+def _get_search_index() -> AirportsSearchIndex:
+    global _search_index
+    search_index = _search_index
+    if search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                with db.get_db_connection() as conn:
+                    airports = conn.execute(sa.text(
+                        "SELECT * FROM airports_join_countries"
+                        )).mappings().all()
+                _search_index = AirportsSearchIndex(airports)
+                logger.info("airports search index loaded (%d airports)",
+                            len(_search_index))
+            search_index = _search_index
+    return search_index
 
-def airports_init_data(data: list[dict]):
+
+def airports_init_data(
+        data: Iterable[dict], chunk_size: int = base.BULK_LOAD_CHUNK_SIZE
+        ) -> int:
     """Remove all existing airports data from the db and add new data instead.
 
-    :data: The new airports data that is to be inserted into the database.
-    :returns: None
+    :data: The new airports data that is to be inserted into the database,
+        may be any iterable (e.g. a generator) of entries.
+    :chunk_size: The maximal number of entries sent to the db at once.
+    :returns: The number of airports inserted into the database.
     """
-    base.init_table_data(_TABLE_NAME, data)
+    try:
+        return base.init_table_data(_TABLE_NAME, data, chunk_size)
+    finally:
+        invalidate_search_caches()
+
 
+def refresh_airports_search_strings():
+    """Refresh the airports_search_strings materialized view.
 
-def get_airports_by_substring(substring: str, limit: int = 5) -> list[dict]:
-    """Get a small selection of airports matching a substring.
+    Has to be called after the airports/countries data changes, otherwise
+    db side airport searches keep returning results for the old data.
+    """
+    with db.get_db_connection() as conn:
+        conn.execute(sa.text(
+            "REFRESH MATERIALIZED VIEW airports_search_strings"))
+    invalidate_search_caches()
 
-    The substring is matched against:
 
-    1. Airport IATA code
-    2. Airport country code
+def get_airports_by_substring(
+        substring: str, limit: int = 5, use_index: bool = False
+        ) -> list[dict]:
+    """Get a small selection of the best airports matching a substring.
+
+    The substring is matched (case insensitively) against:
+
+    1. Airport country code
+    2. Airport IATA code
     3. Airport country name
-    4. Airport principality
+    4. Airport municipality
     5. Airport airport name
 
+    Each airport is returned at most once and the airports are ranked by
+    their best matching field: exact matches first (e.g. an exact IATA
+    code), then prefix matches and then other substring matches, with ties
+    broken by the above field order.
+
+    db side search results are cached in a bounded TTL/LRU cache (keyed
+    by the case folded substring and the limit), see the
+    ``airports.search_cache`` settings and ``search_cache_stats``.
+
     :substring: The substring to match against the above fields.
-    :limit: The number of results to return.
-    :returns: A short list of airport matches.
+    :limit: The maximal number of (distinct) airports to return.
+    :use_index: If set to True the search is answered from an in-process
+        search index (loaded from the db on first use) instead of by the db.
+    :returns: A short list of airport matches, best matches first.
     """
-    with db.get_db_connection() as conn:
-        result = conn.execute(sa.text(
-            """
-            SELECT * FROM GET_AIRPORTS_BY_SUBSTRING(:substring, :limit)
-            """), {"substring": substring, "limit": limit}
-            ).mappings().all()
-        return [dict(entry) for entry in result]
+    if use_index:
+        return _get_search_index().search(substring, limit)
+    cache_key = (substring.casefold(), limit)
+    result = _search_cache.get(cache_key)
+    if result is None:
+        generation = _search_cache_generation
+        with db.get_db_connection() as conn:
+            result = conn.execute(
+                _GET_AIRPORTS_BY_SUBSTRING,
+                {"substring": substring, "limit": limit}
+                ).mappings().all()
+        result = tuple(dict(entry) for entry in result)
+        _cache_search_result(cache_key, generation, result)
+    return [dict(entry) for entry in result]
+
+
+async def async_get_airports_by_substring(
+        substring: str, limit: int = 5, use_index: bool = False
+        ) -> list[dict]:
+    """Async variant of ``get_airports_by_substring``.
+
+    Both variants share the search results cache and the search index (if
+    the search index is not loaded yet it is loaded in a worker thread).
+    """
+    if use_index:
+        search_index = _search_index
+        if search_index is None:
+            search_index = await asyncio.to_thread(_get_search_index)
+        return search_index.search(substring, limit)
+    cache_key = (substring.casefold(), limit)
+    result = _search_cache.get(cache_key)
+    if result is None:
+        generation = _search_cache_generation
+        async with db.get_async_db_connection() as conn:
+            result = (await conn.execute(
+                _GET_AIRPORTS_BY_SUBSTRING,
+                {"substring": substring, "limit": limit}
+                )).mappings().all()
+        result = tuple(dict(entry) for entry in result)
+        _cache_search_result(cache_key, generation, result)
+    return [dict(entry) for entry in result]
@@ -0,0 +1,111 @@
+"""In-process search index for airport autocomplete.
+
+The set of airports served by the app is small and (mostly) static, so
+substring searches over it can be answered from memory instead of by the
+database (see ``GET_AIRPORTS_BY_SUBSTRING`` in ``core/sql``).
+
+The index mirrors the ``airports_search_strings`` view: every airport
+contributes one search string per search field, and search strings are
+ordered by field priority and then alphabetically. Results are ranked the
+same way ``GET_AIRPORTS_BY_SUBSTRING`` ranks them, i.e. by each airport's
+best matching search string: exact matches, then prefix matches, then
+other substring matches, with ties broken by the search string order.
+
+Substring lookups are served by an n-gram inverted index:
+
+* Queries of up to ``MAX_GRAM_LENGTH`` characters are looked up directly.
+* Longer queries are narrowed down to the posting list of their rarest
+  ``MAX_GRAM_LENGTH``-gram and then verified with a plain substring check.
+
+All matching is case insensitive (the equivalent of ``ILIKE``).
+"""
+
+from collections import defaultdict
+from typing import Iterable
+
+# Search fields of airports_join_countries in order of priority.
+SEARCH_FIELDS = (
+    "country_code", "iata_code", "country_name", "municipality",
+    "airport_name",
+)
+MAX_GRAM_LENGTH = 3
+
+
+def _iter_grams(string: str):
+    for gram_length in range(1, MAX_GRAM_LENGTH + 1):
+        for start in range(len(string) - gram_length + 1):
+            yield string[start:start + gram_length]
+
+
+class AirportsSearchIndex:
+    """An immutable substring search index over airports.
+
+    :airports: Airport entries as returned from ``airports_join_countries``
+        (i.e. dicts containing an ``airport_id`` and the SEARCH_FIELDS).
+    """
+
+    def __init__(self, airports: Iterable[dict]):
+        self._airports: dict[int, dict] = {}
+        search_entries = []
+        for airport in airports:
+            self._airports[airport["airport_id"]] = dict(airport)
+            for priority, field in enumerate(SEARCH_FIELDS, 1):
+                if airport[field]:
+                    search_entries.append(
+                        (priority, airport[field], airport["airport_id"]))
+        search_entries.sort()
+
+        # The position of an entry in the sorted lists is its entry id,
+        # so ascending entry ids are already in the view's priority order.
+        self._entry_strings = [
+            search_string.casefold() for _, search_string, _ in search_entries
+        ]
+        self._entry_airport_ids = [
+            airport_id for _, _, airport_id in search_entries
+        ]
+        grams: defaultdict[str, list[int]] = defaultdict(list)
+        for entry_id, entry_string in enumerate(self._entry_strings):
+            for gram in set(_iter_grams(entry_string)):
+                grams[gram].append(entry_id)
+        self._grams = dict(grams)
+
+    def __len__(self) -> int:
+        return len(self._airports)
+
+    def _iter_matching_entries(self, needle: str):
+        if len(needle) <= MAX_GRAM_LENGTH:
+            yield from self._grams.get(needle, ())
+            return
+        posting_lists = [
+            self._grams.get(needle[start:start + MAX_GRAM_LENGTH], ())
+            for start in range(len(needle) - MAX_GRAM_LENGTH + 1)
+        ]
+        for entry_id in min(posting_lists, key=len):
+            if needle in self._entry_strings[entry_id]:
+                yield entry_id
+
+    def search(self, substring: str, limit: int = 5) -> list[dict]:
+        """Get a small selection of the best airports matching a substring.
+
+        :substring: The substring to match against the search fields.
+        :limit: The maximal number of (distinct) airports to return.
+        :returns: A list of airport entries, best matches first.
+        """
+        needle = substring.casefold()
+        if not needle or limit <= 0:
+            return []
+        best_ranks: dict[int, tuple[int, int]] = {}
+        for entry_id in self._iter_matching_entries(needle):
+            entry_string = self._entry_strings[entry_id]
+            if entry_string == needle:
+                match_rank = 1
+            elif entry_string.startswith(needle):
+                match_rank = 2
+            else:
+                match_rank = 3
+            airport_id = self._entry_airport_ids[entry_id]
+            rank = (match_rank, entry_id)
+            if rank < best_ranks.get(airport_id, (4, 0)):
+                best_ranks[airport_id] = rank
+        airport_ids = sorted(best_ranks, key=best_ranks.__getitem__)[:limit]
+        return [dict(self._airports[airport_id]) for airport_id in airport_ids]
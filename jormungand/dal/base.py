@@ -2,10 +2,15 @@
 
 """
 import csv
+import io
+import itertools
 from pathlib import Path
 import re
+import time
+from typing import Callable, Iterable, Iterator
 
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import NoResultFound, IntegrityError, SQLAlchemyError
 
 from jormungand.core import db
@@ -16,34 +21,52 @@ from jormungand.core.logging import get_logger
 logger = get_logger(__name__)
 
 CSV_DIR = Path(__file__).parent.joinpath("csv")
+BULK_LOAD_CHUNK_SIZE = 10000
+ADD_MANY_CHUNK_SIZE = 1000
 
 
-def get_data_from_csv(
+def iter_data_from_csv(
     dataset_path: Path,
-    field_names: dict[str, str]
-        ) -> list[dict]:
-    """Get selective data from a csv dataset.
+    field_names: dict[str, str],
+    row_filter: Callable[[dict], bool] | None = None
+        ) -> Iterator[dict]:
+    """Lazily get selective data from a csv dataset, one entry at a time.
 
-    :field_names: A dictionary used to both sa.select the fields
+    :dataset_path: The path to the csv dataset.
+    :field_names: A dictionary used to both select the fields
         that should be imported and map their csv field names
         to application conformant field names.
+    :row_filter: An optional cheap predicate applied to each raw csv row
+        (keyed by the csv field names) before it is converted, rows for
+        which it returns False are skipped.
     """
 
-    data = []
     selected_fields = set(field_names.keys())
 
     with open(dataset_path, "r", encoding="UTF-8") as dataset_file:
         dict_reader = csv.DictReader(dataset_file)
+        if row_filter is not None:
+            dict_reader = filter(row_filter, dict_reader)
         for entry in dict_reader:
-            data.append(
-                {
-                    field_names[field]: value
-                    for field, value in entry.items()
-                    if field in selected_fields
-                }
-            )
+            yield {
+                field_names[field]: value
+                for field, value in entry.items()
+                if field in selected_fields
+            }
+
+
+def get_data_from_csv(
+    dataset_path: Path,
+    field_names: dict[str, str]
+        ) -> list[dict]:
+    """Get selective data from a csv dataset.
 
-    return data
+    :field_names: A dictionary used to both sa.select the fields
+        that should be imported and map their csv field names
+        to application conformant field names.
+    """
+
+    return list(iter_data_from_csv(dataset_path, field_names))
 
 
 def get_column_to_column_map(
@@ -100,9 +123,9 @@ def _gen_unexpected_err_info(error: Exception, **kwargs) -> dict:
 
 
 def _gen_duplication_err_info(error: Exception, table: sa.Table) -> dict:
-    column_name, value = re.search(
-            r"DETAIL:  Key \(([^)+])\)=\(([^)+])\) already exists."
-            ).groups
+    match = re.search(r"Key \((.+?)\)=\((.*?)\) already exists",
+                      str(error.args[0]))
+    column_name, value = match.groups() if match else (None, None)
     return {
             "status": "DuplicationError",
             "info": {
@@ -124,15 +147,12 @@ def _insert_one(
                 }
     except IntegrityError as err:
         if "duplicate key value violates unique" in err.args[0]:
-            result = _gen_duplication_err_info(
-                    err_msg=err.args[0], table_name=table.name,
-                    data=data, action="sa.insert")
+            result = _gen_duplication_err_info(err, table)
         else:
             result = _gen_unexpected_err_info(
-                    err_msg=err.args[0], table_name=table.name, data=data)
+                    err, table=table.name, data=data)
     except SQLAlchemyError as err:
-        result = _gen_unexpected_err_info(
-                err_msg=err.args[0], table_name=table.name, data=data)
+        result = _gen_unexpected_err_info(err, table=table.name, data=data)
     return result
 
 
@@ -196,29 +216,79 @@ def safe_add_many(
     return new_data
 
 
-# TODO: if/when needed
-# def bulk_add_many(
-#         table: str | sa.Table, id_c_name: str, data: list[dict]
-#         ) -> list[dict]:
-#     input_ids = [entry[id_c_name] for entry in data]
-#     table = db.get_table(table)
-#     with db.get_db_connection() as conn:
-#         stmt = (
-#                 sa.select(table.c[id_c_name])
-#                 .where(table.c[id_c_name].in_(input_ids))
-#                 )
-#         result = conn.execute(stmt).all()
-#         existing_ids = set(row[0] for row in result)
-#         new_ids = set(input_ids) - existing_ids
-#         new_data = [
-#                 entry for entry in data
-#                 if entry[id_c_name] in new_ids
-#                 ]
-#         if new_data != []:
-#             stmt = sa.insert(table).values(new_data).returning(table)
-#             result = conn.execute(stmt).mappings().all()
-#             new_data = [dict(row) for row in result]
-#         return new_data
+def _add_chunk(
+        conn: sa.Connection, table: sa.Table, id_c_name: str,
+        chunk: list[dict], result: dict):
+    """Insert a chunk of entries, skipping conflicting ones (in a savepoint).
+
+    Inserted rows are added to ``result["inserted"]``, conflicting entries
+    to ``result["conflicted"]`` and, if the chunk fails, its entries to
+    ``result["failed"]``.
+    """
+    stmt = (postgresql.insert(table).values(chunk)
+            .on_conflict_do_nothing().returning(table))
+    try:
+        with conn.begin_nested():
+            rows = conn.execute(stmt).mappings().all()
+    except SQLAlchemyError as err:
+        logger.warning("failed to add %d entries to %s: %s",
+                       len(chunk), table.name, getattr(err, "orig", err))
+        if result["status"] == "success":
+            result.update(_gen_unexpected_err_info(err, table=table.name))
+        result["failed"].extend(chunk)
+        return
+    inserted_ids = {row[id_c_name] for row in rows}
+    result["inserted"].extend(dict(row) for row in rows)
+    for entry in chunk:
+        if entry[id_c_name] in inserted_ids:
+            # an entry repeated within the chunk is only inserted once
+            inserted_ids.remove(entry[id_c_name])
+        else:
+            result["conflicted"].append(entry)
+
+
+def bulk_add_many(
+        table: str | sa.Table, id_c_name: str, data: Iterable[dict],
+        chunk_size: int = ADD_MANY_CHUNK_SIZE
+        ) -> dict:
+    """Add multiple entries, skipping entries that conflict with existing ones.
+
+    Each chunk of entries is sent as a single
+    ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` statement (in a
+    savepoint of its own, so a chunk with invalid data does not abort the
+    other chunks), all within a single transaction.
+
+    :table: The table into which the entries are added.
+    :id_c_name: The name of a unique column, set by all the entries, used
+        to tell the inserted entries from the conflicting ones.
+    :data: The entries (dicts sharing the same keys, matching table
+        columns), may be any iterable (e.g. a generator).
+    :chunk_size: The maximal number of entries sent to the db at once.
+    :returns: status dictionary with the "inserted" rows (as returned by
+        the db), and the "conflicted" and "failed" (in chunks with invalid
+        data) entries. The "status" is "success" unless a chunk failed, in
+        which case the "info" of the first failure is included.
+    """
+    table = db.get_table(table)
+    result = {"status": "success", "inserted": [], "conflicted": [],
+              "failed": []}
+    with db.get_db_connection() as conn:
+        for chunk in _iter_chunks(data, chunk_size):
+            _add_chunk(conn, table, id_c_name, chunk, result)
+    return result
+
+
+def add_many(
+        table: str | sa.Table, id_c_name: str, data: Iterable[dict],
+        chunk_size: int = ADD_MANY_CHUNK_SIZE
+        ) -> list[dict]:
+    """Add multiple entries, skipping entries that already exist.
+
+    See ``bulk_add_many``.
+
+    :returns: The added rows (as returned by the db).
+    """
+    return bulk_add_many(table, id_c_name, data, chunk_size)["inserted"]
 
 
 def update(table: str | sa.Table, id_c_name: str, data: dict) -> dict:
@@ -252,18 +322,185 @@ def delete(table: str | sa.Table, id_c_name: str, id_: int) -> dict:
         return dict(result)
 
 
-def init_table_data(table: str | sa.Table, data: list[dict]):
+async def async_get_by_id(
+        table: str | sa.Table, id_c_name: str, id_: int) -> dict:
+    """Async variant of ``get_by_id``."""
+    table = await db.async_get_table(table)
+    async with db.get_async_db_connection() as conn:
+        stmt = sa.select(table).where(table.c[id_c_name] == id_)
+        result = (await conn.execute(stmt)).mappings().one_or_none()
+        if result is not None:
+            return dict(result)
+        else:
+            raise DataNotFoundError(table_name=table.name,
+                                    column_name=id_c_name, value=id_)
+
+
+async def async_get_all(table: str) -> list[dict]:
+    """Async variant of ``get_all``."""
+    table = await db.async_get_table(table)
+    async with db.get_async_db_connection() as conn:
+        stmt = sa.select(table)
+        result = (await conn.execute(stmt)).mappings().all()
+        return list(dict(mapping) for mapping in result)
+
+
+async def async_add_one(
+        table: str | sa.Table, id_c_name: str, data: dict) -> dict:
+    """Async variant of ``add_one``."""
+    table = await db.async_get_table(table)
+    async with db.get_async_db_connection() as conn:
+        return await conn.run_sync(_insert_one, table, id_c_name, data)
+
+
+async def async_update(
+        table: str | sa.Table, id_c_name: str, data: dict) -> dict:
+    """Async variant of ``update``."""
+    table = await db.async_get_table(table)
+    async with db.get_async_db_connection() as conn:
+        stmt = (sa.update(table)
+                .where(table.c[id_c_name] == data[id_c_name])
+                .values(data).returning(table)
+                )
+        try:
+            result = (await conn.execute(stmt)).mappings().one()
+        except NoResultFound:
+            raise DataNotFoundError(table_name=table.name,
+                                    column_name=id_c_name,
+                                    value=data[id_c_name])
+        except IntegrityError as e:
+            raise InvalidDataError(e.args[0])
+        return dict(result)
+
+
+async def async_delete(
+        table: str | sa.Table, id_c_name: str, id_: int) -> dict:
+    """Async variant of ``delete``."""
+    table = await db.async_get_table(table)
+    async with db.get_async_db_connection() as conn:
+        stmt = (sa.delete(table).where(table.c[id_c_name] == id_)
+                .returning(table))
+        try:
+            result = (await conn.execute(stmt)).mappings().one()
+        except NoResultFound:
+            raise DataNotFoundError(table_name=table.name,
+                                    column_name=id_c_name, value=id_)
+        return dict(result)
+
+
+def _copy_text_value(value) -> str:
+    """Format a single value for a PostgreSQL ``COPY ... (FORMAT text)``."""
+    if value is None:
+        return "\\N"
+    return (str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r"))
+
+
+def _copy_chunk(conn: sa.Connection, table: sa.Table, chunk: list[dict]):
+    """Load a chunk of rows into a table via ``COPY ... FROM STDIN``.
+
+    The column list is taken from the first entry in the chunk, all the
+    entries in the chunk are expected to share the same keys.
+
+    COPY goes through the raw DBAPI cursor, bypassing the engine's
+    statement instrumentation (and SQLAlchemy's logging), so it is timed
+    and recorded here.
+    """
+    column_names = list(chunk[0].keys())
+    buffer = io.StringIO()
+    for entry in chunk:
+        buffer.write("\t".join(
+                _copy_text_value(entry[column_name])
+                for column_name in column_names))
+        buffer.write("\n")
+    buffer.seek(0)
+    preparer = conn.dialect.identifier_preparer
+    copy_stmt = "COPY {table} ({columns}) FROM STDIN".format(
+            table=preparer.format_table(table),
+            columns=", ".join(
+                preparer.quote(column_name) for column_name in column_names))
+    start_time = time.perf_counter()
+    try:
+        with conn.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(copy_stmt, buffer)
+    except Exception:
+        db.record_statement(copy_stmt, time.perf_counter() - start_time,
+                            failed=True)
+        raise
+    elapsed_time = time.perf_counter() - start_time
+    db.record_statement(copy_stmt, elapsed_time, rowcount=len(chunk))
+    logger.debug("copied %d rows into %s in %.3fs",
+                 len(chunk), table.name, elapsed_time)
+
+
+def _iter_chunks(
+        data: Iterable[dict], chunk_size: int
+        ) -> Iterator[list[dict]]:
+    """Split an iterable of entries into lists of up to chunk_size entries."""
+    data = iter(data)
+    while chunk := list(itertools.islice(data, chunk_size)):
+        yield chunk
+
+
+def bulk_load(
+        conn: sa.Connection, table: sa.Table, data: Iterable[dict],
+        chunk_size: int = BULK_LOAD_CHUNK_SIZE
+        ) -> int:
+    """Stream entries into a table in bounded chunks.
+
+    On PostgreSQL (psycopg2) each chunk is sent via ``COPY ... FROM STDIN``,
+    on other dialects each chunk is sent as an executemany ``INSERT``.
+    Either way at most ``chunk_size`` entries are held in memory at once,
+    which makes it possible to pass a generator as the data.
+
+    :conn: The connection to load the data with, the caller is
+        responsible for committing the transaction.
+    :table: The table into which the data is to be loaded.
+    :data: An iterable of entries (dicts with keys matching table columns).
+    :chunk_size: The maximal number of entries sent to the db at once.
+    :returns: The number of entries loaded.
+    """
+    use_copy = (conn.dialect.name == "postgresql"
+                and conn.dialect.driver == "psycopg2")
+    row_count = 0
+    start_time = time.perf_counter()
+    for chunk in _iter_chunks(data, chunk_size):
+        if use_copy:
+            _copy_chunk(conn, table, chunk)
+        else:
+            conn.execute(sa.insert(table), chunk)
+        row_count += len(chunk)
+    elapsed_time = time.perf_counter() - start_time
+    logger.info(
+            "bulk loaded %d rows into %s in %.3fs (%.0f rows/sec, %s)",
+            row_count, table.name, elapsed_time,
+            row_count / elapsed_time if elapsed_time > 0 else 0.0,
+            "COPY" if use_copy else "executemany")
+    return row_count
+
+
+def init_table_data(
+        table: str | sa.Table, data: Iterable[dict],
+        chunk_size: int = BULK_LOAD_CHUNK_SIZE
+        ) -> int:
     """Remove all existing data from a table and add new data instead.
 
+    The table is truncated and reloaded within a single transaction and
+    the new data is streamed into the table with ``bulk_load``.
+
     :table: The table to be initialized with new data.
     :data: The new data that is to be inserted into the table.
-    :returns: None
+    :chunk_size: The maximal number of entries sent to the db at once.
+    :returns: The number of entries inserted into the table.
     """
     table = db.get_table(table)
     with db.get_db_connection(begin_once=False) as conn:
         conn.execute(sa.text(
             f"TRUNCATE TABLE {table.name} RESTART IDENTITY CASCADE"
             ))
+        row_count = bulk_load(conn, table, data, chunk_size)
         conn.commit()
-        conn.execute(sa.insert(table).values(data))
-        conn.commit()
+    return row_count
@@ -2,9 +2,12 @@
 
 """
 
+from typing import Iterable
+
 from sqlalchemy import select
 
 from . import base
+from .airports import invalidate_search_caches
 from jormungand.core import db
 from jormungand.core.logging import get_logger
 
@@ -14,13 +17,20 @@ _TABLE_NAME = db.TN_COUNTRIES
 _ID_C_NAME = "country_id"
 
 
-def countries_init_data(data: list[dict]):
+def countries_init_data(
+        data: Iterable[dict], chunk_size: int = base.BULK_LOAD_CHUNK_SIZE
+        ) -> int:
     """Remove all existing countries data from the db and add new data instead.
 
-    :data: The new countries data that is to be inserted into the database.
-    :returns: None
+    :data: The new countries data that is to be inserted into the database,
+        may be any iterable (e.g. a generator) of entries.
+    :chunk_size: The maximal number of entries sent to the db at once.
+    :returns: The number of countries inserted into the database.
     """
-    base.init_table_data(_TABLE_NAME, data)
+    try:
+        return base.init_table_data(_TABLE_NAME, data, chunk_size)
+    finally:
+        invalidate_search_caches()
 
 
 def countries_get_code_to_id_map() -> dict[str, int]:
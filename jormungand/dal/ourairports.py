@@ -2,30 +2,48 @@
 
 This module is responsible for reading country and airport data from the
 datasets provided by https://ourairports.com/ .
+
+The ``oa_*_iter`` functions read the datasets lazily (one entry at a time)
+and are meant for streaming imports, the ``oa_*_get_all`` functions
+return the complete datasets as lists.
 """
 
-from .base import CSV_DIR, get_data_from_csv
+from typing import Container, Iterator
+
+from .base import CSV_DIR, iter_data_from_csv
 
 _DATASET_COUNTRIES = CSV_DIR.joinpath("countries.csv")
 _DATASET_AIRPORTS = CSV_DIR.joinpath("airports.csv")
 
 
-def oa_countries_get_all() -> list[dict]:
-    """Get selective countries data from the OurAirports csv dataset.
+def oa_countries_iter() -> Iterator[dict]:
+    """Lazily get selective countries data from the OurAirports csv dataset.
 
     Currently the data imported is:
     * code: Country ISO 3166-1 alpha-2 codes.
     * name: Country names.
     """
 
-    return get_data_from_csv(
+    return iter_data_from_csv(
         dataset_path=_DATASET_COUNTRIES,
         field_names={"code": "code", "name": "name"}
     )
 
 
-def oa_airports_get_all() -> list[dict]:
-    """Get selective airport data from the OurAirports csv dataset.
+def oa_countries_get_all() -> list[dict]:
+    """Get selective countries data from the OurAirports csv dataset.
+
+    See ``oa_countries_iter`` for details.
+    """
+
+    return list(oa_countries_iter())
+
+
+def oa_airports_iter(
+        airport_types: Container[str] | None = None,
+        require_iata_code: bool = False
+        ) -> Iterator[dict]:
+    """Lazily get selective airport data from the OurAirports csv dataset.
 
     Currently the data imported is:
     * iso_country->country_code: Airport country ISO 3166-1 alpha-2 codes.
@@ -34,9 +52,20 @@ def oa_airports_get_all() -> list[dict]:
     * name: Airport names.
     * municipality: Airport municipalities.
 
+    Only a small fraction of the airports in the dataset are usually
+    of interest, so the dataset can be pre-filtered at read time with
+    cheap column checks, before any of the rows are converted/validated.
+
+    :airport_types: If given, only airports of these types are returned.
+    :require_iata_code: If set to True, airports without an IATA code
+        are skipped.
     """
 
-    return get_data_from_csv(
+    def row_filter(row: dict) -> bool:
+        return ((airport_types is None or row["type"] in airport_types)
+                and (not require_iata_code or row["iata_code"] != ""))
+
+    return iter_data_from_csv(
         dataset_path=_DATASET_AIRPORTS,
         field_names={
             "iso_country": "country_code",
@@ -45,4 +74,14 @@ def oa_airports_get_all() -> list[dict]:
             "name": "name",
             "municipality": "municipality",
         },
+        row_filter=row_filter,
     )
+
+
+def oa_airports_get_all() -> list[dict]:
+    """Get selective airport data from the OurAirports csv dataset.
+
+    See ``oa_airports_iter`` for details.
+    """
+
+    return list(oa_airports_iter())
@@ -0,0 +1,132 @@
+"""Compact internal representation of flight offers.
+
+Flight offers are held as immutable slotted dataclasses instead of the
+(deeply nested and very repetitive) provider responses:
+
+* Codes (airports, carriers, aircraft, currencies) are interned strings.
+* Equal segments and itineraries shared by several offers are stored once.
+* Descriptive names (of carriers and aircraft) are kept once per listing
+  instead of being looked up per offer.
+
+``FlightOffersListing.to_dict`` gives the (JSON serializable) form sent
+to clients, and ``FlightOffersListing.query`` filters and sorts the offers
+(see ``query.OffersTable``).
+"""
+from dataclasses import dataclass, field
+import datetime as dt
+from decimal import Decimal
+
+from .query import OffersTable
+
+
+@dataclass(frozen=True, slots=True)
+class FlightSegment:
+    departure_airport: str
+    departure_terminal: str | None
+    departure_at: dt.datetime
+    arrival_airport: str
+    arrival_terminal: str | None
+    arrival_at: dt.datetime
+    carrier_code: str
+    flight_number: str
+    operating_carrier_code: str | None
+    aircraft_code: str
+    duration_minutes: int
+    stops: int
+
+    def to_dict(self) -> dict:
+        return {
+            "departure_airport": self.departure_airport,
+            "departure_terminal": self.departure_terminal,
+            "departure_at": self.departure_at.isoformat(),
+            "arrival_airport": self.arrival_airport,
+            "arrival_terminal": self.arrival_terminal,
+            "arrival_at": self.arrival_at.isoformat(),
+            "carrier_code": self.carrier_code,
+            "flight_number": self.flight_number,
+            "operating_carrier_code": self.operating_carrier_code,
+            "aircraft_code": self.aircraft_code,
+            "duration_minutes": self.duration_minutes,
+            "stops": self.stops,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class FlightItinerary:
+    duration_minutes: int
+    segments: tuple[FlightSegment, ...]
+
+    def to_dict(self) -> dict:
+        return {
+            "duration_minutes": self.duration_minutes,
+            "segments": [segment.to_dict() for segment in self.segments],
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class FlightOffer:
+    offer_id: str
+    grand_total: Decimal
+    currency: str
+    cabin: str | None
+    bookable_seats: int | None
+    last_ticketing_date: dt.date | None
+    validating_carrier_codes: tuple[str, ...]
+    itineraries: tuple[FlightItinerary, ...]
+
+    def to_dict(self) -> dict:
+        return {
+            "offer_id": self.offer_id,
+            "grand_total": str(self.grand_total),
+            "currency": self.currency,
+            "cabin": self.cabin,
+            "bookable_seats": self.bookable_seats,
+            "last_ticketing_date": (
+                self.last_ticketing_date.isoformat()
+                if self.last_ticketing_date is not None else None),
+            "validating_carrier_codes": list(self.validating_carrier_codes),
+            "itineraries": [
+                itinerary.to_dict() for itinerary in self.itineraries
+            ],
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class FlightOffersListing:
+    """The flight offers found by a search.
+
+    :offers: The offers (in the order returned by the provider).
+    :carriers: Carrier names by carrier code.
+    :aircraft: Aircraft names by aircraft code.
+    """
+    offers: tuple[FlightOffer, ...]
+    carriers: dict[str, str]
+    aircraft: dict[str, str]
+    _table: OffersTable | None = field(
+            default=None, init=False, repr=False, compare=False)
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+    @property
+    def table(self) -> OffersTable:
+        """The columnar index of the offers (built on first use)."""
+        if self._table is None:
+            object.__setattr__(self, "_table", OffersTable(self.offers))
+        return self._table
+
+    def query(self, **filters) -> list[FlightOffer]:
+        """Filter and sort the offers, see ``OffersTable.query``."""
+        return self.table.query(**filters)
+
+    def cheapest(self) -> FlightOffer | None:
+        """Get the cheapest offer (or None if there are no offers)."""
+        return min(self.offers, key=lambda offer: offer.grand_total,
+                   default=None)
+
+    def to_dict(self) -> dict:
+        return {
+            "offers": [offer.to_dict() for offer in self.offers],
+            "carriers": self.carriers,
+            "aircraft": self.aircraft,
+        }
@@ -0,0 +1,154 @@
+"""Column oriented filtering and sorting of flight offers.
+
+Clients filter and sort the offers of a (cached) search result over and
+over, so an ``OffersTable`` keeps the values queried on (price, duration,
+stops, departure time and carrier) in flat ``array`` columns instead of
+walking the nested offers for every query:
+
+* The sort order of each sortable column is computed once (on first use)
+  and reused by later queries.
+* A query walks the offers in the requested order and stops as soon as
+  ``limit`` offers matched, or as soon as the sort column passed its
+  upper bound (e.g. ``max_price`` when sorting by price), so top-k
+  queries mostly touch a handful of offers.
+
+Search results hold a few hundred offers at most, at which size plain
+arrays answer a query in microseconds, so NumPy is not needed.
+"""
+from array import array
+import datetime as dt
+from decimal import Decimal
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from .offers import FlightOffer
+
+SORT_KEYS = ("price", "duration", "stops", "departure")
+_EPOCH = dt.datetime(1970, 1, 1)
+
+
+def _departure_seconds(departure_at: dt.datetime) -> float:
+    """Seconds since the epoch (of the local, naive, departure time)."""
+    return (departure_at.replace(tzinfo=None) - _EPOCH).total_seconds()
+
+
+def _offer_stops(offer: "FlightOffer") -> int:
+    return max((
+        len(itinerary.segments) - 1
+        + sum(segment.stops for segment in itinerary.segments)
+        for itinerary in offer.itineraries), default=0)
+
+
+def _offer_carrier(offer: "FlightOffer") -> str:
+    if offer.validating_carrier_codes:
+        return offer.validating_carrier_codes[0]
+    return offer.itineraries[0].segments[0].carrier_code
+
+
+class OffersTable:
+    """Columnar index over flight offers.
+
+    :offers: The offers to index (in their original order).
+    """
+
+    def __init__(self, offers: Iterable["FlightOffer"]):
+        self._offers = tuple(offers)
+        self._carrier_ids: dict[str, int] = {}
+        self.price = array("d", (
+            float(offer.grand_total) for offer in self._offers))
+        self.duration = array("l", (
+            sum(itinerary.duration_minutes
+                for itinerary in offer.itineraries)
+            for offer in self._offers))
+        self.stops = array("l", (
+            _offer_stops(offer) for offer in self._offers))
+        self.departure = array("d", (
+            _departure_seconds(offer.itineraries[0].segments[0].departure_at)
+            for offer in self._offers))
+        self.carrier = array("l", (
+            self._carrier_ids.setdefault(
+                _offer_carrier(offer), len(self._carrier_ids))
+            for offer in self._offers))
+        self._orders: dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def _order(self, sort_by: str) -> array:
+        order = self._orders.get(sort_by)
+        if order is None:
+            if sort_by not in SORT_KEYS:
+                raise ValueError(f"can't sort offers by {sort_by!r}")
+            column = getattr(self, sort_by)
+            order = self._orders[sort_by] = array(
+                    "l", sorted(range(len(column)),
+                                key=column.__getitem__))
+        return order
+
+    def query(self, *, max_price: Decimal | float | None = None,
+              max_duration: int | None = None, max_stops: int | None = None,
+              carriers: Iterable[str] | None = None,
+              departure_from: dt.datetime | None = None,
+              departure_to: dt.datetime | None = None,
+              sort_by: str = "price", descending: bool = False,
+              limit: int | None = None) -> list["FlightOffer"]:
+        """Get the offers matching all the given filters, sorted.
+
+        :max_price: The maximal grand total.
+        :max_duration: The maximal total duration (in minutes).
+        :max_stops: The maximal number of stops (per itinerary).
+        :carriers: The accepted (validating) carrier codes.
+        :departure_from/departure_to: The (inclusive) departure window.
+        :sort_by: One of SORT_KEYS (ties keep the original order).
+        :descending: Sort in descending order.
+        :limit: The maximal number of offers to return.
+        :returns: The matching offers.
+        """
+        order = self._order(sort_by)
+        price_limit = float("inf") if max_price is None else float(max_price)
+        duration_limit = float("inf") if max_duration is None else max_duration
+        stops_limit = float("inf") if max_stops is None else max_stops
+        departure_from = (float("-inf") if departure_from is None
+                          else _departure_seconds(departure_from))
+        departure_to = (float("inf") if departure_to is None
+                        else _departure_seconds(departure_to))
+        carrier_ids = None
+        if carriers is not None:
+            carrier_ids = {
+                self._carrier_ids[code] for code in carriers
+                if code in self._carrier_ids
+            }
+        if limit is None:
+            limit = len(self._offers)
+        if carrier_ids == set() or limit <= 0:
+            return []
+        # Walking an ascending order, nothing matches once the sort column
+        # passed its upper bound.
+        sort_column = getattr(self, sort_by)
+        stop_at = {
+            "price": price_limit,
+            "duration": duration_limit,
+            "stops": stops_limit,
+            "departure": departure_to,
+        }[sort_by]
+        if descending:
+            order = reversed(order)
+            stop_at = float("inf")
+
+        price, duration, stops = self.price, self.duration, self.stops
+        departure, carrier = self.departure, self.carrier
+        matches = []
+        for index in order:
+            if sort_column[index] > stop_at:
+                break
+            if (price[index] > price_limit
+                    or duration[index] > duration_limit
+                    or stops[index] > stops_limit
+                    or not departure_from <= departure[index] <= departure_to
+                    or (carrier_ids is not None
+                        and carrier[index] not in carrier_ids)):
+                continue
+            matches.append(self._offers[index])
+            if len(matches) >= limit:
+                break
+        return matches
@@ -1,48 +1,194 @@
 """Authentication and authorization for the Amadeus interface package.
+
+The access token is held by a ``TokenManager`` (not in the global config):
+
+* Once the token is within ``amadeus_options.token.refresh_margin``
+  seconds of expiring it is refreshed in a background thread, while
+  callers keep getting the still valid token.
+* Only one refresh runs at a time, be it a blocking, an async or a
+  background one. Callers that have no valid token at all (on startup,
+  or after failed refreshes) wait for, and share, a single refresh.
 """
+import asyncio
+import threading
 import time
-import requests
+from typing import Callable
 
 from jormungand.core.config import config
+from jormungand.core.logging import get_logger
+from jormungand.core.singleflight import AsyncSingleFlight
+from . import http
 
-_ROOT_URL = config["amadeus.root_url"]
-_API_URL = _ROOT_URL + "/v1/security/oauth2/token"
-_REQUEST_XFORM_DATA = {
-        "grant_type": "client_credentials",
-        "client_id": config["amadeus.key"],
-        "client_secret": config["amadeus.secret"]
-}
+logger = get_logger(__name__)
+
+_API_PATH = "/v1/security/oauth2/token"
 _NEXT_REFRESH_OFFSET = 5
 
 
-def _token_requires_refresh():
-    next_refresh = config.get("amadeus.next_refresh", None)
-    requires_refresh = (next_refresh is None) or (time.time() > next_refresh)
-    return requires_refresh
+def _request_xform_data() -> dict:
+    return {
+            "grant_type": "client_credentials",
+            "client_id": config["amadeus.key"],
+            "client_secret": config["amadeus.secret"]
+    }
 
 
 def _get_amadeus_auth_token():
-    response = requests.post(_API_URL, data=_REQUEST_XFORM_DATA)
+    response = http.request("POST", _API_PATH, priority=http.PRIORITY_HIGH,
+                            data=_request_xform_data())
     return response.json()
 
 
-def _refresh_token():
-    auth_data = _get_amadeus_auth_token()
-    if auth_data.get("state", "") == "approved":
-        config["amadeus.access_token"] = auth_data["access_token"]
-        config["amadeus.token_type"] = auth_data["token_type"]
-        config["amadeus.next_refresh"] = (time.time() + auth_data["expires_in"]
-                                          - _NEXT_REFRESH_OFFSET)
+class TokenManager:
+    """Thread (and asyncio) safe holder of the Amadeus access token.
+
+    :fetch_token: Blocking call requesting a new token from Amadeus (the
+        async callers run it in a worker thread).
+    :refresh_margin: How long (in seconds) before the token expires it
+        is refreshed in the background.
+    :retry_interval: How long to wait before retrying a failed background
+        refresh (in seconds).
+    :timer: The clock used for expiration (mostly useful for testing).
+    """
+
+    def __init__(self, fetch_token: Callable[[], dict],
+                 refresh_margin: float = 60.0, retry_interval: float = 5.0,
+                 timer: Callable[[], float] = time.time):
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._fetch_token = fetch_token
+        self._timer = timer
+        self._auth_header: dict | None = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._refreshing = False
+        # Guards the token state, held only briefly.
+        self._lock = threading.Lock()
+        # Serializes the token requests.
+        self._refresh_lock = threading.Lock()
+        self._async_single_flight = AsyncSingleFlight()
+        self._stats = {"refreshes": 0, "background_refreshes": 0,
+                       "failed_refreshes": 0}
+
+    def _current_auth_header(self) -> tuple[dict | None, bool]:
+        """Get the valid auth header (if any) and if a refresh is due."""
+        now = self._timer()
+        with self._lock:
+            if self._auth_header is None or now >= self._expires_at:
+                return None, True
+            return self._auth_header, now >= self._refresh_at
+
+    def _store_token(self, auth_data: dict) -> dict:
+        if auth_data.get("state", "") != "approved":
+            raise Exception(str(auth_data))
+        now = self._timer()
+        expires_at = now + auth_data["expires_in"] - _NEXT_REFRESH_OFFSET
+        auth_header = {
+                "Authorization":
+                " ".join((auth_data["token_type"], auth_data["access_token"]))
+        }
+        with self._lock:
+            self._auth_header = auth_header
+            self._expires_at = expires_at
+            # Short lived tokens are refreshed half way through their life.
+            self._refresh_at = expires_at - min(
+                    self.refresh_margin, (expires_at - now) / 2)
+            self._stats["refreshes"] += 1
+        return auth_header
+
+    def _refresh(self) -> dict:
+        with self._refresh_lock:
+            auth_header, _ = self._current_auth_header()
+            if auth_header is None:
+                auth_header = self._store_token(self._fetch_token())
+            return auth_header
+
+    async def _async_refresh(self) -> dict:
+        # Going through the blocking refresh serializes the async refreshes
+        # with the blocking and background ones on ``_refresh_lock``.
+        return await asyncio.to_thread(self._refresh)
+
+    def _background_refresh(self):
+        try:
+            with self._refresh_lock:
+                _, refresh_due = self._current_auth_header()
+                if refresh_due:
+                    self._store_token(self._fetch_token())
+                    with self._lock:
+                        self._stats["background_refreshes"] += 1
+        except Exception:
+            logger.exception("amadeus token background refresh failed")
+            with self._lock:
+                self._refresh_at = self._timer() + self.retry_interval
+                self._stats["failed_refreshes"] += 1
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _start_background_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh,
+                         name="amadeus-token-refresh", daemon=True).start()
+
+    def get_auth_header(self) -> dict:
+        """Get the authorization header for Amadeus API requests."""
+        auth_header, refresh_due = self._current_auth_header()
+        if auth_header is None:
+            return self._refresh()
+        if refresh_due:
+            self._start_background_refresh()
+        return auth_header
+
+    async def async_get_auth_header(self) -> dict:
+        """Async variant of ``get_auth_header``."""
+        auth_header, refresh_due = self._current_auth_header()
+        if auth_header is None:
+            return await self._async_single_flight.do(
+                    "token", self._async_refresh)
+        if refresh_due:
+            self._start_background_refresh()
+        return auth_header
+
+    def stats(self) -> dict:
+        """Get the number of (background and failed) token refreshes."""
+        with self._lock:
+            return dict(self._stats)
+
+
+_token_manager: TokenManager | None = None
+
+
+def load_token_manager(testing_token_manager: TokenManager | None = None):
+    """Load (or replace) the token manager, discarding the current token.
+
+    :testing_token_manager: If given, this token manager is used instead
+        of one created from the configuration.
+    """
+    global _token_manager
+    if testing_token_manager is None:
+        _token_manager = TokenManager(
+                _get_amadeus_auth_token,
+                refresh_margin=config.get(
+                    "amadeus_options.token.refresh_margin", 60),
+                retry_interval=config.get(
+                    "amadeus_options.token.retry_interval", 5))
     else:
-        raise Exception(str(auth_data))
+        _token_manager = testing_token_manager
+
+
+def get_token_manager() -> TokenManager:
+    """Get the token manager (created on first use)."""
+    if _token_manager is None:
+        load_token_manager()
+    return _token_manager
 
 
 def get_auth_header():
-    if _token_requires_refresh():
-        _refresh_token()
-    auth_header = {
-            "Authorization":
-            " ".join((config["amadeus.token_type"],
-                      config["amadeus.access_token"]))
-    }
-    return auth_header
+    return get_token_manager().get_auth_header()
+
+
+async def async_get_auth_header():
+    return await get_token_manager().async_get_auth_header()
@@ -1,14 +1,28 @@
 """Wrapper for Amadeus: Flight Create Orders API
+
+Creating an order drops the cached pricing of its flight offers.
 """
-import requests
+from .auth import async_get_auth_header, get_auth_header
+from .flight_offers_pricing import invalidate_pricing
+from . import http
+
+_API_PATH = "/v1/booking/flight-orders"
 
-from jormungand.core.config import config
-from .auth import get_auth_header
 
-_ROOT_URL = config["amadeus.root_url"]
-_API_URL = _ROOT_URL + "/v1/booking/flight-orders"
+def _invalidate_order_pricing(data: dict):
+    invalidate_pricing(data.get("data", {}).get("flightOffers", []))
 
 
 def flight_create_orders(data: dict):
-    response = requests.post(_API_URL, headers=get_auth_header(), json=data)
+    response = http.request("POST", _API_PATH, priority=http.PRIORITY_HIGH,
+                            headers=get_auth_header(), json=data)
+    _invalidate_order_pricing(data)
+    return response.json()
+
+
+async def async_flight_create_orders(data: dict):
+    response = await http.async_request(
+            "POST", _API_PATH, priority=http.PRIORITY_HIGH,
+            headers=await async_get_auth_header(), json=data)
+    _invalidate_order_pricing(data)
     return response.json()
@@ -1,14 +1,107 @@
 """Wrapper for Amadeus: Flight Offers Pricing API.
+
+Pricing results are cached in-process for a short time
+(``amadeus_options.pricing_cache.ttl`` seconds), so re-opening or
+refreshing a checkout page does not re-price the same offers upstream.
+
+The cache is keyed by a fingerprint of the priced flight offers which
+ignores their volatile fields (ids, prices, seat availability and
+ticketing deadlines), so the offer as found by a search and the same
+offer as returned by an earlier pricing share the fingerprint. The cached
+pricing of offers is dropped once an order is created for them (see
+``invalidate_pricing``).
 """
-import requests
+from copy import deepcopy
+import hashlib
+import json
 
+from jormungand.core.cache import TTLLRUCache
 from jormungand.core.config import config
-from .auth import get_auth_header
+from .auth import async_get_auth_header, get_auth_header
+from . import http
+
+_API_PATH = "/v1/shopping/flight-offers/pricing"
+_VOLATILE_FIELDS = frozenset((
+    "id", "segmentId", "price", "numberOfBookableSeats",
+    "lastTicketingDate", "lastTicketingDateTime",
+))
+_pricing_cache = TTLLRUCache(
+        maxsize=config.get("amadeus_options.pricing_cache.maxsize", 512),
+        ttl=config.get("amadeus_options.pricing_cache.ttl", 120))
+
+
+def _without_volatile_fields(value):
+    if isinstance(value, dict):
+        return {
+            key: _without_volatile_fields(item)
+            for key, item in value.items() if key not in _VOLATILE_FIELDS
+        }
+    if isinstance(value, list):
+        return [_without_volatile_fields(item) for item in value]
+    return value
+
+
+def offers_fingerprint(flight_offers: list[dict]) -> str:
+    """Get a stable hash of flight offers (ignoring volatile fields)."""
+    canonical = json.dumps(_without_volatile_fields(flight_offers),
+                           sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _pricing_cache_key(data: dict) -> str | None:
+    """Get the cache key of a pricing request (None if not cacheable)."""
+    request_data = data.get("data", {})
+    if set(request_data) != {"type", "flightOffers"}:
+        return None
+    return offers_fingerprint(request_data["flightOffers"])
+
 
-_ROOT_URL = config["amadeus.root_url"]
-_API_URL = _ROOT_URL + "/v1/shopping/flight-offers/pricing"
+def _cache_pricing_result(cache_key: str | None, result: dict) -> dict:
+    if cache_key is not None and "errors" not in result:
+        _pricing_cache.set(cache_key, deepcopy(result))
+    return result
+
+
+def _cached_pricing_result(cache_key: str | None) -> dict | None:
+    if cache_key is None:
+        return None
+    result = _pricing_cache.get(cache_key)
+    return deepcopy(result) if result is not None else None
+
+
+def invalidate_pricing(flight_offers: list[dict]):
+    """Drop the cached pricing of flight offers.
+
+    Both the pricing of the offers together and of each offer on its own
+    are dropped.
+    """
+    _pricing_cache.pop(offers_fingerprint(flight_offers))
+    for flight_offer in flight_offers:
+        _pricing_cache.pop(offers_fingerprint([flight_offer]))
+
+
+def pricing_cache_stats() -> dict:
+    """Get the pricing cache counters (see ``TTLLRUCache.stats``)."""
+    return _pricing_cache.stats()
 
 
 def flight_offers_pricing(data: dict):
-    response = requests.post(_API_URL, headers=get_auth_header(), json=data)
-    return response.json()
+    cache_key = _pricing_cache_key(data)
+    result = _cached_pricing_result(cache_key)
+    if result is None:
+        response = http.request(
+                "POST", _API_PATH, priority=http.PRIORITY_NORMAL,
+                headers=get_auth_header(), json=data)
+        result = _cache_pricing_result(cache_key, response.json())
+    return result
+
+
+async def async_flight_offers_pricing(data: dict):
+    cache_key = _pricing_cache_key(data)
+    result = _cached_pricing_result(cache_key)
+    if result is None:
+        response = await http.async_request(
+                "POST", _API_PATH, priority=http.PRIORITY_NORMAL,
+                headers=await async_get_auth_header(), json=data)
+        result = _cache_pricing_result(cache_key, response.json())
+    return result
@@ -1,15 +1,55 @@
 """Wrapper for Amadeus: Flight Offers Search API
+
+Search results are cached in two tiers, keyed by the (canonically
+serialized) search parameters:
+
+1. A small in-process TTL/LRU cache (per worker process), holding the
+   compact ``FlightOffersListing`` form of the results.
+2. The ``AmadeusFlightsCache`` MongoDB collection (shared), holding the
+   raw Amadeus responses (which are needed for pricing and booking).
+
+Cached results expire after ``amadeus_options.flights_cache.ttl``
+seconds. In MongoDB this is enforced both through a TTL index (which
+physically removes stale documents) and by filtering on the document age
+during lookups (since the TTL monitor only runs about once a minute).
+In-process entries live for at most ``memory_ttl`` seconds and never
+longer than the MongoDB document they were read from.
+
+Concurrent cache misses for identical searches (within a process) are
+coalesced into a single upstream Amadeus request.
+
+``async_search_flights`` is the asyncio variant of ``search_flights``,
+its (blocking) MongoDB cache lookups and writes are run in worker
+threads so the event loop only waits on them.
+
+``search_flights_flexible`` searches a range of days around the requested
+dates concurrently (through the same cache) and merges the results into
+a cheapest offer per day calendar.
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-import requests
+import datetime as dt
+import json
+import threading
+from typing import Callable
+
+import pymongo
 
+from jormungand.core.cache import TTLLRUCache
 from jormungand.core.config import config
+from jormungand.core.logging import get_logger
+from jormungand.core.singleflight import AsyncSingleFlight, SingleFlight
+from jormungand.flights.offers import FlightOffersListing
 from jormungand.flights.validation.models import FlightsSearch
-from .auth import get_auth_header
+from .auth import async_get_auth_header, get_auth_header
+from .formatting import format_flight_offers
+from . import http
 from . import mongodb
 
-_ROOT_URL = config["amadeus.root_url"]
-_API_URL = _ROOT_URL + "/v2/shopping/flight-offers"
+logger = get_logger(__name__)
+
+_API_PATH = "/v2/shopping/flight-offers"
 _SEARCH_PARAMS_TEMPLATE = {
         "originLocationCode": None,
         "destinationLocationCode": None,
@@ -18,50 +58,414 @@ _SEARCH_PARAMS_TEMPLATE = {
         "adults": 1,
 }
 _mongodb_collection = "AmadeusFlightsCache"
+_cache_indexes_ensured = False
+_cache_stats = {"memory_hits": 0, "mongodb_hits": 0, "misses": 0}
+_cache_stats_lock = threading.Lock()
+_memory_cache = TTLLRUCache(
+        maxsize=config.get(
+            "amadeus_options.flights_cache.memory_maxsize", 256),
+        ttl=config.get("amadeus_options.flights_cache.memory_ttl", 60))
+_search_single_flight = SingleFlight()
+_async_search_single_flight = AsyncSingleFlight()
 
 
 def _amadeus_flight_offers_search(params: dict) -> dict:
-    response = requests.get(_API_URL, headers=get_auth_header(), params=params)
+    response = http.request("GET", _API_PATH, priority=http.PRIORITY_LOW,
+                            headers=get_auth_header(), params=params)
+    return response.json()
+
+
+async def _async_amadeus_flight_offers_search(params: dict) -> dict:
+    response = await http.async_request(
+            "GET", _API_PATH, priority=http.PRIORITY_LOW,
+            headers=await async_get_auth_header(), params=params)
     return response.json()
 
 
 def _format_search_params(fsp: FlightsSearch) -> dict:
     formatted_params = deepcopy(_SEARCH_PARAMS_TEMPLATE)
-    formatted_params = formatted_params.update({
+    formatted_params.update({
             "originLocationCode": fsp.origin,
             "destinationLocationCode": fsp.destination,
-            "departureDate": fsp.departure_date,
-            "returnDate": fsp.return_date,
+            "departureDate": fsp.departure_date.isoformat(),
+            "returnDate": (fsp.return_date.isoformat()
+                           if fsp.return_date is not None else None),
     })
-    return formatted_params
-        
-    
+    return {
+        param: value for param, value in formatted_params.items()
+        if value is not None
+    }
+
+
+def _cache_key(params: dict) -> str:
+    """Get a canonical cache key for a set of formatted search params."""
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+def _cache_ttl() -> int:
+    return config.get("amadeus_options.flights_cache.ttl", 900)
 
 
-def _cached_flight_offers_search(params: dict) -> dict:
-    return None  # TODO: implement flight search caching
+def _get_cache_collection() -> pymongo.collection.Collection:
+    global _cache_indexes_ensured
+    collection = mongodb.get_db()[_mongodb_collection]
+    if not _cache_indexes_ensured:
+        try:
+            ensure_cache_indexes(collection)
+        except pymongo.errors.OperationFailure:
+            # lookups filter on the document age and work without the
+            # indexes (if slower), so searches are not failed for this
+            logger.exception("failed to ensure the flights cache indexes")
+        _cache_indexes_ensured = True
+    return collection
 
 
-def _cache_flights_search_result(params: dict,
-                                 flight_search_results: dict) -> dict:
-    db = mongodb.get_db()
-    flight_search_results["search_params"] = params
-    result = db[_mongodb_collection].insert_one({
+def ensure_cache_indexes(collection: pymongo.collection.Collection = None):
+    """Create the indexes of the flights cache collection (if missing).
+
+    * A TTL index on ``created_at`` so stale search results expire (its
+      TTL is updated if the ``flights_cache.ttl`` setting changed).
+    * A compound index on ``search_key`` and ``created_at`` for lookups.
+    """
+    if collection is None:
+        collection = mongodb.get_db()[_mongodb_collection]
+    ttl = _cache_ttl()
+    ttl_index = collection.index_information().get("created_at_ttl")
+    if ttl_index is None:
+        collection.create_index(
+                "created_at", name="created_at_ttl", expireAfterSeconds=ttl)
+    elif ttl_index.get("expireAfterSeconds") != ttl:
+        # create_index rejects changed options of an existing index
+        collection.database.command({
+            "collMod": collection.name,
+            "index": {"name": "created_at_ttl", "expireAfterSeconds": ttl},
         })
+    collection.create_index(
+            [("search_key", pymongo.ASCENDING),
+             ("created_at", pymongo.DESCENDING)],
+            name="search_key_created_at")
 
 
+def cached_routes(limit: int) -> list[tuple[str, str]]:
+    """Get the routes with the most cached searches.
 
-def _format_search_result(result: dict):  # -> BasicFlightsListing:
-    pass
+    :limit: The maximal number of routes.
+    :returns: (origin, destination) pairs, most cached searches first.
+    """
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "origin": "$search_params.originLocationCode",
+                "destination": "$search_params.destinationLocationCode",
+            },
+            "searches": {"$sum": 1},
+        }},
+        {"$sort": {"searches": -1, "_id.origin": 1, "_id.destination": 1}},
+        {"$limit": limit},
+    ]
+    return [
+        (route["_id"]["origin"], route["_id"]["destination"])
+        for route in _get_cache_collection().aggregate(pipeline)
+    ]
 
 
-def search_flights(flights_search_params: FlightsSearch):
-    formatted_params = _format_search_params(flights_search_params)
+def _count_cache_lookup(tier: str):
+    with _cache_stats_lock:
+        _cache_stats[tier] += 1
+
+
+def cache_stats() -> dict:
+    """Get the flights cache hit/miss counters (of the current process).
+
+    :returns: dictionary with the hits (total and per tier), misses and
+        hit_ratio.
+    """
+    with _cache_stats_lock:
+        stats = dict(_cache_stats)
+    stats["hits"] = stats["memory_hits"] + stats["mongodb_hits"]
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def _cache_in_memory(search_key: str, result: FlightOffersListing,
+                     created_at: dt.datetime):
+    """Cache a result in-process, but never past its MongoDB expiry."""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=dt.timezone.utc)
+    expires_in = (created_at + dt.timedelta(seconds=_cache_ttl())
+                  - dt.datetime.now(dt.timezone.utc)).total_seconds()
+    ttl = min(_memory_cache.ttl, expires_in)
+    if ttl > 0:
+        _memory_cache.set(search_key, result, ttl=ttl)
+
+
+def _cached_flight_offers_search(
+        params: dict, count_stats: bool = True) -> FlightOffersListing | None:
+    """Get a cached (non expired) search result for the search params.
+
+    The in-process cache is checked first, then MongoDB.
+
+    :count_stats: If set to False the lookup is not counted in the
+        ``cache_stats``.
+    :returns: The cached search result or None on a cache miss.
+    """
+    search_key = _cache_key(params)
+    result = _memory_cache.get(search_key)
+    if result is not None:
+        if count_stats:
+            _count_cache_lookup("memory_hits")
+        return result
+    oldest_valid = (dt.datetime.now(dt.timezone.utc)
+                    - dt.timedelta(seconds=_cache_ttl()))
+    cached = _get_cache_collection().find_one(
+            {"search_key": search_key,
+             "created_at": {"$gt": oldest_valid}},
+            projection={"result": True, "created_at": True, "_id": False},
+            sort=[("created_at", pymongo.DESCENDING)])
+    if cached is None:
+        if count_stats:
+            _count_cache_lookup("misses")
+        return None
+    if count_stats:
+        _count_cache_lookup("mongodb_hits")
+    result = _format_search_result(cached["result"])
+    _cache_in_memory(search_key, result, cached["created_at"])
+    return result
+
+
+def _cache_flights_search_result(
+        params: dict,
+        flight_search_results: dict) -> FlightOffersListing | None:
+    """Store a search result in the cache (both tiers).
+
+    Error responses are not cached.
+
+    :returns: The formatted search result, or None for error responses.
+    """
+    if "errors" in flight_search_results:
+        logger.warning("amadeus flight offers search failed: %s",
+                       flight_search_results["errors"])
+        return None
+    search_key = _cache_key(params)
+    created_at = dt.datetime.now(dt.timezone.utc)
+    _get_cache_collection().insert_one({
+            "search_key": search_key,
+            "search_params": params,
+            "created_at": created_at,
+            "result": flight_search_results,
+    })
+    result = _format_search_result(flight_search_results)
+    _cache_in_memory(search_key, result, created_at)
+    return result
+
+
+def _format_search_result(result: dict) -> FlightOffersListing:
+    return format_flight_offers(result)
+
+
+def _fetch_flight_offers(params: dict) -> FlightOffersListing | None:
+    """Get search results from Amadeus and cache them.
+
+    Only called through ``_search_single_flight``, a concurrent identical
+    search may have cached its result just before this call started,
+    so the in-process cache is checked once more first.
+    """
+    result = _memory_cache.get(_cache_key(params))
+    if result is None:
+        result = _amadeus_flight_offers_search(params)
+        result = _cache_flights_search_result(params, result)
+    return result
 
+
+async def _async_fetch_flight_offers(
+        params: dict) -> FlightOffersListing | None:
+    """Async variant of ``_fetch_flight_offers``."""
+    result = _memory_cache.get(_cache_key(params))
+    if result is None:
+        result = await _async_amadeus_flight_offers_search(params)
+        result = await asyncio.to_thread(
+                _cache_flights_search_result, params, result)
+    return result
+
+
+def single_flight_stats() -> dict:
+    """Get the number of executed and coalesced upstream searches."""
+    stats = _search_single_flight.stats()
+    for name, count in _async_search_single_flight.stats().items():
+        stats[name] += count
+    return stats
+
+
+def _search_flight_offers(
+        flights_search_params: FlightsSearch) -> FlightOffersListing | None:
+    """Get the search result, from the cache if possible."""
+    formatted_params = _format_search_params(flights_search_params)
     result = _cached_flight_offers_search(formatted_params)
     if result is None:
-        result = _amadeus_flight_offers_search(formatted_params)
-        result = _cache_flights_search_result(formatted_params, result)
+        result = _search_single_flight.do(
+                _cache_key(formatted_params), _fetch_flight_offers,
+                formatted_params)
+    return result
+
+
+async def _async_search_flight_offers(
+        flights_search_params: FlightsSearch) -> FlightOffersListing | None:
+    """Async variant of ``_search_flight_offers``."""
+    formatted_params = _format_search_params(flights_search_params)
+    result = await asyncio.to_thread(
+            _cached_flight_offers_search, formatted_params)
+    if result is None:
+        result = await _async_search_single_flight.do(
+                _cache_key(formatted_params), _async_fetch_flight_offers,
+                formatted_params)
+    return result
+
+
+def warm_search(flights_search_params: FlightsSearch,
+                before_fetch: Callable[[], None] | None = None) -> str:
+    """Make sure the result of a search is cached (for cache warm-ups).
+
+    Unlike ``search_flights`` the cache lookup is not counted in the
+    ``cache_stats``.
+
+    :before_fetch: Called before searching Amadeus on a cache miss (e.g.
+        to wait for a rate limit).
+    :returns: "cached" if the result was already cached, "warmed" if it
+        was searched and cached, or "failed" if the search failed.
+    """
+    formatted_params = _format_search_params(flights_search_params)
+    if _cached_flight_offers_search(
+            formatted_params, count_stats=False) is not None:
+        return "cached"
+    if before_fetch is not None:
+        before_fetch()
+    result = _search_single_flight.do(
+            _cache_key(formatted_params), _fetch_flight_offers,
+            formatted_params)
+    return "warmed" if result is not None else "failed"
+
+
+def search_flights(
+        flights_search_params: FlightsSearch) -> FlightOffersListing | None:
+    """Search flight offers.
+
+    :returns: The flight offers found, or None if the search failed.
+    """
+    return _search_flight_offers(flights_search_params)
+
+
+async def async_search_flights(
+        flights_search_params: FlightsSearch) -> FlightOffersListing | None:
+    """Async variant of ``search_flights``."""
+    return await _async_search_flight_offers(flights_search_params)
+
+
+def _flexible_date_grid(flights_search_params: FlightsSearch,
+                        days: int) -> list[FlightsSearch]:
+    """Get the searches of a flexible date search.
+
+    Return dates are shifted along with the departure dates (so the trip
+    length is kept), departure dates in the past are skipped.
+    """
+    today = dt.date.today()
+    grid = []
+    for delta in range(-days, days + 1):
+        shift = dt.timedelta(days=delta)
+        departure_date = flights_search_params.departure_date + shift
+        if departure_date < today:
+            continue
+        return_date = flights_search_params.return_date
+        grid.append(flights_search_params.copy(update={
+                "departure_date": departure_date,
+                "return_date": (return_date + shift
+                                if return_date is not None else None),
+        }))
+    return grid
+
+
+def _cheapest_offer(flights_search_params: FlightsSearch,
+                    result: FlightOffersListing | None) -> dict | None:
+    """Get the calendar entry of a day from its search result."""
+    offer = result.cheapest() if result is not None else None
+    if offer is None:
+        return None
+    return {
+        "departure_date": flights_search_params.departure_date,
+        "return_date": flights_search_params.return_date,
+        "grand_total": offer.grand_total,
+        "currency": offer.currency,
+        "offer": offer,
+    }
+
+
+def _flexible_search_max_workers() -> int:
+    return config.get("amadeus_options.flexible_search.max_workers", 7)
+
+
+def _search_day(
+        flights_search_params: FlightsSearch) -> FlightOffersListing | None:
+    try:
+        return _search_flight_offers(flights_search_params)
+    except Exception:
+        logger.exception("flexible search of %s failed",
+                         flights_search_params.departure_date)
+        return None
+
+
+def search_flights_flexible(
+        flights_search_params: FlightsSearch, days: int = 3,
+        max_workers: int | None = None) -> dict[dt.date, dict | None]:
+    """Search flights departing up to days before/after the requested date.
+
+    The days are searched concurrently (each through the search cache),
+    so the total latency is about that of a single upstream search.
+
+    :days: The number of days before and after the departure date.
+    :max_workers: The maximal number of concurrent searches (default:
+        ``amadeus_options.flexible_search.max_workers``).
+    :returns: A calendar mapping each searched departure date to its
+        cheapest offer entry (departure_date, return_date, grand_total,
+        currency and the offer itself), or to None if no offer was found
+        (or its search failed).
+    """
+    grid = _flexible_date_grid(flights_search_params, days)
+    if not grid:
+        return {}
+    if max_workers is None:
+        max_workers = _flexible_search_max_workers()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(grid)))
+    with executor:
+        results = executor.map(_search_day, grid)
+        return {
+            day_search.departure_date: _cheapest_offer(day_search, result)
+            for day_search, result in zip(grid, results)
+        }
+
+
+async def _async_search_day(
+        flights_search_params: FlightsSearch,
+        semaphore: asyncio.Semaphore) -> FlightOffersListing | None:
+    async with semaphore:
+        try:
+            return await _async_search_flight_offers(flights_search_params)
+        except Exception:
+            logger.exception("flexible search of %s failed",
+                             flights_search_params.departure_date)
+            return None
+
 
-    formatted_result = _format_search_result(result)
-    return formatted_result
+async def async_search_flights_flexible(
+        flights_search_params: FlightsSearch, days: int = 3,
+        max_workers: int | None = None) -> dict[dt.date, dict | None]:
+    """Async variant of ``search_flights_flexible``."""
+    grid = _flexible_date_grid(flights_search_params, days)
+    if max_workers is None:
+        max_workers = _flexible_search_max_workers()
+    semaphore = asyncio.Semaphore(max_workers)
+    results = await asyncio.gather(*(
+        _async_search_day(day_search, semaphore) for day_search in grid))
+    return {
+        day_search.departure_date: _cheapest_offer(day_search, result)
+        for day_search, result in zip(grid, results)
+    }
@@ -0,0 +1,109 @@
+"""Conversion of Amadeus responses to the internal flight offers model.
+
+"""
+import datetime as dt
+from decimal import Decimal
+import re
+from sys import intern
+from typing import Hashable
+
+from jormungand.flights.offers import (
+    FlightItinerary, FlightOffer, FlightOffersListing, FlightSegment)
+
+_DURATION_PATTERN = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?")
+
+
+def _duration_minutes(duration: str | None) -> int:
+    """Convert an ISO 8601 duration (e.g. "PT21H17M") to minutes."""
+    match = _DURATION_PATTERN.fullmatch(duration or "")
+    if match is None:
+        return 0
+    days, hours, minutes = (int(part or 0) for part in match.groups())
+    return (days * 24 + hours) * 60 + minutes
+
+
+def _intern(code: str | None) -> str | None:
+    return intern(code) if code is not None else None
+
+
+class _Deduplicator:
+    """Replaces equal (immutable) objects with the first one seen."""
+
+    def __init__(self):
+        self._objects: dict[Hashable, Hashable] = {}
+
+    def __call__(self, obj):
+        return self._objects.setdefault(obj, obj)
+
+
+def _format_segment(segment: dict) -> FlightSegment:
+    departure = segment["departure"]
+    arrival = segment["arrival"]
+    return FlightSegment(
+            departure_airport=intern(departure["iataCode"]),
+            departure_terminal=_intern(departure.get("terminal")),
+            departure_at=dt.datetime.fromisoformat(departure["at"]),
+            arrival_airport=intern(arrival["iataCode"]),
+            arrival_terminal=_intern(arrival.get("terminal")),
+            arrival_at=dt.datetime.fromisoformat(arrival["at"]),
+            carrier_code=intern(segment["carrierCode"]),
+            flight_number=intern(segment["number"]),
+            operating_carrier_code=_intern(
+                segment.get("operating", {}).get("carrierCode")),
+            aircraft_code=intern(segment["aircraft"]["code"]),
+            duration_minutes=_duration_minutes(segment.get("duration")),
+            stops=segment.get("numberOfStops", 0))
+
+
+def _offer_cabin(offer: dict) -> str | None:
+    for traveler_pricing in offer.get("travelerPricings", ()):
+        for fare_details in traveler_pricing.get("fareDetailsBySegment", ()):
+            if "cabin" in fare_details:
+                return intern(fare_details["cabin"])
+    return None
+
+
+def _format_offer(offer: dict, deduplicate: _Deduplicator) -> FlightOffer:
+    itineraries = tuple(
+        deduplicate(FlightItinerary(
+            duration_minutes=_duration_minutes(itinerary.get("duration")),
+            segments=tuple(
+                deduplicate(_format_segment(segment))
+                for segment in itinerary["segments"])))
+        for itinerary in offer["itineraries"]
+    )
+    last_ticketing_date = offer.get("lastTicketingDate")
+    return FlightOffer(
+            offer_id=offer["id"],
+            grand_total=Decimal(offer["price"]["grandTotal"]),
+            currency=intern(offer["price"]["currency"]),
+            cabin=_offer_cabin(offer),
+            bookable_seats=offer.get("numberOfBookableSeats"),
+            last_ticketing_date=(
+                dt.date.fromisoformat(last_ticketing_date)
+                if last_ticketing_date is not None else None),
+            validating_carrier_codes=tuple(
+                intern(code)
+                for code in offer.get("validatingAirlineCodes", ())),
+            itineraries=itineraries)
+
+
+def format_flight_offers(result: dict) -> FlightOffersListing:
+    """Convert a Flight Offers Search result to a listing.
+
+    :result: The (successful) Amadeus response.
+    :returns: The compact flight offers listing.
+    """
+    deduplicate = _Deduplicator()
+    dictionaries = result.get("dictionaries", {})
+    return FlightOffersListing(
+            offers=tuple(_format_offer(offer, deduplicate)
+                         for offer in result.get("data", ())),
+            carriers={
+                intern(code): name
+                for code, name in dictionaries.get("carriers", {}).items()
+            },
+            aircraft={
+                intern(code): name
+                for code, name in dictionaries.get("aircraft", {}).items()
+            })
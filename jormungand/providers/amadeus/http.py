@@ -0,0 +1,265 @@
+"""Shared HTTP session layer for the Amadeus interface package.
+
+All the Amadeus API wrappers send their requests through a single
+``requests.Session`` so that connections (and their TLS sessions) are
+kept alive and reused instead of being re-established for every call.
+Their ``async_`` variants likewise share a single ``httpx.AsyncClient``.
+
+The session is configured via the ``amadeus_options.http`` settings:
+
+* pool_connections: The number of host connection pools to cache.
+* pool_maxsize: The maximal number of connections kept per host
+  (should be at least the number of threads making Amadeus calls).
+* connect_timeout/read_timeout: Default request timeouts in seconds.
+* async_max_connections: The maximal number of concurrent connections
+  of the async client (i.e. of upstream requests in flight).
+* async_max_keepalive_connections: The number of idle connections kept
+  alive by the async client.
+
+Outgoing requests are throttled by a shared token bucket, configured via
+the ``amadeus_options.rate_limit`` settings:
+
+* rate/burst: The sustained requests per second and the bucket size
+  (should be set just under the Amadeus quota).
+* reserves: The tokens requests of each priority must leave in the bucket
+  (``PRIORITY_HIGH``, ``PRIORITY_NORMAL``, ``PRIORITY_LOW``), so orders
+  are served before pricing and pricing before searches.
+* max_retries: How many times a request answered with 429 (Too Many
+  Requests) is retried.
+* backoff_base/backoff_max: The jittered exponential backoff (in seconds)
+  used for 429 responses without a ``Retry-After`` header.
+
+A 429 response pauses the whole bucket (for ``Retry-After`` or the backoff
+delay), so all callers back off together instead of piling up retries.
+"""
+import datetime as dt
+from email.utils import parsedate_to_datetime
+import random
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from jormungand.core.config import config
+from jormungand.core.logging import get_logger
+from jormungand.core.ratelimit import TokenBucket
+
+logger = get_logger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_async_client: httpx.AsyncClient | None = None
+_rate_limiter: TokenBucket | None = None
+_rate_limiter_lock = threading.Lock()
+
+
+def _http_option(name: str, default):
+    return config.get(f"amadeus_options.http.{name}", default)
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    pool_maxsize = _http_option("pool_maxsize", 16)
+    adapter = HTTPAdapter(
+            pool_connections=_http_option("pool_connections", 4),
+            pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    logger.debug("created amadeus http session (pool_maxsize=%s)",
+                 pool_maxsize)
+    return session
+
+
+def load_session(testing_session: requests.Session | None = None):
+    """Load (or replace) the shared HTTP session.
+
+    :testing_session: If given, this session is used instead of one
+        created from the configuration.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        if testing_session is None:
+            _session = _create_session()
+        else:
+            _session = testing_session
+
+
+def get_session() -> requests.Session:
+    """Get the shared HTTP session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def _rate_limit_option(name: str, default):
+    return config.get(f"amadeus_options.rate_limit.{name}", default)
+
+
+def load_rate_limiter(testing_rate_limiter: TokenBucket | None = None):
+    """Load (or replace) the shared rate limiter.
+
+    :testing_rate_limiter: If given, this rate limiter is used instead of
+        one created from the configuration.
+    :raises ValueError: If the ``amadeus_options.rate_limit`` settings are
+        invalid (see ``TokenBucket``).
+    """
+    global _rate_limiter
+    if testing_rate_limiter is None:
+        _rate_limiter = TokenBucket(
+                rate=_rate_limit_option("rate", 10),
+                burst=_rate_limit_option("burst", 10),
+                reserves=_rate_limit_option("reserves", (0, 1, 3)))
+    else:
+        _rate_limiter = testing_rate_limiter
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Get the shared rate limiter (created on first use)."""
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                load_rate_limiter()
+    return _rate_limiter
+
+
+def _retry_after(response: requests.Response | httpx.Response,
+                 attempt: int) -> float:
+    """Get how long to back off after a 429 response (in seconds).
+
+    The ``Retry-After`` header is honored if present, otherwise the delay
+    is a "full jitter" exponential backoff.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            pass
+        else:
+            return max(0.0, (retry_at - dt.datetime.now(
+                    dt.timezone.utc)).total_seconds())
+    backoff = min(_rate_limit_option("backoff_max", 10),
+                  _rate_limit_option("backoff_base", 0.5) * 2 ** attempt)
+    return random.uniform(0, backoff)
+
+
+def _should_retry(response: requests.Response | httpx.Response,
+                  attempt: int, path: str) -> bool:
+    """Check if a response should be retried (pausing the rate limiter)."""
+    if response.status_code != 429:
+        return False
+    delay = _retry_after(response, attempt)
+    get_rate_limiter().pause(delay)
+    retry = attempt < _rate_limit_option("max_retries", 3)
+    logger.warning("amadeus rate limit hit on %s, backing off %.2fs (%s)",
+                   path, delay, "retrying" if retry else "giving up")
+    return retry
+
+
+def request(method: str, path: str, priority: int = PRIORITY_NORMAL,
+            **kwargs) -> requests.Response:
+    """Send a request to the Amadeus APIs through the shared session.
+
+    The request waits for the rate limiter and is retried (after backing
+    off) while answered with 429 (up to ``max_retries`` times).
+
+    :method: The HTTP method.
+    :path: The API path (appended to the ``amadeus.root_url`` setting).
+    :priority: The rate limiting priority of the request.
+    :kwargs: Passed on to ``requests.Session.request``, a default
+        ``timeout`` is set from the configuration if not given.
+    :returns: The response.
+    """
+    kwargs.setdefault("timeout", (_http_option("connect_timeout", 5),
+                                  _http_option("read_timeout", 30)))
+    attempt = 0
+    while True:
+        get_rate_limiter().acquire(priority)
+        response = get_session().request(
+                method, config["amadeus.root_url"] + path, **kwargs)
+        if not _should_retry(response, attempt, path):
+            return response
+        attempt += 1
+
+
+def _create_async_client() -> httpx.AsyncClient:
+    client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=_http_option("async_max_connections", 100),
+                max_keepalive_connections=_http_option(
+                    "async_max_keepalive_connections", 20)),
+            timeout=httpx.Timeout(_http_option("read_timeout", 30),
+                                  connect=_http_option("connect_timeout", 5)))
+    logger.debug("created amadeus async http client")
+    return client
+
+
+def load_async_client(testing_client: httpx.AsyncClient | None = None):
+    """Load (or replace) the shared async HTTP client.
+
+    The pooled connections of the client are bound to the event loop they
+    were opened in, so the client should be loaded from within the running
+    event loop (e.g. on application startup) and closed with
+    ``aclose_async_client`` before the loop is closed.
+
+    :testing_client: If given, this client is used instead of one created
+        from the configuration.
+    """
+    global _async_client
+    if testing_client is None:
+        _async_client = _create_async_client()
+    else:
+        _async_client = testing_client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Get the shared async HTTP client (created on first use)."""
+    if _async_client is None:
+        load_async_client()
+    return _async_client
+
+
+async def aclose_async_client():
+    """Close the shared async HTTP client (if loaded)."""
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.aclose()
+
+
+async def async_request(method: str, path: str,
+                        priority: int = PRIORITY_NORMAL,
+                        **kwargs) -> httpx.Response:
+    """Send a request to the Amadeus APIs through the shared async client.
+
+    Rate limited and retried the same way as ``request``.
+
+    :method: The HTTP method.
+    :path: The API path (appended to the ``amadeus.root_url`` setting).
+    :priority: The rate limiting priority of the request.
+    :kwargs: Passed on to ``httpx.AsyncClient.request``.
+    :returns: The response.
+    """
+    attempt = 0
+    while True:
+        await get_rate_limiter().async_acquire(priority)
+        response = await get_async_client().request(
+                method, config["amadeus.root_url"] + path, **kwargs)
+        if not _should_retry(response, attempt, path):
+            return response
+        attempt += 1
@@ -9,16 +9,29 @@ _client = None
 _db = None
 
 
-def get_client() -> pymongo.MongoClient:
-    global _client
-    if _client is None:
+def load_client(testing_client: pymongo.MongoClient | None = None):
+    """Load (or replace) the MongoDB client.
+
+    :testing_client: If given, this client (e.g. a ``mongomock`` client)
+        is used instead of one created from the configuration.
+    """
+    global _client, _db
+    if testing_client is None:
         _client = pymongo.MongoClient(
                 **config["databases.mongodb.client_params"])
+    else:
+        _client = testing_client
+    _db = None
+
+
+def get_client() -> pymongo.MongoClient:
+    if _client is None:
+        load_client()
     return _client
 
 
 def get_db() -> pymongo.database.Database:
-    global _db, _client
+    global _db
     if _db is None:
-        _db = get_client[config["databases.mongodb.database"]]
+        _db = get_client()[config["databases.mongodb.database"]]
     return _db
@@ -0,0 +1,137 @@
+"""Warm-up of the Amadeus flights search cache.
+
+After a deploy (which empties the in-process cache) or a flush of the
+``AmadeusFlightsCache`` collection, the first searches of every popular
+route would pay the full Amadeus latency. The warm-up job searches the
+top routes for the next days ahead of the users, so their searches are
+served from the cache.
+
+The job is configured via the ``amadeus_options.warmup`` settings:
+
+* routes: The top routes, as "ORIGIN-DESTINATION" strings (e.g.
+  "TLV-LAS"). If empty, the routes most searched recently are derived
+  from the flights cache collection.
+* max_routes: The maximal number of derived routes.
+* days: The number of days (starting today) to search for each route.
+* rate: The maximal number of upstream searches per second made by the
+  warm-up, so it only uses part of the Amadeus quota.
+* max_workers: The number of concurrent warm-up searches.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import datetime as dt
+import threading
+
+from pydantic import ValidationError
+
+from jormungand.core.config import config
+from jormungand.core.logging import get_logger
+from jormungand.core.ratelimit import TokenBucket
+from jormungand.flights.validation.models import FlightsSearch
+from . import flight_offers_search
+
+logger = get_logger(__name__)
+
+
+def _warmup_option(name: str, default):
+    return config.get(f"amadeus_options.warmup.{name}", default)
+
+
+def _parse_route(route: str) -> tuple[str, str]:
+    origin, destination = route.split("-")
+    return origin.strip().upper(), destination.strip().upper()
+
+
+def derive_top_routes(limit: int) -> list[tuple[str, str]]:
+    """Get the routes with the most cached searches.
+
+    Every cached search is a recent cache miss of a distinct search (e.g.
+    of another departure date), so routes with many cached searches are
+    the ones most searched recently.
+
+    :limit: The maximal number of routes.
+    :returns: (origin, destination) pairs, most searched first.
+    """
+    return flight_offers_search.cached_routes(limit)
+
+
+def top_routes() -> list[tuple[str, str]]:
+    """Get the routes to warm up (configured, or derived from the cache)."""
+    routes = _warmup_option("routes", [])
+    if routes:
+        return [_parse_route(route) for route in routes]
+    return derive_top_routes(_warmup_option("max_routes", 20))
+
+
+def _warm_up_search(flights_search_params: FlightsSearch,
+                    budget: TokenBucket) -> str:
+    try:
+        return flight_offers_search.warm_search(
+                flights_search_params, before_fetch=budget.acquire)
+    except Exception:
+        logger.exception("flights cache warm-up search failed: %s",
+                         flights_search_params)
+        return "failed"
+
+
+def warm_up_flights_cache(routes: list[tuple[str, str]] | None = None,
+                          days: int | None = None,
+                          rate: float | None = None,
+                          max_workers: int | None = None,
+                          start_date: dt.date | None = None) -> dict:
+    """Pre-populate the flights cache with one way searches of top routes.
+
+    Searches that are already cached cost no upstream request (and none of
+    the rate budget).
+
+    :routes: (origin, destination) pairs (default: ``top_routes()``).
+    :days: The number of departure days to search (default: config).
+    :rate: The upstream searches per second budget (default: config).
+    :max_workers: The number of concurrent searches (default: config).
+    :start_date: The first departure date (default: today).
+    :returns: dictionary with the number of routes and searches, and of
+        searches that were already cached, warmed up or failed.
+    """
+    if routes is None:
+        routes = top_routes()
+    if days is None:
+        days = _warmup_option("days", 7)
+    if rate is None:
+        rate = _warmup_option("rate", 2)
+    if max_workers is None:
+        max_workers = _warmup_option("max_workers", 2)
+    if start_date is None:
+        start_date = dt.date.today()
+
+    searches = []
+    for origin, destination in routes:
+        for day in range(days):
+            try:
+                searches.append(FlightsSearch(
+                        origin=origin, destination=destination,
+                        departure_date=start_date + dt.timedelta(days=day)))
+            except ValidationError as err:
+                logger.warning("skipping warm-up of route %s-%s: %s",
+                               origin, destination, err)
+                break
+    budget = TokenBucket(rate=rate, burst=1)
+    summary = {"routes": len(routes), "searches": len(searches),
+               "cached": 0, "warmed": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for outcome in executor.map(
+                lambda search: _warm_up_search(search, budget), searches):
+            summary[outcome] += 1
+    logger.info("flights cache warm-up done: %s", summary)
+    return summary
+
+
+def start_flights_cache_warm_up(**kwargs) -> threading.Thread:
+    """Run ``warm_up_flights_cache`` in a background (daemon) thread.
+
+    :kwargs: Passed on to ``warm_up_flights_cache``.
+    :returns: The started thread.
+    """
+    thread = threading.Thread(target=warm_up_flights_cache, kwargs=kwargs,
+                              name="amadeus-flights-cache-warm-up",
+                              daemon=True)
+    thread.start()
+    return thread
@@ -1,10 +1,14 @@
 from logging import getLogger
 
 import pytest
+from sqlalchemy.pool import NullPool
 
 from jormungand.core.config import config
 from jormungand.core.logging import load_logging_configuration
 from jormungand.core import db
+from jormungand.dal import airports
+from jormungand.providers.amadeus import auth, http
+from tests.utils import AmadeusStubServer
 from tests.utils import create_temp_db_engine
 
 logger = getLogger(__name__)
@@ -27,5 +31,37 @@ def tmp_db():
     with create_temp_db_engine() as engine:
         db.load_db_engine(engine)
         db.init_db(confirm_init_db=True)
+        airports.invalidate_search_caches()
         db.set_level_sqlalchemy_loggers("DEBUG")
         yield engine
+
+
+@pytest.fixture()
+def tmp_async_db(tmp_db, monkeypatch):
+    """An async engine of the temporary database.
+
+    Connections are not pooled, as tests run each in their own event loop.
+    """
+    sqlalchemy_asyncio = pytest.importorskip("sqlalchemy.ext.asyncio")
+    engine = sqlalchemy_asyncio.create_async_engine(
+            db.async_db_url(tmp_db.url), poolclass=NullPool)
+    monkeypatch.setattr(db, "_async_engine", None)
+    db.load_async_db_engine(engine)
+    return engine
+
+
+@pytest.fixture()
+def amadeus_stub():
+    """Point the Amadeus wrappers at a local stub server."""
+    previous_settings = config.get("amadeus", None)
+    with AmadeusStubServer() as stub:
+        config.set("amadeus", {"root_url": stub.url, "key": "stub-key",
+                               "secret": "stub-secret"})
+        http.load_session()
+        http.load_rate_limiter()
+        auth.load_token_manager()
+        yield stub
+        http.load_session()
+        http.load_rate_limiter()
+        auth.load_token_manager()
+        config.set("amadeus", previous_settings)
@@ -1,5 +1,30 @@
-from jormungand.bll import find_airports
+from jormungand.bll import airports, find_airports
+from jormungand.bll.airports import AirportShortInfo
 
 
 def test_find_airports():
     find_airports('a')
+
+
+def test_find_airports_normalizes_query_and_converts_results(monkeypatch):
+    calls = []
+
+    def get_airports_by_substring(substring, limit, use_index):
+        calls.append((substring, limit))
+        return [{
+            'airport_id': 1, 'country_code': 'AA', 'iata_code': 'AAA',
+            'country_name': 'country a', 'municipality': 'municipality a',
+            'airport_name': 'airport a',
+        }]
+
+    monkeypatch.setattr(airports, "get_airports_by_substring",
+                        get_airports_by_substring)
+    prog_data = find_airports("  new \t york ", limit=3)
+    assert calls == [("new york", 3)]
+    assert prog_data == [AirportShortInfo(
+        country_code='AA', iata_code='AAA', country_name='country a',
+        municipality='municipality a', name='airport a')]
+
+
+def test_find_airports_with_invalid_query_returns_empty_list():
+    assert find_airports('a') == []
@@ -0,0 +1,68 @@
+from collections import Counter
+import multiprocessing
+from typing import ClassVar
+
+from pydantic import BaseModel, Field, validator
+
+from jormungand.bll.base import (
+    gen_clean_data, gen_clean_data_parallel, iter_clean_data,
+    iter_clean_data_parallel)
+
+
+class CodeModel(BaseModel):
+    code: str = Field(regex=r'^[A-Z]{2}$')
+
+
+class CodeToIdModel(BaseModel):
+    _code_to_id_map: ClassVar[dict[str, int] | None] = None
+    code: str
+    code_id: int | None = None
+
+    @validator("code_id", always=True)
+    def convert_code_to_id(cls, v, values):
+        try:
+            return CodeToIdModel._code_to_id_map[values["code"]]
+        except KeyError:
+            raise ValueError("Unknown code")
+
+
+def test_iter_clean_data_is_lazy_and_discards_invalid_entries():
+    consumed = []
+
+    def gen_data():
+        for code in ("AA", "invalid", "BB"):
+            consumed.append(code)
+            yield {"code": code}
+
+    cleaned_data = iter_clean_data(gen_data(), CodeModel)
+    assert consumed == []
+    assert next(cleaned_data) == {"code": "AA"}
+    assert consumed == ["AA"]
+    assert list(cleaned_data) == [{"code": "BB"}]
+
+
+def test_gen_clean_data_returns_list_of_cleaned_entries():
+    data = [{"code": "AA"}, {"code": "a"}]
+    assert gen_clean_data(data, CodeModel) == [{"code": "AA"}]
+
+
+def test_gen_clean_data_parallel_preserves_order_and_counts_rejects():
+    data = [{"code": "AA"}, {"code": "a"}, {"code": "BB"}, {"code": "b"},
+            {"code": "CC"}]
+    cleaned_data, rejected = gen_clean_data_parallel(
+            data, CodeModel, max_workers=2, chunk_size=2)
+    assert cleaned_data == [{"code": "AA"}, {"code": "BB"}, {"code": "CC"}]
+    assert sum(rejected.values()) == 2
+    assert all(reason.startswith("code: ") for reason in rejected)
+
+
+def test_iter_clean_data_parallel_ships_class_state_to_workers():
+    CodeToIdModel._code_to_id_map = {"AA": 1, "BB": 2}
+    data = ({"code": code} for code in ("AA", "ZZ", "BB"))
+    rejected = Counter()
+    cleaned_data = list(iter_clean_data_parallel(
+            data, CodeToIdModel, rejected, max_workers=2, chunk_size=1,
+            mp_context=multiprocessing.get_context("spawn")))
+    assert cleaned_data == [{"code": "AA", "code_id": 1},
+                            {"code": "BB", "code_id": 2}]
+    assert rejected == Counter({"code_id: Unknown code": 1})
@@ -46,3 +46,15 @@ def test_ourairports_data_import(monkeypatch, tmp_db):
     dataset_in_db(tmp_db, dataset)
     assert table_entry_count(tmp_db, db.TN_COUNTRIES) == 2
     assert table_entry_count(tmp_db, db.TN_AIRPORTS) == 2
+
+
+def test_ourairports_data_import_in_batches(monkeypatch, tmp_db):
+    dataset = db_load_dataset(tmp_db, DATASET_FIXED,
+                              remove_apk=False, load_to_db=False)
+    monkeypatch.setattr(ourairports, "_DATASET_COUNTRIES",
+                        Assets.ouraiports_countries_sample)
+    monkeypatch.setattr(ourairports, "_DATASET_AIRPORTS",
+                        Assets.ouraiports_airports_sample)
+    assert import_oa_country_data(batch_size=1) == 2
+    assert import_oa_airport_data(batch_size=1) == 2
+    dataset_in_db(tmp_db, dataset)
@@ -0,0 +1,52 @@
+from jormungand.core.cache import TTLLRUCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_get_and_set_count_hits_and_misses():
+    cache = TTLLRUCache(maxsize=2, ttl=10)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used_entry():
+    cache = TTLLRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_entries_expire_after_ttl():
+    timer = FakeTimer()
+    cache = TTLLRUCache(maxsize=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=20)
+    timer.now = 10
+    assert cache.get("a", "expired") == "expired"
+    assert cache.get("b") == 2
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 1
+
+
+def test_cache_pop_and_clear_remove_entries():
+    cache = TTLLRUCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "missing") == "missing"
+    cache.clear()
+    assert len(cache) == 0
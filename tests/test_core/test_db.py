@@ -1,8 +1,18 @@
+import asyncio
 from copy import deepcopy
+import os
+import threading
 
-from sqlalchemy import Engine, select
+import pytest
+from sqlalchemy import (
+    Column, Engine, Integer, MetaData, String, Table, create_engine, insert,
+    select, text)
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import OperationalError
 
 from jormungand.core import db
+from jormungand.core.config import config
+from jormungand.core.metrics import MetricsRegistry, load_metrics_registry
 from tests.utils import db_load_dataset, dataset_in_db
 
 DATASET_TEST_SETUP_DATASET = {
@@ -60,3 +70,255 @@ def test_dataset_testing_helper_utils(tmp_db):
         stmt = select(table).filter_by(**entry)
         result = conn.execute(stmt).all()
         assert len(result) == 0
+
+
+def test_engine_options_tune_the_pool_and_postgresql_sessions():
+    url = URL.create("postgresql+psycopg2", host="localhost", database="db")
+    settings = {"pool_size": 3, "max_overflow": 1, "pool_pre_ping": True,
+                "pool_recycle": None, "statement_timeout": 5000,
+                "executemany_mode": "values_plus_batch"}
+
+    assert db.engine_options(url, settings) == {
+        "echo": False,
+        "echo_pool": False,
+        "pool_size": 3,
+        "max_overflow": 1,
+        "pool_pre_ping": True,
+        "connect_args": {"options": "-c statement_timeout=5000"},
+        "executemany_mode": "values_plus_batch",
+    }
+
+
+def test_engine_options_skip_options_unsupported_by_the_driver():
+    url = URL.create("postgresql+asyncpg", host="localhost", database="db")
+    settings = {"statement_timeout": 5000,
+                "executemany_mode": "values_plus_batch"}
+
+    assert "executemany_mode" not in db.engine_options(url, settings)
+
+
+def test_load_db_engine_uses_the_engine_settings(monkeypatch):
+    monkeypatch.setattr(db, "_engine", None)
+    previous_settings = config.get("database", None)
+    config.set("database", {
+        "drivername": "postgresql+psycopg2", "host": "localhost",
+        "database": "db", "engine": {"pool_size": 7},
+    })
+    try:
+        db.load_db_engine()
+        engine = db.get_db_engine()
+    finally:
+        config.set("database", previous_settings)
+
+    assert engine.url.database == "db"
+    assert engine.pool.size() == 7
+    assert engine.pool._max_overflow == config.get(
+            "database_options.engine.max_overflow")
+    engine.dispose()
+
+
+def test_normalize_sql_groups_statements_by_shape():
+    assert db.normalize_sql(
+            "SELECT *\n  FROM users WHERE user_id IN (%(id_1)s, %(id_2)s)"
+            " AND username = 'O''Neil' LIMIT 10") == (
+            "SELECT * FROM users WHERE user_id IN (?...)"
+            " AND username = ? LIMIT ?")
+    assert db.normalize_sql(
+            "INSERT INTO t (a, b) VALUES (%(a_m0)s, %(b_m0)s),"
+            " (%(a_m1)s, %(b_m1)s)") == (
+            "INSERT INTO t (a, b) VALUES (?...), ...")
+
+
+def test_engine_instrumentation_feeds_the_metrics_registry(monkeypatch):
+    registry = MetricsRegistry()
+    load_metrics_registry(registry)
+    monkeypatch.setattr(db, "_engine", None)
+    engine = create_engine("sqlite://")
+    db.load_db_engine(engine)
+    db.load_db_engine(engine)  # hooks are only registered once
+    previous_threshold = config.get(
+            "database_options.metrics.slow_statement_threshold")
+    config.set("database_options.metrics.slow_statement_threshold", 0)
+    try:
+        with db.get_db_connection() as conn:
+            conn.execute(text("SELECT 1 UNION ALL SELECT 2")).all()
+    finally:
+        config.set("database_options.metrics.slow_statement_threshold",
+                   previous_threshold)
+        load_metrics_registry()
+
+    snapshot = registry.snapshot()
+    assert snapshot["counters"][db.MN_POOL_CHECKOUTS] == 1
+    assert snapshot["counters"][db.MN_POOL_CHECKINS] == 1
+    assert snapshot["histograms"][db.MN_POOL_WAIT]["count"] == 1
+    assert snapshot["histograms"][db.MN_POOL_HOLD]["count"] == 1
+    sql = "SELECT ? UNION ALL SELECT ?"
+    assert snapshot["histograms"][db.MN_STATEMENT_LATENCY][sql]["count"] == 1
+    assert snapshot["counters"][db.MN_SLOW_STATEMENTS] == {sql: 1}
+
+
+def test_failed_statements_are_recorded(monkeypatch):
+    registry = MetricsRegistry()
+    load_metrics_registry(registry)
+    monkeypatch.setattr(db, "_engine", None)
+    db.load_db_engine(create_engine("sqlite://"))
+    previous_threshold = config.get(
+            "database_options.metrics.slow_statement_threshold")
+    config.set("database_options.metrics.slow_statement_threshold", 0)
+    try:
+        with db.get_db_connection(begin_once=False) as conn:
+            for _ in range(5):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM missing_table"))
+            assert conn.info["statement_started_at"] == []
+    finally:
+        config.set("database_options.metrics.slow_statement_threshold",
+                   previous_threshold)
+        load_metrics_registry()
+
+    snapshot = registry.snapshot()
+    sql = "SELECT * FROM missing_table"
+    assert snapshot["counters"][db.MN_FAILED_STATEMENTS] == {sql: 5}
+    assert snapshot["counters"][db.MN_SLOW_STATEMENTS] == {sql: 5}
+    assert snapshot["histograms"][db.MN_STATEMENT_LATENCY][sql]["count"] == 5
+
+
+def test_async_db_url_uses_the_async_driver():
+    url = URL.create("postgresql+psycopg2", host="localhost", database="db")
+    assert db.async_db_url(url).drivername == "postgresql+asyncpg"
+    url = URL.create("sqlite+aiosqlite")
+    assert db.async_db_url(url) is url
+
+
+def test_engine_options_set_asyncpg_statement_timeout():
+    url = URL.create("postgresql+asyncpg", host="localhost", database="db")
+    assert db.engine_options(url, {"statement_timeout": 5000})[
+            "connect_args"] == {
+                "server_settings": {"statement_timeout": "5000"}}
+
+
+def test_async_db_connection_is_instrumented(monkeypatch):
+    pytest.importorskip("aiosqlite")
+    sqlalchemy_asyncio = pytest.importorskip("sqlalchemy.ext.asyncio")
+    registry = MetricsRegistry()
+    load_metrics_registry(registry)
+    monkeypatch.setattr(db, "_async_engine", None)
+    db.load_async_db_engine(
+            sqlalchemy_asyncio.create_async_engine("sqlite+aiosqlite://"))
+
+    async def main():
+        try:
+            async with db.get_async_db_connection() as conn:
+                return (await conn.execute(text("SELECT 1"))).scalar_one()
+        finally:
+            await db.aclose_async_db_engine()
+
+    try:
+        assert asyncio.run(main()) == 1
+    finally:
+        load_metrics_registry()
+    snapshot = registry.snapshot()
+    assert snapshot["histograms"][db.MN_POOL_WAIT]["count"] == 1
+    assert snapshot["histograms"][db.MN_STATEMENT_LATENCY][
+            "SELECT ?"]["count"] == 1
+    assert db._async_engine is None
+
+
+@pytest.fixture()
+def sqlite_tables_db(tmp_path, monkeypatch):
+    """A sqlite database with (simplified) tables of all the table names."""
+    engine = create_engine(f"sqlite:///{tmp_path.joinpath('db.sqlite')}")
+    metadata = MetaData()
+    for table_name in db.TABLES_LAYERED_DEPENDANCY_ORDER:
+        Table(table_name, metadata,
+              Column("property" if table_name == db.TN_META else "id",
+                     String if table_name == db.TN_META else Integer,
+                     primary_key=True),
+              Column("value", String))
+    metadata.create_all(engine)
+    monkeypatch.setattr(db, "_engine", None)
+    monkeypatch.setattr(db, "_tables", None)
+    monkeypatch.setattr(db, "metadata_obj", db.metadata_obj)
+    db.load_db_engine(engine)
+    previous_settings = {
+        key: config.get(f"database_options.metadata_cache.{key}")
+        for key in ("enabled", "directory")
+    }
+    config.set("database_options.metadata_cache.enabled", True)
+    config.set("database_options.metadata_cache.directory",
+               str(tmp_path.joinpath("cache")))
+    yield engine
+    for key, value in previous_settings.items():
+        config.set(f"database_options.metadata_cache.{key}", value)
+
+
+def test_load_db_tables_caches_the_reflected_metadata(
+        sqlite_tables_db, tmp_path, monkeypatch):
+    with sqlite_tables_db.begin() as conn:
+        conn.execute(insert(db.get_table(db.TN_META)),
+                     {"property": db.MP_SCHEMA_VERSION, "value": "v1"})
+    db.load_db_tables()
+    assert tmp_path.joinpath("cache", "metadata-v1.pickle").exists()
+
+    def _reflect_metadata():
+        raise AssertionError("tables should be loaded from the cache")
+
+    monkeypatch.setattr(db, "_reflect_metadata", _reflect_metadata)
+    db.load_db_tables()
+    assert db.get_colum_names(db.TN_META) == ("property", "value")
+    assert db.get_table(db.TN_USERS).metadata is db.metadata_obj
+
+
+def test_load_db_tables_reflects_unversioned_schemas(
+        sqlite_tables_db, tmp_path):
+    db.load_db_tables()
+    assert set(db._tables) == set(db.TABLES_LAYERED_DEPENDANCY_ORDER)
+    assert not tmp_path.joinpath("cache").exists()
+
+
+def test_load_db_tables_ignores_unreadable_caches(
+        sqlite_tables_db, tmp_path):
+    with sqlite_tables_db.begin() as conn:
+        conn.execute(text("INSERT INTO meta VALUES ('schema_version', 'v1')"))
+    tmp_path.joinpath("cache").mkdir()
+    tmp_path.joinpath("cache", "metadata-v1.pickle").write_bytes(b"corrupt")
+    db.load_db_tables()
+    assert set(db._tables) == set(db.TABLES_LAYERED_DEPENDANCY_ORDER)
+    assert db._load_cached_metadata(
+            tmp_path.joinpath("cache", "metadata-v1.pickle")) is not None
+
+
+def test_load_db_tables_ignores_caches_of_other_users(
+        sqlite_tables_db, tmp_path, monkeypatch):
+    db.stamp_schema_version("v1")
+    db.load_db_tables()
+    cache_path = tmp_path.joinpath("cache", "metadata-v1.pickle")
+    assert cache_path.parent.stat().st_mode & 0o777 == 0o700
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    assert db._load_cached_metadata(cache_path) is None
+
+
+def test_async_get_table_loads_the_tables_in_a_worker_thread(
+        sqlite_tables_db, monkeypatch):
+    load_db_tables = db.load_db_tables
+    loading_threads = []
+
+    def _load_db_tables():
+        loading_threads.append(threading.current_thread())
+        load_db_tables()
+
+    monkeypatch.setattr(db, "load_db_tables", _load_db_tables)
+    table = asyncio.run(db.async_get_table(db.TN_USERS))
+    assert table is db.get_table(db.TN_USERS)
+    assert len(loading_threads) == 1
+    assert loading_threads[0] is not threading.main_thread()
+
+
+def test_stamped_schema_version_keys_the_metadata_cache(
+        sqlite_tables_db, tmp_path):
+    db.stamp_schema_version("v1")
+    db.stamp_schema_version()
+    db.load_db_tables()
+    assert [path.name for path in tmp_path.joinpath("cache").iterdir()] == [
+        f"metadata-{db.schema_version()}.pickle"]
@@ -0,0 +1,52 @@
+from jormungand.core.metrics import OTHER_LABEL, Histogram, MetricsRegistry
+
+
+def test_histogram_snapshot_percentiles():
+    histogram = Histogram(window=100)
+    for value in range(1, 101):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["mean"] == 50.5
+    assert snapshot["max"] == 100
+    assert (snapshot["p50"], snapshot["p95"], snapshot["p99"]) == (
+            50, 95, 99)
+
+
+def test_histogram_percentiles_only_cover_the_window():
+    histogram = Histogram(window=2)
+    for value in (100, 1, 2):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 3
+    assert snapshot["max"] == 100
+    assert snapshot["p99"] == 2
+
+
+def test_registry_snapshot_of_labeled_and_unlabeled_metrics():
+    registry = MetricsRegistry()
+    registry.increment("requests")
+    registry.increment("requests", 2)
+    registry.observe("latency", 0.5, label="select")
+    registry.observe("latency", 1.5, label="insert")
+
+    snapshot = registry.snapshot()
+    assert snapshot["counters"] == {"requests": 3}
+    assert set(snapshot["histograms"]["latency"]) == {"select", "insert"}
+    assert snapshot["histograms"]["latency"]["insert"]["max"] == 1.5
+
+
+def test_registry_bounds_the_number_of_labels():
+    registry = MetricsRegistry(max_labels=2)
+    for label in ("a", "b", "c", "d"):
+        registry.increment("statements", label=label)
+    registry.increment("statements", label="a")
+    assert registry.snapshot()["counters"]["statements"] == {
+        "a": 2, "b": 1, OTHER_LABEL: 2}
+
+
+def test_registry_reset():
+    registry = MetricsRegistry()
+    registry.observe("latency", 1)
+    registry.reset()
+    assert registry.snapshot() == {"counters": {}, "histograms": {}}
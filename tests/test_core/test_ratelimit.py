@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+
+from jormungand.core.ratelimit import TokenBucket
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_burst_then_refills_at_rate():
+    timer = FakeTimer()
+    bucket = TokenBucket(rate=2, burst=3, timer=timer)
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.try_acquire() == 0.5
+    timer.now += 0.5
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+    timer.now += 100
+    assert [bucket.try_acquire() for _ in range(4)] == [0, 0, 0, 0.5]
+
+
+def test_bucket_keeps_reserved_tokens_for_higher_priorities():
+    timer = FakeTimer()
+    bucket = TokenBucket(rate=1, burst=4, reserves=(0, 1, 2), timer=timer)
+    assert bucket.try_acquire(priority=2) == 0
+    assert bucket.try_acquire(priority=2) == 0
+    assert bucket.try_acquire(priority=2) == 1
+    assert bucket.try_acquire(priority=1) == 0
+    assert bucket.try_acquire(priority=1) == 1
+    assert bucket.try_acquire(priority=0) == 0
+    assert bucket.try_acquire(priority=0) == 1
+
+
+def test_paused_bucket_hands_out_no_tokens():
+    timer = FakeTimer()
+    bucket = TokenBucket(rate=10, burst=10, timer=timer)
+    bucket.pause(2)
+    assert bucket.try_acquire() == 2
+    timer.now += 2
+    assert bucket.try_acquire() > 0
+    timer.now += 0.1
+    assert bucket.try_acquire() == 0
+    assert bucket.stats()["pauses"] == 1
+
+
+def test_acquire_waits_for_tokens():
+    bucket = TokenBucket(rate=50, burst=5)
+    start_time = time.perf_counter()
+    for _ in range(15):
+        bucket.acquire()
+    assert time.perf_counter() - start_time >= 0.18
+    assert bucket.stats()["acquired"] == 15
+
+
+def test_async_acquire_waits_for_tokens():
+    bucket = TokenBucket(rate=50, burst=5)
+
+    async def main():
+        await asyncio.gather(*(bucket.async_acquire() for _ in range(15)))
+
+    start_time = time.perf_counter()
+    asyncio.run(main())
+    assert time.perf_counter() - start_time >= 0.18
+    assert bucket.stats()["acquired"] == 15
+
+
+def test_bucket_rejects_reserves_leaving_no_room_for_a_token():
+    with pytest.raises(ValueError, match="burst"):
+        TokenBucket(rate=10, burst=3, reserves=(0, 1, 3))
+    with pytest.raises(ValueError, match="reserves"):
+        TokenBucket(rate=10, burst=3, reserves=(0, -1))
+    with pytest.raises(ValueError, match="rate"):
+        TokenBucket(rate=0, burst=3)
+
+
+def test_every_priority_can_take_a_token_from_a_full_bucket():
+    reserves = (0, 1, 3)
+    for priority in range(len(reserves) + 1):
+        bucket = TokenBucket(rate=10, burst=4, reserves=reserves,
+                             timer=FakeTimer())
+        assert bucket.try_acquire(priority) == 0
@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from jormungand.core.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_thread_calls_share_one_execution():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow_call(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(single_flight.do, "key", slow_call, 21)
+                   for _ in range(4)]
+        for _ in range(500):
+            if single_flight.stats()["shared"] >= 3:
+                break
+            threading.Event().wait(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+    assert results == [42] * 4
+    assert calls == [21]
+    assert single_flight.stats() == {"executed": 1, "shared": 3}
+    assert single_flight.do("key", lambda: "new call") == "new call"
+
+
+def test_thread_call_exceptions_are_raised():
+    single_flight = SingleFlight()
+
+    def failing_call():
+        raise ValueError("upstream error")
+
+    with pytest.raises(ValueError, match="upstream error"):
+        single_flight.do("key", failing_call)
+
+
+def test_concurrent_async_calls_share_one_execution():
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow_call(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def run():
+        return await asyncio.gather(
+            *(single_flight.do("key", slow_call, 21) for _ in range(4)),
+            single_flight.do("other key", slow_call, 1))
+
+    assert asyncio.run(run()) == [42, 42, 42, 42, 2]
+    assert calls == [21, 1]
+    assert single_flight.stats() == {"executed": 2, "shared": 3}
+
+
+def test_cancelling_the_first_async_caller_does_not_cancel_the_others():
+    single_flight = AsyncSingleFlight()
+
+    async def slow_call():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        leader = asyncio.create_task(single_flight.do("key", slow_call))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.do("key", slow_call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader_result, follower_result = asyncio.run(run())
+    assert isinstance(leader_result, asyncio.CancelledError)
+    assert follower_result == "result"
+    assert single_flight.stats() == {"executed": 1, "shared": 1}
@@ -1,5 +1,11 @@
+import asyncio
+import contextlib
+
 from jormungand.core import db
+from jormungand.dal import airports, airports_init_data
+from jormungand.dal import async_get_airports_by_substring
 from jormungand.dal import get_airports_by_substring
+from jormungand.dal import refresh_airports_search_strings
 from tests.utils import (
     db_load_dataset, table_entry_count)
 
@@ -71,7 +77,93 @@ DATASET_SEARCH_STRING_AA_LIMIT_5 = {
 def test_get_airports_by_substring_returns_correct_airport_matches(tmp_db):
     db_load_dataset(tmp_db, DATASET_SEARCH_STRING_AA_LIMIT_5,
                     remove_apk=False, return_copy=False)
+    refresh_airports_search_strings()
     prog_data = get_airports_by_substring("AA", 5)
     assert len(prog_data) == 5
     for airport, expected_id in zip(prog_data, range(1, 6)):
         assert airport["airport_id"] == expected_id
+
+
+def test_get_airports_by_substring_with_index_is_invalidated_on_reload(
+        tmp_db):
+    airports.invalidate_search_caches()
+    dataset = db_load_dataset(tmp_db, DATASET_SEARCH_STRING_AA_LIMIT_5,
+                              remove_apk=False)
+    prog_data = get_airports_by_substring("AA", 5, use_index=True)
+    assert [airport["airport_id"] for airport in prog_data] == [1, 2, 3, 4, 5]
+    airports_init_data(
+        entry for entry in dataset["airports"].values()
+        if entry["airport_id"] != 1)
+    prog_data = get_airports_by_substring("AA", 5, use_index=True)
+    assert [airport["airport_id"] for airport in prog_data] == [2, 3, 4, 5, 6]
+
+
+def test_get_airports_by_substring_ranks_distinct_airports(tmp_db):
+    db_load_dataset(tmp_db, DATASET_SEARCH_STRING_AA_LIMIT_5,
+                    remove_apk=False, return_copy=False)
+    refresh_airports_search_strings()
+    for use_index in (False, True):
+        airports.invalidate_search_caches()
+        prog_data = get_airports_by_substring("aaz", 5, use_index=use_index)
+        assert [airport["airport_id"] for airport in prog_data] == [
+            2, 3, 4, 6]
+        prog_data = get_airports_by_substring("zz", 5, use_index=use_index)
+        assert [airport["airport_id"] for airport in prog_data] == [
+            4, 5, 6, 1]
+
+
+def test_get_airports_by_substring_caches_results_until_reload(tmp_db):
+    dataset = db_load_dataset(tmp_db, DATASET_SEARCH_STRING_AA_LIMIT_5,
+                              remove_apk=False)
+    refresh_airports_search_strings()
+    stats = airports.search_cache_stats()
+    prog_data = get_airports_by_substring("AA", 5)
+    assert get_airports_by_substring("aa", 5) == prog_data
+    assert airports.search_cache_stats()["hits"] == stats["hits"] + 1
+    airports_init_data(
+        entry for entry in dataset["airports"].values()
+        if entry["airport_id"] != 1)
+    refresh_airports_search_strings()
+    prog_data = get_airports_by_substring("AA", 5)
+    assert [airport["airport_id"] for airport in prog_data] == [2, 3, 4, 5, 6]
+
+
+def test_async_get_airports_by_substring_matches_sync_variant(
+        tmp_db, tmp_async_db):
+    db_load_dataset(tmp_db, DATASET_SEARCH_STRING_AA_LIMIT_5,
+                    remove_apk=False, return_copy=False)
+    refresh_airports_search_strings()
+    for use_index in (False, True):
+        airports.invalidate_search_caches()
+        prog_data = asyncio.run(async_get_airports_by_substring(
+                "aaz", 5, use_index=use_index))
+        assert prog_data == get_airports_by_substring(
+                "aaz", 5, use_index=use_index)
+
+
+def test_results_of_searches_running_during_an_invalidation_are_not_cached(
+        monkeypatch):
+    """The caches are invalidated (e.g. by a data reload) between the db
+    query and the caching of its (possibly stale) result."""
+
+    class _ReloadingConnection:
+        def execute(self, stmt, params):
+            airports.invalidate_search_caches()
+            return self
+
+        def mappings(self):
+            return self
+
+        def all(self):
+            return [{"airport_id": 1}]
+
+    @contextlib.contextmanager
+    def get_db_connection():
+        yield _ReloadingConnection()
+
+    monkeypatch.setattr(db, "get_db_connection", get_db_connection)
+    airports.invalidate_search_caches()
+    stats = airports.search_cache_stats()
+    assert get_airports_by_substring("AA", 5) == [{"airport_id": 1}]
+    assert get_airports_by_substring("AA", 5) == [{"airport_id": 1}]
+    assert airports.search_cache_stats()["hits"] == stats["hits"]
@@ -0,0 +1,62 @@
+from jormungand.dal.airports_search_index import AirportsSearchIndex
+
+AIRPORTS = [
+    {
+        'airport_id': 1, 'country_code': 'AA', 'iata_code': 'ZZZ',
+        'country_name': '---', 'municipality': '---',
+        'airport_name': 'should be 1st match due to country code',
+    },
+    {
+        'airport_id': 2, 'country_code': 'BB', 'iata_code': 'AAZ',
+        'country_name': 'aaz', 'municipality': '---',
+        'airport_name': 'should be 2nd match due to IATA code',
+    },
+    {
+        'airport_id': 3, 'country_code': 'BB', 'iata_code': 'BBB',
+        'country_name': 'aaz', 'municipality': '---',
+        'airport_name': 'should be 3rd match due to country name',
+    },
+    {
+        'airport_id': 4, 'country_code': 'ZZ', 'iata_code': 'NNN',
+        'country_name': 'zzz', 'municipality': 'aaz',
+        'airport_name': 'should be 4th match due to municipality',
+    },
+    {
+        'airport_id': 5, 'country_code': 'ZZ', 'iata_code': 'PPP',
+        'country_name': 'zzz', 'municipality': None,
+        'airport_name': 'aay should be 5th match due to airport name',
+    },
+    {
+        'airport_id': 6, 'country_code': 'ZZ', 'iata_code': 'TTT',
+        'country_name': 'zzz', 'municipality': '---',
+        'airport_name': 'aaz should be excluded from matches due to limit',
+    },
+]
+
+
+def test_search_returns_distinct_airports_in_priority_order():
+    index = AirportsSearchIndex(AIRPORTS)
+    prog_data = index.search("AA", 5)
+    assert [airport["airport_id"] for airport in prog_data] == [1, 2, 3, 4, 5]
+    assert prog_data[0] == AIRPORTS[0]
+
+
+def test_search_with_long_query_matches_substrings_case_insensitively():
+    index = AirportsSearchIndex(AIRPORTS)
+    prog_data = index.search("MATCH DUE TO MUNI", 5)
+    assert [airport["airport_id"] for airport in prog_data] == [4]
+
+
+def test_search_without_matches_returns_empty_list():
+    index = AirportsSearchIndex(AIRPORTS)
+    assert index.search("xyz", 5) == []
+    assert index.search("", 5) == []
+    assert index.search("aa", 0) == []
+
+
+def test_search_ranks_exact_then_prefix_then_substring_matches():
+    index = AirportsSearchIndex(AIRPORTS)
+    prog_data = index.search("aaz", 5)
+    assert [airport["airport_id"] for airport in prog_data] == [2, 3, 4, 6]
+    prog_data = index.search("zz", 5)
+    assert [airport["airport_id"] for airport in prog_data] == [4, 5, 6, 1]
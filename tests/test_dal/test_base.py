@@ -0,0 +1,167 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from jormungand.core import db
+from jormungand.core.exceptions import DataNotFoundError
+from jormungand.core.metrics import MetricsRegistry, load_metrics_registry
+from jormungand.dal import base
+from tests.utils import (
+    db_load_dataset, dataset_in_db, table_entry_count)
+
+DATASET_COUNTRIES = {
+    "countries": {
+        1: {'country_id': 1, 'code': 'AA', 'name': 'plain country a'},
+        2: {'country_id': 2, 'code': 'BB', 'name': 'tab\tcountry b'},
+        3: {'country_id': 3, 'code': 'CC', 'name': 'back\\slash\ncountry c'},
+    }
+}
+
+
+def test_copy_text_value_escapes_special_characters():
+    assert base._copy_text_value(None) == "\\N"
+    assert base._copy_text_value(5) == "5"
+    assert base._copy_text_value("a\tb\nc\rd\\e") == "a\\tb\\nc\\rd\\\\e"
+
+
+def test_iter_chunks_splits_data_into_bounded_chunks():
+    chunks = list(base._iter_chunks(({"n": n} for n in range(5)), 2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+def test_copy_chunk_records_the_statement_metrics():
+    table = sa.Table("countries", sa.MetaData(),
+                     sa.Column("code", sa.String),
+                     sa.Column("name", sa.String))
+    copied = []
+
+    class FakeCursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            pass
+
+        def copy_expert(self, sql, file):
+            copied.append((sql, file.read()))
+
+    conn = SimpleNamespace(
+            dialect=postgresql.dialect(),
+            connection=SimpleNamespace(dbapi_connection=SimpleNamespace(
+                cursor=FakeCursor)))
+    registry = MetricsRegistry()
+    load_metrics_registry(registry)
+    try:
+        base._copy_chunk(conn, table, [{"code": "AA", "name": "a"},
+                                       {"code": "BB", "name": None}])
+    finally:
+        load_metrics_registry()
+
+    copy_stmt = "COPY countries (code, name) FROM STDIN"
+    assert copied == [(copy_stmt, "AA\ta\nBB\t\\N\n")]
+    histograms = registry.snapshot()["histograms"]
+    assert histograms[db.MN_STATEMENT_LATENCY][copy_stmt]["count"] == 1
+    assert histograms[db.MN_STATEMENT_ROWS][copy_stmt]["sum"] == 2
+
+
+def test_insert_one_reports_duplicate_keys():
+    table = sa.Table("countries", sa.MetaData(),
+                     sa.Column("country_id", sa.Integer, primary_key=True),
+                     sa.Column("code", sa.String))
+
+    class DuplicateKeyConnection:
+        def execute(self, stmt, parameters=None):
+            raise IntegrityError(
+                    "INSERT ...", parameters, Exception(
+                        'duplicate key value violates unique constraint '
+                        '"countries_code_key"\n'
+                        'DETAIL:  Key (code)=(AA) already exists.\n'))
+
+    result = base._insert_one(DuplicateKeyConnection(), table, "country_id",
+                              {"code": "AA"})
+    assert result == {
+        "status": "DuplicationError",
+        "info": {"table": "countries", "column": "code", "value": "AA"},
+    }
+
+
+def test_init_table_data_replaces_existing_data_in_chunks(tmp_db):
+    dataset = db_load_dataset(tmp_db, DATASET_COUNTRIES,
+                              remove_apk=False, load_to_db=False)
+    db_load_dataset(tmp_db, {
+        "countries": {9: {'code': 'ZZ', 'name': 'old country'}}})
+    data = (entry for entry in dataset["countries"].values())
+    row_count = base.init_table_data(db.TN_COUNTRIES, data, chunk_size=2)
+    assert row_count == 3
+    assert table_entry_count(tmp_db, db.TN_COUNTRIES) == 3
+    dataset_in_db(tmp_db, dataset)
+
+
+def test_async_crud_helpers(tmp_db, tmp_async_db):
+    dataset = db_load_dataset(tmp_db, DATASET_COUNTRIES, remove_apk=False)
+    countries = list(dataset["countries"].values())
+
+    async def main():
+        assert await base.async_get_by_id(
+                db.TN_COUNTRIES, "country_id", 1) == countries[0]
+        assert await base.async_get_all(db.TN_COUNTRIES) == countries
+        updated = await base.async_update(
+                db.TN_COUNTRIES, "country_id",
+                {"country_id": 2, "name": "renamed country b"})
+        assert updated["name"] == "renamed country b"
+        deleted = await base.async_delete(db.TN_COUNTRIES, "country_id", 3)
+        assert deleted == countries[2]
+        with pytest.raises(DataNotFoundError):
+            await base.async_get_by_id(db.TN_COUNTRIES, "country_id", 3)
+
+    asyncio.run(main())
+    assert table_entry_count(tmp_db, db.TN_COUNTRIES) == 2
+
+
+def test_async_add_one_reports_duplicate_keys(tmp_db, tmp_async_db):
+    dataset = db_load_dataset(tmp_db, DATASET_COUNTRIES, remove_apk=False)
+
+    async def main():
+        return await base.async_add_one(
+                db.TN_COUNTRIES, "country_id", dataset["countries"][1])
+
+    result = asyncio.run(main())
+    assert result["status"] == "DuplicationError"
+    assert result["info"]["table"] == db.TN_COUNTRIES
+    assert table_entry_count(tmp_db, db.TN_COUNTRIES) == 3
+
+
+def test_bulk_add_many_reports_inserted_and_conflicting_entries(tmp_db):
+    db_load_dataset(tmp_db, {"countries": {1: DATASET_COUNTRIES[
+        "countries"][1]}})
+    data = [
+        {'code': 'AA', 'name': 'plain country a'},
+        {'code': 'BB', 'name': 'country b'},
+        {'code': 'CC', 'name': 'country c'},
+        {'code': 'BB', 'name': 'country b'},
+        {'code': 'DD', 'name': 'country d'},
+    ]
+    result = base.bulk_add_many(db.TN_COUNTRIES, "code", iter(data),
+                                chunk_size=2)
+    assert result["status"] == "success"
+    assert [row["code"] for row in result["inserted"]] == ["BB", "CC", "DD"]
+    assert result["conflicted"] == [data[0], data[3]]
+    assert result["failed"] == []
+    assert table_entry_count(tmp_db, db.TN_COUNTRIES) == 4
+
+
+def test_bulk_add_many_skips_chunks_with_invalid_data(tmp_db):
+    data = [
+        {'code': 'AA', 'name': 'country a'},
+        {'code': 'BB', 'name': None},
+        {'code': 'CC', 'name': 'country c'},
+    ]
+    result = base.bulk_add_many(db.TN_COUNTRIES, "code", data, chunk_size=2)
+    assert result["status"] == "UnexpectedError"
+    assert result["failed"] == data[:2]
+    assert [row["code"] for row in result["inserted"]] == ["CC"]
+    assert base.add_many(db.TN_COUNTRIES, "code", data[2:]) == []
@@ -0,0 +1,16 @@
+from jormungand.dal import ourairports
+from tests.utils import Assets
+
+
+def test_oa_airports_iter_pre_filters_rows(monkeypatch):
+    monkeypatch.setattr(ourairports, "_DATASET_AIRPORTS",
+                        Assets.ouraiports_airports_sample)
+    all_airports = list(ourairports.oa_airports_iter())
+    filtered_airports = list(ourairports.oa_airports_iter(
+            airport_types={"large_airport"}, require_iata_code=True))
+    assert len(filtered_airports) < len(all_airports)
+    assert filtered_airports == [
+        airport for airport in all_airports
+        if airport["airport_type"] == "large_airport"
+        and airport["iata_code"] != ""
+    ]
@@ -0,0 +1,92 @@
+import datetime as dt
+from decimal import Decimal
+import json
+
+import pytest
+
+from jormungand.flights.query import OffersTable
+from jormungand.providers.amadeus.formatting import format_flight_offers
+from tests.utils import Assets
+
+
+@pytest.fixture(scope="module")
+def listing():
+    return format_flight_offers(
+            json.loads(Assets.amadeus_flights_search_one_way.read_text()))
+
+
+def _stops(offer):
+    return max(
+        len(itinerary.segments) - 1
+        + sum(segment.stops for segment in itinerary.segments)
+        for itinerary in offer.itineraries)
+
+
+def _duration(offer):
+    return sum(itinerary.duration_minutes for itinerary in offer.itineraries)
+
+
+def _departure(offer):
+    return offer.itineraries[0].segments[0].departure_at
+
+
+def test_query_sorts_by_price_keeping_original_order_of_ties(listing):
+    offers = listing.query()
+    assert offers == sorted(listing.offers, key=lambda o: o.grand_total)
+
+
+@pytest.mark.parametrize("filters", [
+    {"max_price": Decimal("1000")},
+    {"max_stops": 1},
+    {"max_duration": 24 * 60},
+    {"carriers": ["LH", "LX"]},
+    {"departure_from": dt.datetime(2023, 7, 3, 10),
+     "departure_to": dt.datetime(2023, 7, 3, 18)},
+    {"max_price": 1200, "max_stops": 2, "sort_by": "duration"},
+    {"max_price": 1200, "sort_by": "departure", "descending": True},
+])
+def test_query_matches_reference_filtering(listing, filters):
+    def matches(offer):
+        carriers = filters.get("carriers")
+        departure_from = filters.get("departure_from", dt.datetime.min)
+        departure_to = filters.get("departure_to", dt.datetime.max)
+        max_price = filters.get("max_price", offer.grand_total)
+        return (offer.grand_total <= max_price
+                and _stops(offer) <= filters.get("max_stops", 99)
+                and _duration(offer) <= filters.get("max_duration", 10 ** 6)
+                and (carriers is None
+                     or offer.validating_carrier_codes[0] in carriers)
+                and departure_from <= _departure(offer) <= departure_to)
+
+    sort_key = {
+        "price": lambda offer: offer.grand_total,
+        "duration": _duration,
+        "departure": _departure,
+    }[filters.get("sort_by", "price")]
+    expected = [offer for offer in listing.offers if matches(offer)]
+    offers = listing.query(**filters)
+    assert expected
+    assert set(offers) == set(expected)
+    assert [sort_key(offer) for offer in offers] == sorted(
+            map(sort_key, expected), reverse=filters.get("descending", False))
+
+
+def test_query_limit_returns_top_k(listing):
+    offers = listing.query(sort_by="duration", limit=5)
+    assert offers == listing.query(sort_by="duration")[:5]
+    assert listing.query(limit=0) == []
+
+
+def test_query_unknown_carriers_match_nothing(listing):
+    assert listing.query(carriers=["XX"]) == []
+
+
+def test_query_rejects_unknown_sort_key(listing):
+    with pytest.raises(ValueError):
+        listing.query(sort_by="seats")
+
+
+def test_table_is_built_once_per_listing(listing):
+    assert listing.table is listing.table
+    assert len(listing.table) == len(listing.offers)
+    assert isinstance(listing.table, OffersTable)
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from jormungand.core.cache import TTLLRUCache
+from jormungand.providers.amadeus import flight_offers_search, mongodb
+from tests.utils import Assets
+
+
+@pytest.fixture()
+def mock_mongodb(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setattr(mongodb, "_client", None)
+    monkeypatch.setattr(flight_offers_search, "_cache_indexes_ensured", False)
+    monkeypatch.setattr(flight_offers_search, "_memory_cache",
+                        TTLLRUCache(maxsize=8, ttl=60))
+    mongodb.load_client(mongomock.MongoClient())
+    return mongodb.get_db()
+
+
+@pytest.fixture()
+def fake_amadeus_search(monkeypatch):
+    calls = []
+    search_result = json.loads(
+            Assets.amadeus_flights_search_one_way.read_text())
+
+    def _amadeus_flight_offers_search(params):
+        calls.append(params)
+        return search_result
+
+    monkeypatch.setattr(flight_offers_search, "_amadeus_flight_offers_search",
+                        _amadeus_flight_offers_search)
+    return calls
@@ -0,0 +1,151 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+
+from jormungand.core.config import config
+from jormungand.providers.amadeus import auth
+
+
+class FakeAuthServer:
+    """Counts token requests, optionally blocking them until released."""
+
+    def __init__(self, expires_in: int = 1805):
+        self.expires_in = expires_in
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+        self._token_ids = itertools.count(1)
+        self.requests = 0
+
+    def fetch_token(self) -> dict:
+        self.requests += 1
+        self.release.wait(5)
+        if self.fail:
+            return {"errors": [{"status": 500}]}
+        return {
+            "state": "approved",
+            "token_type": "Bearer",
+            "access_token": f"token-{next(self._token_ids)}",
+            "expires_in": self.expires_in,
+        }
+
+
+class FakeTimer:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _token_manager(auth_server: FakeAuthServer, timer: FakeTimer):
+    return auth.TokenManager(
+            auth_server.fetch_token, refresh_margin=60, retry_interval=5,
+            timer=timer)
+
+
+def _wait_for_background_refresh(token_manager: auth.TokenManager):
+    for _ in range(500):
+        if not token_manager._refreshing:
+            return
+        threading.Event().wait(0.01)
+
+
+def test_concurrent_callers_share_one_initial_refresh():
+    auth_server = FakeAuthServer()
+    token_manager = _token_manager(auth_server, FakeTimer())
+    auth_server.release.clear()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [
+            executor.submit(token_manager.get_auth_header) for _ in range(8)
+        ]
+        threading.Event().wait(0.05)
+        auth_server.release.set()
+        auth_headers = [future.result() for future in futures]
+    assert auth_server.requests == 1
+    assert all(auth_header == {"Authorization": "Bearer token-1"}
+               for auth_header in auth_headers)
+
+
+def test_token_is_refreshed_in_background_ahead_of_expiry():
+    auth_server = FakeAuthServer()
+    timer = FakeTimer()
+    token_manager = _token_manager(auth_server, timer)
+    token_manager.get_auth_header()
+    timer.now += 1800 - 59
+    auth_server.release.clear()
+    for _ in range(5):
+        assert token_manager.get_auth_header() == {
+            "Authorization": "Bearer token-1"}
+    auth_server.release.set()
+    _wait_for_background_refresh(token_manager)
+    assert auth_server.requests == 2
+    assert token_manager.get_auth_header() == {
+        "Authorization": "Bearer token-2"}
+    assert token_manager.stats()["background_refreshes"] == 1
+
+
+def test_failed_background_refresh_keeps_valid_token():
+    auth_server = FakeAuthServer()
+    timer = FakeTimer()
+    token_manager = _token_manager(auth_server, timer)
+    token_manager.get_auth_header()
+    timer.now += 1800 - 59
+    auth_server.fail = True
+    assert token_manager.get_auth_header() == {
+        "Authorization": "Bearer token-1"}
+    _wait_for_background_refresh(token_manager)
+    assert token_manager.get_auth_header() == {
+        "Authorization": "Bearer token-1"}
+    _wait_for_background_refresh(token_manager)
+    assert auth_server.requests == 2
+    assert token_manager.stats()["failed_refreshes"] == 1
+
+
+def test_async_callers_share_one_refresh_of_expired_token():
+    auth_server = FakeAuthServer()
+    timer = FakeTimer()
+    token_manager = _token_manager(auth_server, timer)
+    token_manager.get_auth_header()
+    timer.now += 1800
+
+    async def main():
+        return await asyncio.gather(*(
+            token_manager.async_get_auth_header() for _ in range(20)))
+
+    auth_headers = asyncio.run(main())
+    assert auth_server.requests == 2
+    assert all(auth_header == {"Authorization": "Bearer token-2"}
+               for auth_header in auth_headers)
+
+
+def test_sync_and_async_callers_share_one_refresh():
+    auth_server = FakeAuthServer()
+    token_manager = _token_manager(auth_server, FakeTimer())
+    auth_server.release.clear()
+
+    async def main():
+        return await asyncio.gather(*(
+            token_manager.async_get_auth_header() for _ in range(8)))
+
+    with ThreadPoolExecutor(max_workers=9) as executor:
+        futures = [
+            executor.submit(token_manager.get_auth_header) for _ in range(8)
+        ]
+        futures.append(executor.submit(asyncio.run, main()))
+        threading.Event().wait(0.05)
+        auth_server.release.set()
+        sync_headers = [future.result() for future in futures[:-1]]
+        async_headers = futures[-1].result()
+    assert auth_server.requests == 1
+    assert all(auth_header == {"Authorization": "Bearer token-1"}
+               for auth_header in sync_headers + async_headers)
+
+
+def test_token_state_is_kept_out_of_config(amadeus_stub):
+    assert auth.get_auth_header() == {
+        "Authorization": "Bearer stub-access-token"}
+    assert config.get("amadeus.access_token", None) is None
+    assert config.get("amadeus.next_refresh", None) is None
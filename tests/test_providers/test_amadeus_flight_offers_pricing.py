@@ -0,0 +1,81 @@
+from copy import deepcopy
+import json
+
+import pytest
+
+from jormungand.core.cache import TTLLRUCache
+from jormungand.providers.amadeus import (
+    flight_create_orders, flight_offers_pricing)
+from tests.utils import Assets
+
+PRICING_PATH = "/v1/shopping/flight-offers/pricing"
+
+
+@pytest.fixture()
+def pricing_cache(monkeypatch):
+    cache = TTLLRUCache(maxsize=8, ttl=60)
+    monkeypatch.setattr(flight_offers_pricing, "_pricing_cache", cache)
+    return cache
+
+
+@pytest.fixture(scope="module")
+def flight_offers():
+    return json.loads(
+            Assets.amadeus_flights_search_one_way.read_text())["data"][:2]
+
+
+def _pricing_request(flight_offers):
+    return {"data": {"type": "flight-offers-pricing",
+                     "flightOffers": flight_offers}}
+
+
+def test_fingerprint_ignores_volatile_fields(flight_offers):
+    offer = flight_offers[0]
+    changed_offer = deepcopy(offer)
+    changed_offer["id"] = "42"
+    changed_offer["numberOfBookableSeats"] = 1
+    changed_offer["lastTicketingDate"] = "2023-07-01"
+    changed_offer["price"]["grandTotal"] = "1.00"
+    changed_offer["itineraries"][0]["segments"][0]["id"] = "1000"
+    assert flight_offers_pricing.offers_fingerprint([offer]) == (
+            flight_offers_pricing.offers_fingerprint([changed_offer]))
+    changed_offer["itineraries"][0]["segments"][0]["number"] = "1"
+    assert flight_offers_pricing.offers_fingerprint([offer]) != (
+            flight_offers_pricing.offers_fingerprint([changed_offer]))
+
+
+def test_repeated_pricing_is_served_from_cache(
+        amadeus_stub, pricing_cache, flight_offers):
+    first = flight_offers_pricing.flight_offers_pricing(
+            _pricing_request(flight_offers[:1]))
+    refreshed_offer = deepcopy(flight_offers[0])
+    refreshed_offer["numberOfBookableSeats"] = 3
+    second = flight_offers_pricing.flight_offers_pricing(
+            _pricing_request([refreshed_offer]))
+    assert first == second
+    assert len(amadeus_stub.requests_to(PRICING_PATH)) == 1
+    assert flight_offers_pricing.pricing_cache_stats()["hits"] == 1
+
+
+def test_error_responses_are_not_cached(
+        amadeus_stub, pricing_cache, flight_offers):
+    amadeus_stub.routes[("POST", PRICING_PATH)] = (
+            lambda request: (400, {}, {"errors": [{"status": 400}]}))
+    for _ in range(2):
+        flight_offers_pricing.flight_offers_pricing(
+                _pricing_request(flight_offers[:1]))
+    assert len(amadeus_stub.requests_to(PRICING_PATH)) == 2
+
+
+def test_creating_an_order_invalidates_its_offers_pricing(
+        amadeus_stub, pricing_cache, flight_offers):
+    for offers in (flight_offers[:1], flight_offers[1:], flight_offers):
+        flight_offers_pricing.flight_offers_pricing(_pricing_request(offers))
+    flight_create_orders.flight_create_orders({"data": {
+        "type": "flight-order", "flightOffers": flight_offers[:1],
+        "travelers": []}})
+    flight_offers_pricing.flight_offers_pricing(
+            _pricing_request(flight_offers[:1]))
+    flight_offers_pricing.flight_offers_pricing(
+            _pricing_request(flight_offers[1:]))
+    assert len(amadeus_stub.requests_to(PRICING_PATH)) == 4
@@ -0,0 +1,263 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+import datetime as dt
+from decimal import Decimal
+import json
+import threading
+import time
+
+from pymongo.errors import OperationFailure
+import pytest
+
+from jormungand.core.config import config
+from jormungand.core.singleflight import AsyncSingleFlight, SingleFlight
+from jormungand.flights.validation.models import FlightsSearch
+from jormungand.providers.amadeus import flight_offers_search
+from tests.utils import Assets
+
+SEARCH_PARAMS = FlightsSearch(
+    origin="tlv", destination="LAS", departure_date=dt.date(2023, 7, 3))
+
+
+def test_format_search_params_returns_serializable_params():
+    assert flight_offers_search._format_search_params(SEARCH_PARAMS) == {
+        "originLocationCode": "TLV",
+        "destinationLocationCode": "LAS",
+        "departureDate": "2023-07-03",
+        "adults": 1,
+    }
+
+
+def test_search_flights_caches_search_results(
+        mock_mongodb, fake_amadeus_search):
+    stats = flight_offers_search.cache_stats()
+    flight_offers_search.search_flights(SEARCH_PARAMS)
+    flight_offers_search.search_flights(SEARCH_PARAMS)
+    assert len(fake_amadeus_search) == 1
+    new_stats = flight_offers_search.cache_stats()
+    assert new_stats["hits"] == stats["hits"] + 1
+    assert new_stats["memory_hits"] == stats["memory_hits"] + 1
+    assert new_stats["misses"] == stats["misses"] + 1
+    cached = flight_offers_search._cached_flight_offers_search(
+            fake_amadeus_search[0])
+    assert len(cached) == 110
+
+
+def test_expired_search_results_are_not_served(
+        mock_mongodb, fake_amadeus_search):
+    flight_offers_search.search_flights(SEARCH_PARAMS)
+    mock_mongodb[flight_offers_search._mongodb_collection].update_many(
+            {}, {"$set": {"created_at": dt.datetime(2000, 1, 1)}})
+    flight_offers_search._memory_cache.clear()
+    flight_offers_search.search_flights(SEARCH_PARAMS)
+    assert len(fake_amadeus_search) == 2
+
+
+def test_mongodb_hits_are_cached_in_memory_no_longer_than_mongodb_ttl(
+        mock_mongodb, fake_amadeus_search):
+    flight_offers_search.search_flights(SEARCH_PARAMS)
+    ttl = flight_offers_search._cache_ttl()
+    mock_mongodb[flight_offers_search._mongodb_collection].update_many(
+            {}, {"$set": {"created_at": dt.datetime.utcnow()
+                          - dt.timedelta(seconds=ttl - 5)}})
+    flight_offers_search._memory_cache.clear()
+    stats = flight_offers_search.cache_stats()
+    flight_offers_search.search_flights(SEARCH_PARAMS)
+    assert flight_offers_search.cache_stats()["mongodb_hits"] == (
+            stats["mongodb_hits"] + 1)
+    search_key = flight_offers_search._cache_key(fake_amadeus_search[0])
+    expires_at, _ = flight_offers_search._memory_cache._entries[search_key]
+    assert expires_at - flight_offers_search._memory_cache._timer() <= 5
+
+
+def test_cache_collection_has_ttl_and_key_indexes(mock_mongodb):
+    flight_offers_search.ensure_cache_indexes()
+    indexes = mock_mongodb[
+            flight_offers_search._mongodb_collection].index_information()
+    assert "expireAfterSeconds" in indexes["created_at_ttl"]
+    assert indexes["search_key_created_at"]["key"] == [
+        ("search_key", 1), ("created_at", -1)]
+
+
+def test_cache_ttl_index_is_updated_when_the_ttl_changes(
+        mock_mongodb, monkeypatch):
+    flight_offers_search.ensure_cache_indexes()
+    commands = []
+    monkeypatch.setattr(type(mock_mongodb), "command",
+                        lambda db, command: commands.append(command))
+    previous_ttl = config.get("amadeus_options.flights_cache.ttl")
+    config.set("amadeus_options.flights_cache.ttl", previous_ttl + 60)
+    try:
+        flight_offers_search.ensure_cache_indexes()
+    finally:
+        config.set("amadeus_options.flights_cache.ttl", previous_ttl)
+    assert commands == [{
+        "collMod": flight_offers_search._mongodb_collection,
+        "index": {"name": "created_at_ttl",
+                  "expireAfterSeconds": previous_ttl + 60},
+    }]
+
+
+def test_searches_work_if_the_cache_indexes_cannot_be_updated(
+        mock_mongodb, fake_amadeus_search, monkeypatch):
+    flight_offers_search.ensure_cache_indexes()
+
+    def command(db, command):
+        raise OperationFailure("collMod failed")
+
+    monkeypatch.setattr(type(mock_mongodb), "command", command)
+    previous_ttl = config.get("amadeus_options.flights_cache.ttl")
+    config.set("amadeus_options.flights_cache.ttl", previous_ttl + 60)
+    try:
+        assert flight_offers_search.search_flights(SEARCH_PARAMS)
+    finally:
+        config.set("amadeus_options.flights_cache.ttl", previous_ttl)
+    assert len(fake_amadeus_search) == 1
+
+
+def test_error_responses_are_not_cached(mock_mongodb):
+    flight_offers_search._cache_flights_search_result(
+            {"adults": 1}, {"errors": [{"status": 500}]})
+    assert mock_mongodb[
+        flight_offers_search._mongodb_collection].count_documents({}) == 0
+
+
+def test_concurrent_identical_searches_share_one_upstream_search(
+        mock_mongodb, fake_amadeus_search, monkeypatch):
+    release = threading.Event()
+    fake_search = flight_offers_search._amadeus_flight_offers_search
+
+    def slow_amadeus_flight_offers_search(params):
+        release.wait(5)
+        return fake_search(params)
+
+    monkeypatch.setattr(flight_offers_search, "_amadeus_flight_offers_search",
+                        slow_amadeus_flight_offers_search)
+    monkeypatch.setattr(flight_offers_search, "_search_single_flight",
+                        SingleFlight())
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(flight_offers_search.search_flights,
+                            SEARCH_PARAMS)
+            for _ in range(4)
+        ]
+        for _ in range(500):
+            if flight_offers_search.single_flight_stats()["shared"] >= 3:
+                break
+            threading.Event().wait(0.01)
+        release.set()
+        for future in futures:
+            future.result()
+    assert len(fake_amadeus_search) == 1
+
+
+def test_async_search_flights_coalesces_concurrent_identical_searches(
+        mock_mongodb, fake_amadeus_search, monkeypatch):
+    fake_search = flight_offers_search._amadeus_flight_offers_search
+
+    async def _async_amadeus_flight_offers_search(params):
+        await asyncio.sleep(0.05)
+        return fake_search(params)
+
+    monkeypatch.setattr(flight_offers_search,
+                        "_async_amadeus_flight_offers_search",
+                        _async_amadeus_flight_offers_search)
+    monkeypatch.setattr(flight_offers_search, "_async_search_single_flight",
+                        AsyncSingleFlight())
+
+    async def main():
+        await asyncio.gather(*(
+            flight_offers_search.async_search_flights(SEARCH_PARAMS)
+            for _ in range(10)))
+        await flight_offers_search.async_search_flights(SEARCH_PARAMS)
+
+    asyncio.run(main())
+    assert len(fake_amadeus_search) == 1
+    assert mock_mongodb[
+        flight_offers_search._mongodb_collection].count_documents({}) == 1
+
+
+@pytest.fixture()
+def fake_amadeus_daily_prices(monkeypatch):
+    """Fake searches whose cheapest offer costs the departure day number."""
+    calls = []
+    search_result = json.loads(
+            Assets.amadeus_flights_search_one_way.read_text())
+
+    def _daily_result(params):
+        calls.append(params)
+        day = dt.date.fromisoformat(params["departureDate"]).day
+        result = deepcopy(search_result)
+        result["data"][7]["price"]["grandTotal"] = f"{day}.00"
+        return result
+
+    def _amadeus_flight_offers_search(params):
+        threading.Event().wait(0.2)
+        return _daily_result(params)
+
+    async def _async_amadeus_flight_offers_search(params):
+        await asyncio.sleep(0.1)
+        return _daily_result(params)
+
+    monkeypatch.setattr(flight_offers_search, "_amadeus_flight_offers_search",
+                        _amadeus_flight_offers_search)
+    monkeypatch.setattr(flight_offers_search,
+                        "_async_amadeus_flight_offers_search",
+                        _async_amadeus_flight_offers_search)
+    return calls
+
+
+def test_search_flights_flexible_returns_cheapest_offer_per_day(
+        mock_mongodb, fake_amadeus_daily_prices):
+    departure_date = dt.date.today() + dt.timedelta(days=30)
+    search_params = FlightsSearch(
+            origin="TLV", destination="LAS", departure_date=departure_date,
+            return_date=departure_date + dt.timedelta(days=7))
+    start_time = time.perf_counter()
+    calendar = flight_offers_search.search_flights_flexible(
+            search_params, days=3, max_workers=7)
+    elapsed = time.perf_counter() - start_time
+    assert len(fake_amadeus_daily_prices) == 7
+    assert elapsed < 1.0
+    assert list(calendar) == [
+        departure_date + dt.timedelta(days=delta) for delta in range(-3, 4)
+    ]
+    for day, entry in calendar.items():
+        assert entry["departure_date"] == day
+        assert entry["return_date"] == day + dt.timedelta(days=7)
+        assert entry["grand_total"] == Decimal(day.day)
+        assert entry["offer"].offer_id == "8"
+
+
+def test_search_flights_flexible_reuses_cached_days(
+        mock_mongodb, fake_amadeus_daily_prices):
+    departure_date = dt.date.today() + dt.timedelta(days=30)
+    flight_offers_search.search_flights(SEARCH_PARAMS.copy(
+            update={"departure_date": departure_date}))
+    flight_offers_search.search_flights_flexible(
+            SEARCH_PARAMS.copy(update={"departure_date": departure_date}),
+            days=1)
+    assert len(fake_amadeus_daily_prices) == 3
+
+
+def test_search_flights_flexible_skips_past_days(
+        mock_mongodb, fake_amadeus_daily_prices):
+    calendar = flight_offers_search.search_flights_flexible(
+            SEARCH_PARAMS.copy(update={"departure_date": dt.date.today()}),
+            days=2)
+    assert list(calendar) == [
+        dt.date.today() + dt.timedelta(days=delta) for delta in range(3)
+    ]
+
+
+def test_async_search_flights_flexible(
+        mock_mongodb, fake_amadeus_daily_prices):
+    departure_date = dt.date.today() + dt.timedelta(days=30)
+    calendar = asyncio.run(flight_offers_search.async_search_flights_flexible(
+            SEARCH_PARAMS.copy(update={"departure_date": departure_date}),
+            days=1))
+    assert len(fake_amadeus_daily_prices) == 3
+    assert [entry["grand_total"] for entry in calendar.values()] == [
+        Decimal(day.day) for day in calendar
+    ]
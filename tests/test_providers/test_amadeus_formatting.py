@@ -0,0 +1,68 @@
+import datetime as dt
+from decimal import Decimal
+import json
+
+import pytest
+
+from jormungand.providers.amadeus import formatting
+from tests.utils import Assets
+
+
+@pytest.fixture(scope="module")
+def search_result():
+    return json.loads(Assets.amadeus_flights_search_one_way.read_text())
+
+
+@pytest.mark.parametrize("duration, minutes", [
+    ("PT50M", 50), ("PT21H17M", 1277), ("PT2H", 120), ("P1DT2H5M", 1565),
+    (None, 0), ("bogus", 0),
+])
+def test_duration_minutes(duration, minutes):
+    assert formatting._duration_minutes(duration) == minutes
+
+
+def test_format_flight_offers(search_result):
+    listing = formatting.format_flight_offers(search_result)
+    assert len(listing) == len(search_result["data"])
+    offer = listing.offers[0]
+    assert offer.offer_id == "1"
+    assert offer.grand_total == Decimal("759.42")
+    assert offer.currency == "EUR"
+    assert offer.cabin == "ECONOMY"
+    assert offer.bookable_seats == 9
+    assert offer.last_ticketing_date == dt.date(2023, 7, 3)
+    assert offer.validating_carrier_codes == ("RJ",)
+    itinerary = offer.itineraries[0]
+    assert itinerary.duration_minutes == 21 * 60 + 17
+    segment = itinerary.segments[0]
+    assert (segment.departure_airport, segment.arrival_airport) == (
+            "TLV", "AMM")
+    assert segment.departure_at == dt.datetime(2023, 7, 3, 0, 35)
+    assert segment.duration_minutes == 50
+    assert listing.carriers["RJ"] == "ROYAL JORDANIAN"
+    assert listing.cheapest().grand_total == min(
+            Decimal(offer["price"]["grandTotal"])
+            for offer in search_result["data"])
+
+
+def test_format_flight_offers_shares_codes_and_segments(search_result):
+    listing = formatting.format_flight_offers(search_result)
+    segments = [
+        segment for offer in listing.offers
+        for itinerary in offer.itineraries for segment in itinerary.segments
+    ]
+    assert len({id(segment) for segment in segments}) == len(set(segments))
+    tlv_codes = {
+        id(segment.departure_airport) for segment in segments
+        if segment.departure_airport == "TLV"
+    }
+    assert len(tlv_codes) == 1
+
+
+def test_listing_to_dict_is_json_serializable(search_result):
+    listing = formatting.format_flight_offers(search_result)
+    listing_dict = json.loads(json.dumps(listing.to_dict()))
+    assert len(listing_dict["offers"]) == len(listing)
+    assert listing_dict["offers"][0]["grand_total"] == "759.42"
+    assert listing_dict["offers"][0]["itineraries"][0]["segments"][0][
+        "departure_at"] == "2023-07-03T00:35:00"
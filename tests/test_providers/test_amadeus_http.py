@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+from jormungand.core.config import config
+from jormungand.core.ratelimit import TokenBucket
+from jormungand.providers.amadeus import (
+    auth, flight_create_orders, flight_offers_pricing, http)
+
+
+def test_request_reuses_pooled_connection(amadeus_stub):
+    for _ in range(3):
+        assert http.request("GET", "/v2/shopping/flight-offers").ok
+    client_ports = {
+        request["client_port"] for request in amadeus_stub.requests
+    }
+    assert len(amadeus_stub.requests) == 3
+    assert len(client_ports) == 1
+
+
+def test_request_accepts_and_decodes_gzip(amadeus_stub):
+    response = http.request("GET", "/v2/shopping/flight-offers")
+    assert "gzip" in amadeus_stub.requests[0]["headers"]["Accept-Encoding"]
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == {"meta": {"count": 0}, "data": []}
+
+
+def test_request_sets_default_timeout(amadeus_stub, monkeypatch):
+    sent = {}
+    session = http.get_session()
+    send = session.send
+
+    def _send(request, **kwargs):
+        sent.update(kwargs)
+        return send(request, **kwargs)
+
+    monkeypatch.setattr(session, "send", _send)
+    http.request("GET", "/v2/shopping/flight-offers")
+    assert sent["timeout"] == (
+            config.get("amadeus_options.http.connect_timeout"),
+            config.get("amadeus_options.http.read_timeout"))
+
+
+def test_api_wrappers_share_session(amadeus_stub):
+    flight_offers_pricing.flight_offers_pricing({"data": {}})
+    flight_create_orders.flight_create_orders({"data": {}})
+    paths = [request["path"] for request in amadeus_stub.requests]
+    assert paths.count("/v1/security/oauth2/token") <= 1
+    assert "/v1/shopping/flight-offers/pricing" in paths
+    assert "/v1/booking/flight-orders" in paths
+    api_requests = amadeus_stub.requests_to("/v1/booking/flight-orders")
+    assert api_requests[0]["headers"]["Authorization"] == (
+            "Bearer stub-access-token")
+    assert len({request["client_port"]
+                for request in amadeus_stub.requests}) == 1
+
+
+def _run_with_async_client(main):
+    async def _main():
+        http.load_async_client()
+        try:
+            return await main()
+        finally:
+            await http.aclose_async_client()
+
+    return asyncio.run(_main())
+
+
+def test_async_request_reuses_pooled_connection(amadeus_stub):
+    async def main():
+        for _ in range(3):
+            response = await http.async_request(
+                    "GET", "/v2/shopping/flight-offers")
+            assert response.json() == {"meta": {"count": 0}, "data": []}
+
+    _run_with_async_client(main)
+    client_ports = {
+        request["client_port"] for request in amadeus_stub.requests
+    }
+    assert len(amadeus_stub.requests) == 3
+    assert len(client_ports) == 1
+
+
+def test_async_get_auth_header_refreshes_token_once(amadeus_stub):
+    async def main():
+        return await asyncio.gather(
+                *(auth.async_get_auth_header() for _ in range(20)))
+
+    auth_headers = _run_with_async_client(main)
+    assert len(amadeus_stub.requests_to("/v1/security/oauth2/token")) == 1
+    assert all(auth_header == {"Authorization": "Bearer stub-access-token"}
+               for auth_header in auth_headers)
+
+
+def test_async_api_wrappers(amadeus_stub):
+    async def main():
+        await flight_offers_pricing.async_flight_offers_pricing({"data": {}})
+        await flight_create_orders.async_flight_create_orders({"data": {}})
+
+    _run_with_async_client(main)
+    paths = [request["path"] for request in amadeus_stub.requests]
+    assert paths == [
+        "/v1/security/oauth2/token",
+        "/v1/shopping/flight-offers/pricing",
+        "/v1/booking/flight-orders",
+    ]
+
+
+def _too_many_requests_first(count: int, retry_after: str | None):
+    responses = []
+
+    def route(request):
+        responses.append(request)
+        if len(responses) <= count:
+            headers = {} if retry_after is None else {
+                "Retry-After": retry_after}
+            return 429, headers, {"errors": [{"status": 429}]}
+        return 200, {}, {"meta": {"count": 0}, "data": []}
+
+    return route
+
+
+def test_request_retries_after_too_many_requests(amadeus_stub):
+    amadeus_stub.routes[("GET", "/v2/shopping/flight-offers")] = (
+            _too_many_requests_first(2, retry_after="0.05"))
+    start_time = time.perf_counter()
+    response = http.request("GET", "/v2/shopping/flight-offers")
+    assert response.status_code == 200
+    assert time.perf_counter() - start_time >= 0.1
+    assert len(amadeus_stub.requests) == 3
+    assert http.get_rate_limiter().stats()["pauses"] == 2
+
+
+def test_request_backs_off_with_jitter_and_gives_up(amadeus_stub):
+    amadeus_stub.routes[("GET", "/v2/shopping/flight-offers")] = (
+            _too_many_requests_first(10, retry_after=None))
+    previous_backoff_base = config.get("amadeus_options.rate_limit."
+                                       "backoff_base")
+    config.set("amadeus_options.rate_limit.backoff_base", 0.01)
+    try:
+        response = http.request("GET", "/v2/shopping/flight-offers")
+    finally:
+        config.set("amadeus_options.rate_limit.backoff_base",
+                   previous_backoff_base)
+    max_retries = config.get("amadeus_options.rate_limit.max_retries")
+    assert response.status_code == 429
+    assert len(amadeus_stub.requests) == max_retries + 1
+
+
+def test_async_request_retries_after_too_many_requests(amadeus_stub):
+    amadeus_stub.routes[("GET", "/v2/shopping/flight-offers")] = (
+            _too_many_requests_first(1, retry_after="0"))
+
+    async def main():
+        return await http.async_request("GET", "/v2/shopping/flight-offers")
+
+    response = _run_with_async_client(main)
+    assert response.status_code == 200
+    assert len(amadeus_stub.requests) == 2
+
+
+def test_requests_are_rate_limited(amadeus_stub):
+    http.load_rate_limiter(TokenBucket(rate=50, burst=5))
+    start_time = time.perf_counter()
+    for _ in range(15):
+        http.request("GET", "/v2/shopping/flight-offers")
+    assert time.perf_counter() - start_time >= 0.18
@@ -0,0 +1,90 @@
+import datetime as dt
+import time
+
+from jormungand.core.config import config
+from jormungand.flights.validation.models import FlightsSearch
+from jormungand.providers.amadeus import flight_offers_search, warmup
+
+START_DATE = dt.date(2023, 7, 3)
+
+
+def test_top_routes_are_configured_routes():
+    previous = config.get("amadeus_options.warmup.routes")
+    config.set("amadeus_options.warmup.routes", ["tlv-LAS", "JFK-LHR"])
+    try:
+        assert warmup.top_routes() == [("TLV", "LAS"), ("JFK", "LHR")]
+    finally:
+        config.set("amadeus_options.warmup.routes", previous)
+
+
+def test_derive_top_routes_orders_routes_by_cached_searches(mock_mongodb):
+    collection = mock_mongodb[flight_offers_search._mongodb_collection]
+    for origin, destination, searches in (("TLV", "LAS", 2),
+                                          ("JFK", "LHR", 3),
+                                          ("CDG", "FCO", 1)):
+        collection.insert_many([
+            {"search_params": {"originLocationCode": origin,
+                               "destinationLocationCode": destination}}
+            for _ in range(searches)
+        ])
+
+    assert warmup.derive_top_routes(2) == [("JFK", "LHR"), ("TLV", "LAS")]
+
+
+def test_warm_up_caches_the_searches_of_every_route_and_day(
+        mock_mongodb, fake_amadeus_search):
+    summary = warmup.warm_up_flights_cache(
+            routes=[("TLV", "LAS"), ("JFK", "LHR")], days=3, rate=1000,
+            start_date=START_DATE)
+
+    assert summary == {"routes": 2, "searches": 6,
+                       "cached": 0, "warmed": 6, "failed": 0}
+    assert len(fake_amadeus_search) == 6
+    search_params = FlightsSearch(origin="JFK", destination="LHR",
+                                  departure_date=START_DATE)
+    assert flight_offers_search._cached_flight_offers_search(
+            flight_offers_search._format_search_params(search_params))
+
+
+def test_warm_up_skips_cached_searches(mock_mongodb, fake_amadeus_search):
+    flight_offers_search.search_flights(FlightsSearch(
+            origin="TLV", destination="LAS", departure_date=START_DATE))
+
+    summary = warmup.warm_up_flights_cache(
+            routes=[("TLV", "LAS")], days=2, rate=1000,
+            start_date=START_DATE)
+
+    assert summary["cached"] == 1
+    assert summary["warmed"] == 1
+    assert len(fake_amadeus_search) == 2
+
+
+def test_warm_up_is_rate_limited(mock_mongodb, fake_amadeus_search):
+    start = time.monotonic()
+    summary = warmup.warm_up_flights_cache(
+            routes=[("TLV", "LAS")], days=3, rate=10, max_workers=3,
+            start_date=START_DATE)
+
+    assert summary["warmed"] == 3
+    # The first search uses the single token of the budget, the next two
+    # wait for a new token (0.1 seconds) each.
+    assert time.monotonic() - start >= 0.18
+
+
+def test_warm_up_skips_invalid_routes(mock_mongodb, fake_amadeus_search):
+    summary = warmup.warm_up_flights_cache(
+            routes=[("TLV", "TLV"), ("TLV", "LAS")], days=2, rate=1000,
+            start_date=START_DATE)
+
+    assert summary == {"routes": 2, "searches": 2,
+                       "cached": 0, "warmed": 2, "failed": 0}
+
+
+def test_warm_up_is_not_counted_in_the_cache_stats(
+        mock_mongodb, fake_amadeus_search):
+    stats = flight_offers_search.cache_stats()
+    warmup.warm_up_flights_cache(routes=[("TLV", "LAS")], days=2, rate=1000,
+                                 start_date=START_DATE)
+    warmup.warm_up_flights_cache(routes=[("TLV", "LAS")], days=2, rate=1000,
+                                 start_date=START_DATE)
+    assert flight_offers_search.cache_stats() == stats
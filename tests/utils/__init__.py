@@ -2,6 +2,7 @@
 
 See the induvidial modules for specific documentation
 """
+from .amadeus_stub import AmadeusStubServer
 from .assets import Assets
 from .data import data_in_table
 from .data import dataset_in_db
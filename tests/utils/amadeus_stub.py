@@ -0,0 +1,129 @@
+"""Local stub HTTP server standing in for the Amadeus APIs.
+
+Routes map ``(method, path)`` to handlers taking the recorded request and
+returning a ``(status, headers, json_body)`` tuple. By default the token
+endpoint approves every request and the other endpoints return an empty
+``data`` list. Every request is recorded (including the client port, so
+connection reuse can be checked).
+"""
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from typing import Callable
+from urllib.parse import urlsplit
+
+StubRoute = Callable[[dict], tuple[int, dict, dict | None]]
+
+
+def approve_token(request: dict) -> tuple[int, dict, dict]:
+    return 200, {}, {
+        "state": "approved",
+        "access_token": "stub-access-token",
+        "token_type": "Bearer",
+        "expires_in": 1799,
+    }
+
+
+def empty_data(request: dict) -> tuple[int, dict, dict]:
+    return 200, {}, {"meta": {"count": 0}, "data": []}
+
+
+DEFAULT_ROUTES = {
+    ("POST", "/v1/security/oauth2/token"): approve_token,
+    ("GET", "/v2/shopping/flight-offers"): empty_data,
+    ("POST", "/v1/shopping/flight-offers/pricing"): empty_data,
+    ("POST", "/v1/booking/flight-orders"): empty_data,
+}
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class AmadeusStubServer:
+    """Context manager running a stub Amadeus server in a thread.
+
+    :routes: Routes to add to (or override in) the default routes.
+    """
+
+    def __init__(self,
+                 routes: dict[tuple[str, str], StubRoute] | None = None):
+        self.routes = dict(DEFAULT_ROUTES)
+        self.routes.update(routes or {})
+        self.requests: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer(
+                ("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(
+                target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "AmadeusStubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def requests_to(self, path: str) -> list[dict]:
+        with self._lock:
+            return [
+                request for request in self.requests
+                if request["path"] == path
+            ]
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        url = urlsplit(handler.path)
+        length = int(handler.headers.get("Content-Length", 0))
+        request = {
+            "method": handler.command,
+            "path": url.path,
+            "query": url.query,
+            "headers": dict(handler.headers),
+            "body": handler.rfile.read(length),
+            "client_port": handler.client_address[1],
+        }
+        with self._lock:
+            self.requests.append(request)
+        route = self.routes.get((handler.command, url.path))
+        if route is None:
+            status, headers, body = 404, {}, {"errors": [{"status": 404}]}
+        else:
+            status, headers, body = route(request)
+        payload = json.dumps(body).encode() if body is not None else b""
+        if "gzip" in handler.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            headers = {**headers, "Content-Encoding": "gzip"}
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            handler.send_header(name, str(value))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def do_POST(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -7,3 +7,5 @@ class Assets:
     """Convenience class for getting Path objects to asset files."""
     ouraiports_countries_sample = ASSETS_ROOT.joinpath("ourairports/countries.csv")
     ouraiports_airports_sample = ASSETS_ROOT.joinpath("ourairports/airports.csv")
+    amadeus_flights_search_one_way = ASSETS_ROOT.joinpath(
+            "amadeus/flights_search_one_way.json")